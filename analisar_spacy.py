@@ -1,14 +1,66 @@
 import os
 import re
-import spacy
+import json
+import hashlib
+from functools import lru_cache
+from itertools import chain
+from collections import deque
+from importlib import metadata
 from tqdm import tqdm
-from spacy.pipeline import EntityRuler
-from spacy.matcher import Matcher
+import varredura_regex
+from cache_analise import CacheAnalise, FORMATO as FORMATO_CACHE
+from resultados import BaseResultados
+from entidades import Entidades
+# spacy é importado sob demanda (carregar_pipeline/criar_matcher): importar este módulo
+# só para usar validar_documento ou criterios_obrigatorios não deve carregar o modelo
 
 OUTPUT_DIR = "despachos_txt"
 
-NER = spacy.load("pt_core_news_lg")
-ruler = NER.add_pipe("entity_ruler", before="ner")
+# --- processamento em lote (nlp.pipe) ---
+BATCH_SIZE = 32   # documentos por lote enviado ao nlp.pipe
+N_PROCESS = 1     # processos paralelos do nlp.pipe (1 = processo atual)
+
+# --- perfil do pipeline ---
+MODELO = "pt_core_news_lg"
+# "completo": modelo inteiro | "regras": só tokenizer + entity_ruler (sem vetores)
+PERFIL_PIPELINE = os.environ.get("ANALISAR_PERFIL", "completo")
+
+# pipelines pré-montados por construir_pipeline() (um subdiretório por perfil)
+PIPELINE_DIR = "pipeline_compilado"
+
+# cache de resultados por conteúdo (ver cache_analise.py)
+USAR_CACHE = True
+
+# --- documentos longos (analisar_longo) ---
+TAMANHO_TRECHO = 100_000      # textos maiores (em caracteres) são analisados em trechos deste tamanho
+SOBREPOSICAO_TRECHO = 2_000   # caracteres em comum entre trechos vizinhos (bem mais que o dobro de uma entidade)
+LOTE_TRECHOS = 4              # trechos por lote do nlp.pipe: só esses Docs ficam na memória ao mesmo tempo
+
+# componentes do pt_core_news_lg (o "senter" vem desativado por padrão)
+COMPONENTES_MODELO = ["tok2vec", "morphologizer", "parser", "lemmatizer", "attribute_ruler", "ner", "senter"]
+
+PERFIS = {
+    "completo": {"exclude": []},
+    # "vocab" excluído: não carrega os vetores grandes (tokenizer continua o do modelo)
+    "regras": {"exclude": COMPONENTES_MODELO + ["vocab"]},
+}
+
+# atributos de token que só são preenchidos por um componente (ou pelo vocab) do modelo;
+# os demais (TEXT, LOWER, IS_TITLE, IS_DIGIT, IS_PUNCT...) vêm do tokenizer e da língua
+ATRIBUTOS_DEPENDENTES = {
+    "POS": "morphologizer",
+    "MORPH": "morphologizer",
+    "TAG": "attribute_ruler",
+    "LEMMA": "lemmatizer",
+    "DEP": "parser",
+    "SENT_START": "parser",
+    "IS_SENT_START": "parser",
+    "ENT_TYPE": "ner",
+    "ENT_IOB": "ner",
+    "ENT_ID": "ner",
+    "ENT_KB_ID": "ner",
+    "NORM": "vocab",  # tabelas lexeme_norm carregadas com o vocab
+}
 
 patterns = [
     {"label": "INTERESSADO", "pattern": [
@@ -133,7 +185,129 @@ patterns = [
     }
 ]
 
-ruler.add_patterns(patterns)
+def versao_modelo():
+    """Versão instalada do pacote do modelo (None se não for um pacote instalado)."""
+    try:
+        return metadata.version(MODELO)
+    except metadata.PackageNotFoundError:
+        return None
+
+def versao_padroes():
+    """Hash dos padrões do EntityRuler e do Matcher e da versão do modelo."""
+    conteudo = json.dumps([patterns, matcher_patterns, MODELO, versao_modelo()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def _hash_json(conteudo) -> str:
+    return hashlib.sha256(json.dumps(conteudo, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def padroes_por_fonte():
+    """Padrões agrupados por origem: um grupo por rótulo do EntityRuler e um por rótulo do Matcher."""
+    fontes = {}
+    for p in patterns:
+        fontes.setdefault(p["label"], []).append(p["pattern"])
+    for label, padroes in matcher_patterns.items():
+        fontes[f"matcher:{label}"] = padroes
+    return fontes
+
+def impressoes_padroes(fontes: dict = None):
+    """Hash dos padrões de cada fonte: mudar um padrão só altera a impressão do seu rótulo."""
+    fontes = fontes or padroes_por_fonte()
+    return {fonte: _hash_json(padroes) for fonte, padroes in fontes.items()}
+
+def versao_cache(perfil: str = PERFIL_PIPELINE, hibrido: bool = False):
+    """
+    Parte da chave do cache que invalida tudo: formato dos resultados, modelo, perfil e
+    (no modo híbrido) as regex da varredura.
+    """
+    varredura = [varredura_regex.VERSAO_HIBRIDO, sorted(varredura_regex.ROTULOS_HIBRIDO)] if hibrido else None
+    return _hash_json([MODELO, versao_modelo(), perfil, hibrido, varredura, FORMATO_CACHE])
+
+def abrir_cache(perfil: str = PERFIL_PIPELINE, hibrido: bool = False):
+    """CacheAnalise para os padrões atuais."""
+    fontes = padroes_por_fonte()
+    return CacheAnalise(impressoes_padroes(fontes), fontes, versao_cache(perfil, hibrido))
+
+def carregar_pipeline(perfil: str = PERFIL_PIPELINE):
+    """Carrega o modelo no perfil pedido e adiciona o entity_ruler com os padrões."""
+    import spacy
+
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil de pipeline desconhecido: {perfil!r} (use {', '.join(PERFIS)})")
+    nlp = spacy.load(MODELO, exclude=PERFIS[perfil]["exclude"])
+    ruler = nlp.add_pipe("entity_ruler", before="ner" if "ner" in nlp.pipe_names else None)
+    ruler.add_patterns(patterns)
+    nlp.meta["perfil"] = perfil
+    nlp.meta["versao_padroes"] = versao_padroes()
+    nlp.meta["matcher_patterns"] = matcher_patterns
+    return nlp
+
+def construir_pipeline(perfis=tuple(PERFIS), destino: str = PIPELINE_DIR):
+    """
+    Monta cada perfil (modelo + entity_ruler com os padrões + padrões do Matcher)
+    e grava em disco, para que as próximas execuções carreguem o artefato pronto.
+    """
+    os.makedirs(destino, exist_ok=True)
+    for perfil in perfis:
+        caminho = os.path.join(destino, perfil)
+        carregar_pipeline(perfil).to_disk(caminho)
+        print(f"✅ Pipeline {perfil!r} salvo em: {caminho}")
+
+_pipelines = {}
+
+def obter_pipeline(perfil: str = PERFIL_PIPELINE):
+    """
+    Devolve o pipeline do perfil, carregando-o só na primeira chamada.
+    Usa o artefato de construir_pipeline() quando ele existe e corresponde aos padrões atuais.
+    """
+    if perfil not in _pipelines:
+        import spacy
+
+        caminho = os.path.join(PIPELINE_DIR, perfil)
+        nlp = None
+        if os.path.isdir(caminho):
+            nlp = spacy.load(caminho)
+            if nlp.meta.get("versao_padroes") != versao_padroes():
+                print(f"⚠️ Pipeline em {caminho} desatualizado (padrões ou modelo mudaram); "
+                      f"rode construir_pipeline(). Montando a partir de {MODELO}...")
+                nlp = None
+        _pipelines[perfil] = nlp or carregar_pipeline(perfil)
+    return _pipelines[perfil]
+
+def verificar_perfil(perfil: str = "regras"):
+    """
+    Lista os padrões (EntityRuler e Matcher) que usam atributos de token
+    preenchidos por componentes ausentes no perfil, e que portanto se comportariam diferente.
+    """
+    excluidos = set(PERFIS[perfil]["exclude"])
+    todos = [(p["label"], p["pattern"]) for p in patterns]
+    todos += [(label, padrao) for label, padroes in matcher_patterns.items() for padrao in padroes]
+
+    problemas = []
+    for label, padrao in todos:
+        for token in padrao:
+            for atributo in token:
+                componente = ATRIBUTOS_DEPENDENTES.get(atributo.upper())
+                if componente in excluidos:
+                    problemas.append((label, atributo, componente))
+
+    if problemas:
+        print(f"⚠️ Padrões afetados pelo perfil {perfil!r}:")
+        for label, atributo, componente in problemas:
+            print(f" - {label}: {atributo} depende de '{componente}'")
+    else:
+        print(f"✅ Todos os padrões usam apenas atributos disponíveis no perfil {perfil!r}.")
+    return problemas
+
+def __getattr__(nome):
+    # compatibilidade: NER e ruler eram criados na importação do módulo; PERFIS_VALIDACAO, montado a partir
+    # de extraindo_compilado.PALAVRAS_CHAVE, só quando usado
+    if nome == "NER":
+        return obter_pipeline()
+    if nome == "ruler":
+        return obter_pipeline().get_pipe("entity_ruler")
+    if nome == "PERFIS_VALIDACAO":
+        return perfis_validacao()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 def limpar_texto(texto: str) -> str:
     texto = re.sub(r'\s+', ' ', texto)
@@ -160,56 +334,400 @@ pattern_labels = [
     "HORA_ASSINATURA",
     "PRAZO"
 ]
-def analisar_textos():
-
-    matcher = Matcher(NER.vocab)
-    pattern_cnpj_dois_tokens = [
+# Padrões do Matcher (tokens separados pelo tokenizer, ex: "40.432.544/" + "0001-47")
+matcher_patterns = {
+    "CNPJ": [[
         {"TEXT": {"REGEX": r"\d{2}\.\d{3}\.\d{3}/"}},
         {"TEXT": {"REGEX": r"\d{4}-\d{2}"}}
-    ]
-    matcher.add("CNPJ", [pattern_cnpj_dois_tokens])
-
+    ]],
     # PADRÃO PARA CPF
-    pattern_cpf_dois_tokens = [
+    "CPF": [[
         {"TEXT": {"REGEX": r"\d{3}\.\d{3}\."}},  # Primeiro token com "." no final
         {"TEXT": {"REGEX": r"\d{3}-\d{2}"}}  # Segundo token
-    ]
-    matcher.add("CPF", [pattern_cpf_dois_tokens])
+    ]],
+}
+
+def criar_matcher(nlp):
+    """Cria o Matcher de CNPJ/CPF com os padrões gravados no pipeline (ou os do módulo)."""
+    from spacy.matcher import Matcher
+
+    matcher = Matcher(nlp.vocab)
+    for label, padroes in nlp.meta.get("matcher_patterns", matcher_patterns).items():
+        matcher.add(label, padroes)
+    return matcher
+
+def spans_entidades(doc, matcher):
+    """
+    [(grupo, label, início, fim)] em caracteres, na ordem de extrair_entidades: grupo "ents"
+    (entidades do EntityRuler, sem sobreposição entre si) ou "matcher" (CNPJ/CPF, gravados como CNPJ).
+    """
+    # Entidades encontradas pelo NER
+    spans = [("ents", ent.label_, ent.start_char, ent.end_char) for ent in doc.ents if ent.label_ in pattern_labels]
+
+    # Entidades via Matcher
+    for _, start, end in matcher(doc):
+        span = doc[start:end]
+        spans.append(("matcher", "CNPJ", span.start_char, span.end_char))
+    return spans
 
-    resultados_gerais = {}
+def entidades_de_spans(texto: str, spans):
+    """Dicionário {label: [textos]} a partir dos spans (spans_entidades) sobre `texto`."""
+    entidades = {label: [] for label in pattern_labels}
+    for _, label, inicio, fim in spans:
+        entidades[label].append(texto[inicio:fim])
+    return entidades
 
-    for documento in tqdm(os.listdir(OUTPUT_DIR), desc="Analisando e validando", ncols=80):
-        caminho = os.path.join(OUTPUT_DIR, documento)
+def extrair_entidades(doc, matcher):
+    """Monta o dicionário {label: [textos]} a partir do Doc processado."""
+    return entidades_de_spans(doc.text, spans_entidades(doc, matcher))
+
+def criar_ruler_hibrido(nlp):
+    """EntityRuler avulso (fora do pipeline) só com os padrões que a varredura do modo híbrido não cobre."""
+    from spacy.pipeline import EntityRuler
+
+    ruler = EntityRuler(nlp, name="entity_ruler_hibrido")
+    ruler.add_patterns([p for p in patterns if p["label"] not in varredura_regex.ROTULOS_HIBRIDO])
+    return ruler
+
+def criar_extrator(nlp, hibrido: bool = False, spans: bool = False, prefiltro: bool = False):
+    """
+    Devolve (componentes a desativar, função Doc -> entidades), ou Doc -> spans (spans_entidades)
+    com `spans`. No modo híbrido o entity_ruler do pipeline fica desligado: os padrões dos rótulos de
+    varredura_regex.ROTULOS_HIBRIDO e o Matcher de CNPJ/CPF só rodam onde a regex do primeiro token acha
+    algo, e um EntityRuler avulso cobre os demais rótulos. O resultado é o mesmo.
+    Com `prefiltro`, o entity_ruler também fica desligado e os mesmos padrões só rodam em volta das
+    suas âncoras (prefiltro_ancoras.PrefiltroAncoras), com o mesmo resultado.
+    """
+    if prefiltro:
+        if hibrido:
+            raise ValueError("O prefiltro por âncoras e o modo híbrido não se combinam; escolha um deles")
+        from prefiltro_ancoras import PrefiltroAncoras
+
+        prefiltro_ancoras = PrefiltroAncoras(nlp)
+        if spans:
+            return ["entity_ruler"], prefiltro_ancoras.spans
+        return ["entity_ruler"], lambda doc: entidades_de_spans(doc.text, prefiltro_ancoras.spans(doc))
+    if not hibrido:
+        matcher = criar_matcher(nlp)
+        if spans:
+            return [], lambda doc: spans_entidades(doc, matcher)
+        return [], lambda doc: extrair_entidades(doc, matcher)
+    ruler_restante = criar_ruler_hibrido(nlp)
+    varredura = varredura_regex.criar_varredura_hibrida(nlp)
+    if spans:
+        return ["entity_ruler"], lambda doc: varredura_regex.spans_hibrido(doc, ruler_restante, varredura)
+    return ["entity_ruler"], lambda doc: varredura_regex.extrair_entidades_hibrido(doc, ruler_restante, varredura)
+
+_FIM_FRASE = re.compile(r"[.!?;] ")
+ORDEM_GRUPOS = ("ents", "extras", "matcher")   # ordem dos grupos de spans em extrair_entidades
+
+def _corte(texto: str, minimo: int, maximo: int, frase: bool = True) -> int:
+    """Posição em (minimo, maximo] logo após um fim de frase ou, sem ele, após um espaço."""
+    if frase:
+        ultimo = None
+        for ultimo in _FIM_FRASE.finditer(texto, minimo, maximo):
+            pass
+        if ultimo:
+            return ultimo.end()
+    espaco = texto.rfind(" ", minimo, maximo)
+    return espaco + 1 if espaco >= 0 else maximo
+
+def dividir_texto(texto: str, tamanho: int = TAMANHO_TRECHO, sobreposicao: int = SOBREPOSICAO_TRECHO):
+    """
+    Intervalos (início, fim) de trechos de até `tamanho` caracteres que cobrem o texto, com cerca de
+    `sobreposicao` caracteres em comum entre vizinhos. Cada trecho termina depois de um fim de frase
+    (ou de um espaço) e começa no início de uma palavra, para não partir tokens.
+    """
+    if 2 * sobreposicao >= tamanho:
+        raise ValueError("a sobreposição deve ser menor que metade do tamanho do trecho")
+    trechos, inicio = [], 0
+    while inicio + tamanho < len(texto):
+        fim = _corte(texto, inicio + tamanho // 2, inicio + tamanho)
+        trechos.append((inicio, fim))
+        inicio = _corte(texto, inicio + 1, fim - sobreposicao, frase=False)
+    trechos.append((inicio, len(texto)))
+    return trechos
+
+def analisar_longo(texto: str, nlp, extrair_spans, desativar=(), tamanho: int = TAMANHO_TRECHO,
+                   sobreposicao: int = SOBREPOSICAO_TRECHO, lote: int = LOTE_TRECHOS):
+    """
+    Analisa um texto longo em trechos sobrepostos (nlp.pipe, `lote` trechos por vez, então o pico de
+    memória não depende do tamanho do documento) e devolve os spans (`extrair_spans`, ver criar_extrator)
+    com posições no texto inteiro. O meio de cada sobreposição separa dois trechos: um span só é aceito
+    do trecho dono do seu início, o que descarta as repetições e as entidades cortadas na borda.
+    """
+    tamanho = min(tamanho, nlp.max_length)
+    trechos = dividir_texto(texto, tamanho, sobreposicao)
+    fronteiras = [0] + [(trechos[k + 1][0] + trechos[k][1]) // 2 for k in range(len(trechos) - 1)] + [len(texto)]
+    grupos = {}
+    docs = nlp.pipe((texto[inicio:fim] for inicio, fim in trechos), batch_size=lote, disable=desativar)
+    for k, ((deslocamento, _), doc) in enumerate(zip(trechos, docs)):
+        for grupo, label, inicio, fim in extrair_spans(doc):
+            if fronteiras[k] <= inicio + deslocamento < fronteiras[k + 1]:
+                grupos.setdefault(grupo, []).append((inicio + deslocamento, fim + deslocamento, label))
+
+    spans = []
+    for grupo in sorted(grupos, key=ORDEM_GRUPOS.index):
+        fim_anterior = -1
+        for inicio, fim, label in sorted(grupos[grupo]):
+            if grupo == "ents":
+                # sobreposta a uma entidade do trecho anterior, que viu o contexto à esquerda
+                if inicio < fim_anterior:
+                    continue
+                fim_anterior = fim
+            spans.append((grupo, label, inicio, fim))
+    return spans
+
+def componentes_dispensaveis(nlp):
+    """
+    Componentes do pipeline que não preenchem nenhum atributo usado pelos padrões do EntityRuler e do
+    Matcher (ATRIBUTOS_DEPENDENTES): sem eles, as entidades dos rótulos de pattern_labels não mudam.
+    """
+    todos = [p["pattern"] for p in patterns] + [padrao for padroes in matcher_patterns.values() for padrao in padroes]
+    necessarios = {ATRIBUTOS_DEPENDENTES.get(atributo.upper())
+                   for padrao in todos if not isinstance(padrao, str) for token in padrao for atributo in token}
+    return [nome for nome in nlp.pipe_names if nome != "entity_ruler" and nome not in necessarios]
+
+def ler_textos(pasta: str = OUTPUT_DIR):
+    """Lê os .txt da pasta sob demanda, gerando (documento, caminho, texto limpo)."""
+    for documento in os.listdir(pasta):
+        caminho = os.path.join(pasta, documento)
         try:
             with open(caminho, "r", encoding="utf-8") as f:
                 texto = limpar_texto(f.read())
         except FileNotFoundError:
             print(f"Arquivo não encontrado: {documento}")
             continue
+        yield documento, caminho, texto
+
+def _processar(entradas, lote: bool, batch_size: int, n_process: int, nlp, hibrido: bool, perfilador=None,
+               indice_modelos=None, direcionada=None, prefiltro: bool = False, spans: bool = False):
+    """
+    Gera (documento, entidades) para pares (texto, documento), na ordem de entrada; com `spans`,
+    (documento, spans) em vez das entidades (spans_entidades, com as posições no texto).
+    O pipeline só é carregado se houver ao menos uma entrada.
+    Com um `perfilador` (perfilamento.Perfilador), os documentos são processados um a um e medidos.
+    Com um `indice_modelos` (quase_duplicados.IndiceModelos), também um a um: os parecidos com um
+    documento já analisado só têm as regiões diferentes reanalisadas.
+    Com `direcionada` (validacao_direcionada.VarreduraDirecionada), também um a um: só as janelas do
+    cabeçalho e do rodapé são analisadas enquanto bastarem para os critérios do tipo (criterios_do_tipo).
+    Com `prefiltro`, os padrões só rodam em volta das suas âncoras (criar_extrator).
+    """
+    entradas = iter(entradas)
+    primeira = next(entradas, None)
+    if primeira is None:
+        return
+    entradas = chain([primeira], entradas)
+
+    nlp = nlp or obter_pipeline()
+    desativar, extrair = criar_extrator(nlp, hibrido, spans=True, prefiltro=prefiltro)
+    limite = min(TAMANHO_TRECHO, nlp.max_length)
+    saida = (lambda texto, spans_texto: spans_texto) if spans else entidades_de_spans
+
+    def longo(texto):
+        # textos acima do limite vão em trechos (analisar_longo), no processo atual e na ordem de entrada
+        return analisar_longo(texto, nlp, extrair, desativar, limite, SOBREPOSICAO_TRECHO)
+
+    if perfilador:
+        for texto, documento in entradas:
+            if len(texto) > limite:
+                yield documento, saida(texto, perfilador.processar_longo(longo, texto))
+            else:
+                yield documento, saida(texto, perfilador.extrair(extrair, perfilador.processar(texto, desativar)))
+        return
+    if indice_modelos:
+        # nas regiões diferentes bastam o tokenizer e os componentes de que os padrões dependem
+        desativar_trecho = desativar + componentes_dispensaveis(nlp)
+        completo = lambda texto: extrair(nlp(texto, disable=desativar))
+        trecho = lambda texto: extrair(nlp(texto, disable=desativar_trecho))
+        for texto, documento in entradas:
+            if len(texto) > limite:
+                yield documento, saida(texto, longo(texto))
+            else:
+                yield documento, saida(texto, indice_modelos.analisar(texto, completo, trecho))
+        return
+    if direcionada:
+        # nas janelas bastam o tokenizer e os componentes de que os padrões dependem
+        desativar_janela = desativar + componentes_dispensaveis(nlp)
+        janela = lambda texto: extrair(nlp(texto, disable=desativar_janela))
+        completo = lambda texto: longo(texto) if len(texto) > limite else extrair(nlp(texto, disable=desativar))
+        for texto, documento in entradas:
+            criterios = criterios_do_tipo(tipo_documento(texto))
+            obrigatorios = [label for label, obrigatorio in criterios.items() if obrigatorio]
+            yield documento, saida(texto, direcionada.analisar(texto, obrigatorios, janela, completo))
+        return
+    if lote:
+        # o texto longo segue só no contexto (e o pipe recebe ""), para não ir duas vezes aos processos
+        entradas = (("", (documento, texto)) if len(texto) > limite else (texto, (documento, None))
+                    for texto, documento in entradas)
+        docs = nlp.pipe(entradas, as_tuples=True, batch_size=batch_size, n_process=n_process, disable=desativar)
+        for doc, (documento, texto_longo) in docs:
+            if texto_longo is not None:
+                yield documento, saida(texto_longo, longo(texto_longo))
+            else:
+                yield documento, saida(doc.text, extrair(doc))
+    else:
+        for texto, documento in entradas:
+            yield documento, saida(texto, longo(texto) if len(texto) > limite else
+                                   extrair(nlp(texto, disable=desativar)))
+
+def analisar_entradas(entradas, lote: bool = False, batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS,
+                      nlp=None, hibrido: bool = False, cache: CacheAnalise = None, perfilador=None,
+                      indice_modelos=None, direcionada=None, prefiltro: bool = False, spans: bool = False):
+    """
+    Gera (documento, entidades) para pares (documento, texto limpo) de qualquer origem
+    (ex.: o fluxo de main.executar_pipeline), na ordem de entrada, consultando o cache se houver.
+    Com `spans`, gera (documento, spans): as entidades com as posições no texto, para Entidades.de_spans.
+    """
+    if cache:
+        return analisar_entradas_com_cache(cache, entradas, lote, batch_size, n_process, nlp, hibrido,
+                                           indice_modelos, prefiltro, spans)
+    return _processar(((texto, documento) for documento, texto in entradas), lote, batch_size, n_process, nlp, hibrido,
+                      perfilador, indice_modelos, direcionada, prefiltro, spans)
+
+def analisar_em_lote(pasta: str = OUTPUT_DIR, batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS,
+                     nlp=None, hibrido: bool = False):
+    """
+    Analisa os textos da pasta com nlp.pipe, em lotes e opcionalmente em vários processos.
+    Gera pares (documento, entidades) na mesma ordem e com o mesmo conteúdo do modo sequencial.
+    """
+    entradas = ((texto, documento) for documento, _, texto in ler_textos(pasta))
+    yield from _processar(entradas, True, batch_size, n_process, nlp, hibrido)
 
-        doc = NER(texto)
+def analisar_com_cache(cache: CacheAnalise, pasta: str = OUTPUT_DIR, lote: bool = False,
+                       batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS, nlp=None, hibrido: bool = False):
+    """
+    Como analisar_em_lote, mas só os documentos ausentes do cache (ou afetados por mudança
+    de padrão) passam pelo spaCy; os demais saem do cache, mantendo a ordem da pasta.
+    """
+    entradas = ((documento, texto) for documento, _, texto in ler_textos(pasta))
+    yield from analisar_entradas_com_cache(cache, entradas, lote, batch_size, n_process, nlp, hibrido)
 
-        # Dicionário de entidades do documento atual
-        entidades = {label: [] for label in pattern_labels}
+def analisar_entradas_com_cache(cache: CacheAnalise, entradas, lote: bool = False, batch_size: int = BATCH_SIZE,
+                                n_process: int = N_PROCESS, nlp=None, hibrido: bool = False, indice_modelos=None,
+                                prefiltro: bool = False, spans: bool = False):
+    """
+    analisar_com_cache para pares (documento, texto limpo) de qualquer origem, na ordem de entrada.
+    O cache guarda os spans (com `spans`, são eles que saem, como em analisar_entradas).
+    O prefiltro não muda as entidades, então não faz parte da chave do cache.
+    """
+    pendentes = deque()   # (documento, texto, spans do cache ou None), na ordem de entrada
+    saida = (lambda texto, spans_texto: spans_texto) if spans else entidades_de_spans
 
-        # Entidades encontradas pelo NER
-        for ent in doc.ents:
-            if ent.label_ in pattern_labels:
-                entidades[ent.label_].append(ent.text)
+    def faltantes():
+        for documento, texto in entradas:
+            spans_cache = cache.obter(texto)
+            pendentes.append((documento, texto, spans_cache))
+            if spans_cache is None:
+                yield texto, documento
 
-        # Entidades via Matcher
-        matches = matcher(doc)
-        for _, start, end in matches:
-            span = doc[start:end]
-            entidades["CNPJ"].append(span.text)
+    for documento, spans_texto in _processar(faltantes(), lote, batch_size, n_process, nlp, hibrido,
+                                             indice_modelos=indice_modelos, prefiltro=prefiltro, spans=True):
+        while pendentes[0][2] is not None:
+            doc_cache, texto_cache, spans_cache = pendentes.popleft()
+            yield doc_cache, saida(texto_cache, spans_cache)
+        _, texto, _ = pendentes.popleft()
+        cache.guardar(texto, spans_texto)
+        yield documento, saida(texto, spans_texto)
+    for doc_cache, texto_cache, spans_cache in pendentes:
+        yield doc_cache, saida(texto_cache, spans_cache)
 
-        # Salva no resultado geral
-        resultados_gerais[documento] = entidades
+def gerar_analises(lote: bool = False, batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS, nlp=None,
+                   hibrido: bool = False, usar_cache: bool = USAR_CACHE, base: BaseResultados = None,
+                   perfilar: bool = False, pasta: str = None, quase_duplicados: bool = False,
+                   por_tipo: bool = False, direcionada: bool = False, prefiltro: bool = False):
+    """
+    Analisa e valida os .txt da pasta (OUTPUT_DIR por padrão), gerando (documento, Entidades, completo)
+    à medida que cada um fica pronto: nada do corpus fica acumulado na memória. As entidades vêm na forma
+    compacta (entidades.Entidades, posições no texto), com o .txt como fonte dos textos.
+    Com `perfilar`, os documentos passam um a um pelo spaCy (sem cache nem lotes) e o tempo por
+    componente e por padrão vai para perfilamento.PERFILAMENTO_PATH.
+    Com `quase_duplicados`, documentos parecidos com um já analisado (quase_duplicados.IndiceModelos)
+    só têm as regiões diferentes reanalisadas (também um a um, sem lotes).
+    Com `por_tipo`, cada documento é validado pelo perfil do seu tipo (criterios_do_tipo). Com `direcionada`
+    (que implica por_tipo), só o cabeçalho e o rodapé são analisados quando bastam para a validação
+    (validacao_direcionada.py), um documento por vez e sem cache; as entidades registradas são as das
+    janelas analisadas, e a coluna `analise` da base diz quais foram. A latência por documento é impressa no final.
+    Com `prefiltro`, os padrões só rodam em volta das suas âncoras (prefiltro_ancoras.py), com as mesmas entidades.
+    """
+    pasta = pasta or OUTPUT_DIR
+    por_tipo = por_tipo or direcionada
+    varredura = None
+    if direcionada:
+        from validacao_direcionada import VarreduraDirecionada
 
-        print(f"\n📄 Validando documento: {documento}")
-        validar_documento(caminho, entidades, criterios_obrigatorios)
+        varredura = VarreduraDirecionada()
+        usar_cache = False   # o cache guardaria só as entidades das janelas
+    indice_modelos = None
+    if quase_duplicados:
+        from quase_duplicados import IndiceModelos
 
-    return resultados_gerais
+        indice_modelos = IndiceModelos()
+    perfilador = None
+    if perfilar:
+        from perfilamento import Perfilador
+
+        nlp = nlp or obter_pipeline()
+        perfilador = Perfilador(nlp)
+        usar_cache = False   # documentos vindos do cache não passariam pelo pipeline
+
+    cache = None
+    if usar_cache:
+        perfil = nlp.meta.get("perfil", PERFIL_PIPELINE) if nlp is not None else PERFIL_PIPELINE
+        cache = abrir_cache(perfil, hibrido)
+    propria = base is None
+    base = base or BaseResultados(origem="analisar_textos")
+
+    textos = {}   # texto analisado de cada documento em andamento (para o tipo e os trechos das entidades)
+
+    def entradas():
+        for documento, _, texto in ler_textos(pasta):
+            textos[documento] = texto
+            yield documento, texto
+
+    analises = analisar_entradas(entradas(), lote=lote, batch_size=batch_size, n_process=n_process, nlp=nlp,
+                                 hibrido=hibrido, cache=cache, perfilador=perfilador, indice_modelos=indice_modelos,
+                                 direcionada=varredura, prefiltro=prefiltro, spans=True)
+    total = len(os.listdir(pasta))
+    try:
+        for documento, spans in tqdm(analises, total=total, desc="Analisando e validando", ncols=80):
+            caminho = os.path.join(pasta, documento)
+            texto = textos.pop(documento, None)
+            entidades = Entidades.de_spans(spans, fonte=caminho)
+
+            print(f"\n📄 Validando documento: {documento}")
+            criterios = criterios_do_tipo(tipo_documento(texto)) if por_tipo else criterios_obrigatorios
+            # na varredura direcionada, as entidades podem ser só as das janelas: a base registra quais
+            analise = varredura.modo if varredura and varredura.modo != "completa" else None
+            completo, _ = validar_documento(caminho, entidades, criterios, base, texto, analise=analise)
+            yield documento, entidades, completo
+    finally:
+        if cache:
+            cache.fechar()
+            cache.relatorio()
+        if propria:
+            relatorio = base.gerar_relatorio()
+            print(f"\n🗄️ {base.registrados} resultado(s) em {base.caminho}; relatório: {relatorio}")
+            base.fechar()
+        if perfilador:
+            perfilador.relatorio()
+        if indice_modelos:
+            indice_modelos.relatorio()
+        if varredura:
+            varredura.relatorio()
+
+def analisar_textos(lote: bool = False, batch_size: int = BATCH_SIZE, n_process: int = N_PROCESS, nlp=None,
+                    hibrido: bool = False, usar_cache: bool = USAR_CACHE, base: BaseResultados = None,
+                    perfilar: bool = False, quase_duplicados: bool = False, por_tipo: bool = False,
+                    direcionada: bool = False, prefiltro: bool = False):
+    """
+    Como gerar_analises, mas devolve {documento: Entidades} de todos os documentos.
+    Cada Entidades se compara igual ao dicionário {label: [textos]} de extrair_entidades.
+    """
+    return {documento: entidades for documento, entidades, _ in
+            gerar_analises(lote, batch_size, n_process, nlp, hibrido, usar_cache, base, perfilar,
+                           quase_duplicados=quase_duplicados, por_tipo=por_tipo, direcionada=direcionada,
+                           prefiltro=prefiltro)}
 
 criterios_obrigatorios = {
     "INTERESSADO": True,               # deve sempre aparecer
@@ -232,26 +750,77 @@ criterios_obrigatorios = {
     "PRAZO": False                       # só aparece em notificações ou intimações
 }
 
-def validar_documento(caminho_arquivo, entidades, criterios):
+# rótulos obrigatórios de cada tipo de documento, na ordem dos padrões de extraindo_compilado.PALAVRAS_CHAVE
+# (perfis_validacao); documentos de tipo desconhecido seguem criterios_obrigatorios
+_ROTULOS_SEI = ["NUM_PROCESSO", "NUM_SEI", "ASSINATURA_ELETRONICA", "HORA_ASSINATURA", "CODIGO_VERIFICADOR", "CRC"]
+ROTULOS_POR_TIPO = [
+    _ROTULOS_SEI + ["INTERESSADO", "CNPJ"],                                      # ofício
+    _ROTULOS_SEI + ["INTERESSADO", "CNPJ", "NUM_PROC_FISC", "RELATORIO_FISC"],   # relatório de fiscalização
+    _ROTULOS_SEI + ["INTERESSADO", "ARTIGO"],                                    # parecer
+    _ROTULOS_SEI + ["INTERESSADO", "DESPACHO"],                                  # despacho
+    _ROTULOS_SEI,                                                                # memorando
+    _ROTULOS_SEI + ["ARTIGO"],                                                   # portaria
+    _ROTULOS_SEI + ["INTERESSADO"],                                              # certidão
+    _ROTULOS_SEI,                                                                # termo de cancelamento
+    ["NUM_PROCESSO", "NUM_SEI", "INTERESSADO"],   # recibo eletrônico de protocolo: gerado pelo SEI, sem assinatura
+]
+INICIO_TIPO = 500   # caracteres iniciais em que o tipo do documento é procurado
+
+@lru_cache(maxsize=None)
+def perfis_validacao() -> dict:
+    """{padrão do tipo em extraindo_compilado.PALAVRAS_CHAVE: rótulos obrigatórios} (também PERFIS_VALIDACAO)."""
+    from extraindo_compilado import PALAVRAS_CHAVE   # importado aqui: carrega o PyMuPDF
+
+    if len(PALAVRAS_CHAVE) != len(ROTULOS_POR_TIPO):
+        raise ValueError(f"ROTULOS_POR_TIPO tem {len(ROTULOS_POR_TIPO)} perfis para os "
+                         f"{len(PALAVRAS_CHAVE)} tipos de extraindo_compilado.PALAVRAS_CHAVE")
+    return dict(zip(PALAVRAS_CHAVE, ROTULOS_POR_TIPO))
+
+@lru_cache(maxsize=None)
+def _padroes_tipo():
+    return [(padrao, re.compile(padrao, re.IGNORECASE)) for padrao in perfis_validacao()]
+
+def tipo_documento(texto: str):
+    """Padrão de PALAVRAS_CHAVE do tipo que aparece primeiro no início do texto, ou None."""
+    inicio = texto[:INICIO_TIPO]
+    achados = [(m.start(), padrao) for padrao, regex in _padroes_tipo() for m in [regex.search(inicio)] if m]
+    return min(achados)[1] if achados else None
+
+def criterios_do_tipo(tipo: str) -> dict:
+    """Critérios {label: obrigatório} do perfil do tipo (padrão de PALAVRAS_CHAVE), ou criterios_obrigatorios."""
+    perfis = perfis_validacao()
+    if tipo not in perfis:
+        return criterios_obrigatorios
+    return {label: label in perfis[tipo] for label in criterios_obrigatorios}
+
+def validar_documento(caminho_arquivo, entidades, criterios, base: BaseResultados = None, texto: str = None,
+                      imprimir: bool = True, analise: str = None):
+    """
+    Confere os critérios obrigatórios e registra o resultado em `base` (resultados.py), junto com
+    as entidades e a posição de cada uma (e `analise`, as partes analisadas, se não foi o texto inteiro).
+    O relatório legível é gerado a partir da base (BaseResultados.gerar_relatorio).
+    """
     nome_processo = os.path.splitext(os.path.basename(caminho_arquivo))[0]
-    saida = os.path.join(OUTPUT_DIR, f"{nome_processo}")
 
-    resultado = {label: bool(entidades.get(label)) for label, obrigatorio in criterios.items() if obrigatorio}
+    if isinstance(entidades, Entidades):
+        presentes = entidades.presentes()   # sem recortar os textos da fonte
+    else:
+        presentes = {label for label, textos in entidades.items() if textos}
+    resultado = {label: label in presentes for label, obrigatorio in criterios.items() if obrigatorio}
     documento_ok = all(resultado.values())
 
-    print("\n🔍 Resultado da validação:")
-    for label, status in resultado.items():
-        print(f" - {label}: {' OK' if status else '❌ Faltando'}")
+    if imprimir:
+        print("\n🔍 Resultado da validação:")
+        for label, status in resultado.items():
+            print(f" - {label}: {' OK' if status else '❌ Faltando'}")
+
+        print("\n Documento completo!" if documento_ok else "\n⚠️ Documento incompleto!")
 
-    print("\n Documento completo!" if documento_ok else "\n⚠️ Documento incompleto!")
+    if base is not None:
+        base.registrar(nome_processo, entidades, resultado, texto, analise)
 
-    caminho_rel = "relatorio.txt"
-    with open(caminho_rel, "a", encoding="utf-8") as f:
-        f.write(f"\n===========================\n")
-        f.write(f"processo: {nome_processo}\n")
-        for label, status in resultado.items():
-            f.write(f" - {label} : {'✅' if status else '❌'}\n")
-        f.write(f"Status final: {'COMPLETO ✅' if documento_ok else 'INCOMPLETO ⚠️'}\n")
-        f.write(f"===============================\n")
+    return documento_ok, resultado
 
-    return documento_ok, resultado
\ No newline at end of file
+if __name__ == "__main__":
+    # etapa de build: grava os pipelines configurados em PIPELINE_DIR
+    construir_pipeline()
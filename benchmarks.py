@@ -0,0 +1,1070 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# -------------------------------------------------------------------
+# análise spaCy: sequencial x nlp.pipe com vários processos
+# -------------------------------------------------------------------
+def benchmark_processos(pasta: str = None, processos=(1, 2, 4, 8), batch_size: int = None):
+    """
+    Compara o throughput do modo em lote com 1, 2, 4 e 8 processos contra o modo sequencial.
+    Verifica que cada configuração produz exatamente as mesmas entidades.
+    """
+    import analisar_spacy
+
+    pasta = pasta or analisar_spacy.OUTPUT_DIR
+    batch_size = batch_size or analisar_spacy.BATCH_SIZE
+
+    nlp = analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    inicio = time.perf_counter()
+    referencia = {
+        documento: analisar_spacy.extrair_entidades(nlp(texto), matcher)
+        for documento, _, texto in analisar_spacy.ler_textos(pasta)
+    }
+    tempo_seq = time.perf_counter() - inicio
+    total = len(referencia)
+
+    print(f"\n📊 Throughput da análise ({total} documentos, batch_size={batch_size})")
+    print(f" - sequencial      : {tempo_seq:8.2f}s  {total / tempo_seq:8.1f} docs/s")
+
+    resultados = {"sequencial": tempo_seq}
+    for n in processos:
+        inicio = time.perf_counter()
+        saida = dict(analisar_spacy.analisar_em_lote(pasta, batch_size=batch_size, n_process=n))
+        tempo = time.perf_counter() - inicio
+        resultados[n] = tempo
+        igual = saida == referencia
+        print(f" - n_process={n:<6}: {tempo:8.2f}s  {total / tempo:8.1f} docs/s  "
+              f"(x{tempo_seq / tempo:.2f}) {'✅ idêntico' if igual else '❌ DIVERGENTE'}")
+
+    return resultados
+
+# -------------------------------------------------------------------
+# perfis do pipeline: completo x só regras
+# -------------------------------------------------------------------
+def _medir_perfil(pasta: str):
+    """Executado em subprocesso: mede latência e memória do perfil em ANALISAR_PERFIL."""
+    import analisar_spacy
+
+    nlp = analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    entidades, latencias = {}, []
+    for documento, _, texto in analisar_spacy.ler_textos(pasta):
+        inicio = time.perf_counter()
+        entidades[documento] = analisar_spacy.extrair_entidades(nlp(texto), matcher)
+        latencias.append(time.perf_counter() - inicio)
+
+    print(json.dumps({
+        "latencia_ms": 1000 * sum(latencias) / max(len(latencias), 1),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "entidades": entidades,
+    }))
+
+def _executar_isolado(codigo: str, env: dict = None):
+    """Roda `codigo` num interpretador novo (memória limpa) e devolve o JSON da última linha."""
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+        env={**os.environ, **(env or {})}, cwd=os.getcwd(),
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def benchmark_perfis(pasta: str = None, perfis=("completo", "regras")):
+    """Compara latência por documento, memória residente e resultado de cada perfil do pipeline."""
+    import analisar_spacy
+
+    pasta = pasta or analisar_spacy.OUTPUT_DIR
+    for perfil in perfis:
+        if perfil != "completo":
+            analisar_spacy.verificar_perfil(perfil)
+
+    medicoes = {}
+    for perfil in perfis:
+        codigo = f"import benchmarks; benchmarks._medir_perfil({pasta!r})"
+        medicoes[perfil] = _executar_isolado(codigo, {"ANALISAR_PERFIL": perfil})
+
+    referencia = medicoes[perfis[0]]
+    print(f"\n📊 Perfis do pipeline ({len(referencia['entidades'])} documentos)")
+    for perfil, m in medicoes.items():
+        igual = m["entidades"] == referencia["entidades"]
+        print(f" - {perfil:<10}: {m['latencia_ms']:8.2f} ms/doc  pico RSS {m['rss_mb']:8.1f} MB  "
+              f"{'✅ idêntico' if igual else '❌ DIVERGENTE'} a {perfis[0]!r}")
+    return medicoes
+
+# -------------------------------------------------------------------
+# inicialização: carga na importação x carga sob demanda + artefato
+# -------------------------------------------------------------------
+def _medir_inicializacao(modo: str, pasta: str):
+    """Executado em subprocesso: tempo de importação e latência até o primeiro documento."""
+    inicio = time.perf_counter()
+    import analisar_spacy
+    t_import = time.perf_counter() - inicio
+
+    texto = next(analisar_spacy.ler_textos(pasta))[2]
+    inicio = time.perf_counter()
+    if modo == "antes":
+        # comportamento anterior: modelo montado a partir do pacote (antes, já na importação)
+        nlp = analisar_spacy.carregar_pipeline()
+    else:
+        nlp = analisar_spacy.obter_pipeline()
+    analisar_spacy.extrair_entidades(nlp(texto), analisar_spacy.criar_matcher(nlp))
+    t_primeiro = time.perf_counter() - inicio
+
+    print(json.dumps({"import_s": t_import, "primeiro_doc_s": t_primeiro}))
+
+def benchmark_inicializacao(pasta: str = None):
+    """Compara importação + primeiro documento entre a carga eager antiga e a carga lazy com artefato."""
+    import analisar_spacy
+
+    pasta = pasta or analisar_spacy.OUTPUT_DIR
+    if not os.path.isdir(os.path.join(analisar_spacy.PIPELINE_DIR, analisar_spacy.PERFIL_PIPELINE)):
+        _executar_isolado(
+            "import analisar_spacy, json; analisar_spacy.construir_pipeline(); print(json.dumps(None))"
+        )
+
+    print(f"\n📊 Inicialização ({analisar_spacy.PERFIL_PIPELINE!r})")
+    medicoes = {}
+    for modo in ("antes", "depois"):
+        m = _executar_isolado(f"import benchmarks; benchmarks._medir_inicializacao({modo!r}, {pasta!r})")
+        medicoes[modo] = m
+        if modo == "antes":
+            # a carga do modelo acontecia dentro do import
+            print(f" - antes : import {m['import_s'] + m['primeiro_doc_s']:6.2f}s "
+                  f"(modelo carregado na importação)")
+        else:
+            print(f" - depois: import {m['import_s']:6.2f}s  primeiro documento {m['primeiro_doc_s']:6.2f}s "
+                  f"(artefato em {analisar_spacy.PIPELINE_DIR})")
+    return medicoes
+
+# -------------------------------------------------------------------
+# extração: concorrência contra o servidor Gemini falso (sem rede)
+# -------------------------------------------------------------------
+def _pdfs_ficticios(pasta: str, quantidade: int):
+    """Arquivos .pdf com conteúdo aleatório (só para o backend: o servidor falso usa o hash dos bytes)."""
+    os.makedirs(pasta, exist_ok=True)
+    for i in range(quantidade):
+        with open(os.path.join(pasta, f"doc_{i:04d}.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4\n" + os.urandom(2048))
+
+def _conferir_saida(entrada: str, saida: str, resultado: dict):
+    """Todo .txt gravado tem o texto esperado; nenhum PDF que falhou gerou arquivo."""
+    from servidor_gemini_falso import texto_esperado
+
+    gravados = set(os.listdir(saida))
+    for arquivo in resultado["ok"]:
+        with open(os.path.join(entrada, arquivo), "rb") as f:
+            esperado = texto_esperado(arquivo, f.read())
+        with open(os.path.join(saida, os.path.splitext(arquivo)[0] + ".txt"), encoding="utf-8") as f:
+            if f.read() != esperado:
+                return False
+    falhas_gravadas = {os.path.splitext(a)[0] + ".txt" for a in resultado["falhas"]} & gravados
+    return not falhas_gravadas and len(gravados) == len(resultado["ok"])
+
+def benchmark_extracao(quantidade: int = 40, concorrencias=(1, 4, 8, 16), latencia: float = 0.2):
+    """
+    Mede PDFs/s de processar_pdfs com várias concorrências contra o servidor falso
+    e confere o tratamento de falhas (429/503 e respostas vazias).
+    """
+    import shutil
+    import tempfile
+    import extrair_texto
+    from servidor_gemini_falso import ServidorGeminiFalso
+
+    base = tempfile.mkdtemp(prefix="bench_extracao_")
+    entrada = os.path.join(base, "pdfs")
+    _pdfs_ficticios(entrada, quantidade)
+    try:
+        print(f"\n📊 Extração concorrente ({quantidade} PDFs, latência simulada {latencia * 1000:.0f} ms)")
+        with ServidorGeminiFalso(latencia=latencia) as servidor:
+            backend = extrair_texto.BackendHTTP(servidor.url)
+            for n in concorrencias:
+                saida = os.path.join(base, f"txt_{n}")
+                inicio = time.perf_counter()
+                resultado = extrair_texto.processar_pdfs(entrada, saida, backend=backend, concorrencia=n,
+                                                         requisicoes_por_segundo=1000, rajada=n, hibrido=False,
+                                                         usar_cache=False)
+                tempo = time.perf_counter() - inicio
+                print(f" - concorrência {n:<3}: {tempo:6.2f}s  {quantidade / tempo:6.1f} PDFs/s  "
+                      f"{'✅' if _conferir_saida(entrada, saida, resultado) else '❌'}")
+
+        cenarios = [
+            ("erros transitórios + novas tentativas", dict(taxa_falhas=0.3, taxa_vazias=0.1), 6),
+            ("erros transitórios sem novas tentativas", dict(taxa_falhas=0.3, taxa_vazias=0.1), 1),
+            ("cota de concorrência (429)", dict(limite_concorrencia=2), 6),
+        ]
+        print("\n🧪 Falhas")
+        for nome, opcoes, tentativas in cenarios:
+            saida = os.path.join(base, f"txt_falhas_{tentativas}_{len(opcoes)}")
+            with ServidorGeminiFalso(latencia=0.02, semente=1, **opcoes) as servidor:
+                resultado = extrair_texto.processar_pdfs(
+                    entrada, saida, backend=extrair_texto.BackendHTTP(servidor.url), concorrencia=8,
+                    requisicoes_por_segundo=200, rajada=8, tentativas=tentativas, espera_base=0.01, hibrido=False, usar_cache=False,
+                )
+                print(f" - {nome}: {len(resultado['ok'])} ok, {len(resultado['falhas'])} falhas, "
+                      f"{servidor.estatisticas['requisicoes']} requisições  "
+                      f"{'✅ sem saída vazia' if _conferir_saida(entrada, saida, resultado) else '❌'}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+# -------------------------------------------------------------------
+# detecção de inícios: sequencial x páginas em paralelo
+# -------------------------------------------------------------------
+CABECALHOS_SINTETICOS = [
+    "OFÍCIO Nº 123/2020/SEI", "RELATÓRIO DE FISCALIZAÇÃO Nº 45", "PARECER Nº 10/2021", "DESPACHO",
+    "MEMORANDO Nº 7", "PORTARIA Nº 99", "CERTIDÃO DE INTIMAÇÃO", "TERMO DE CANCELAMENTO DE DOCUMENTO",
+    "RECIBO ELETRÔNICO DE PROTOCOLO - SEI",
+]
+
+def pdf_compilado_sintetico(caminho: str, paginas: int = 2000, semente: int = 0):
+    """
+    PDF no formato de uma compilação do SEI: documentos de 1 a 6 páginas, cabeçalho na primeira,
+    linhas de rodapé/endereço e, às vezes, o mesmo tipo repetido na página seguinte.
+    """
+    import random
+    import fitz
+
+    sorteio = random.Random(semente)
+    doc = fitz.open()
+    while len(doc) < paginas:
+        cabecalho = sorteio.choice(CABECALHOS_SINTETICOS)
+        for n in range(sorteio.randint(1, 6)):
+            linhas = ["AGÊNCIA NACIONAL DE TELECOMUNICAÇÕES", "SAUS Quadra 06, Bloco H - Brasília/DF - CEP 70070-940"]
+            if n == 0 or sorteio.random() < 0.1:
+                linhas.append(cabecalho)
+            linhas += [f"{sorteio.randint(1, 9)} - Trata-se de processo administrativo em andamento."] * 2
+            linhas += ["Texto do documento com menção ao despacho anterior e ao parecer técnico."] * 20
+            pagina = doc.new_page()
+            pagina.insert_text((50, 60), "\n".join(linhas), fontsize=9)
+            if len(doc) >= paginas:
+                break
+    doc.save(caminho)
+    doc.close()
+
+def benchmark_deteccao(paginas: int = 2000, processos=(1, 2, 4, 8)):
+    """Compara detectar_inicios_debug com detectar_inicios em 1..N processos num PDF sintético."""
+    import shutil
+    import tempfile
+    import extraindo_compilado
+
+    base = tempfile.mkdtemp(prefix="bench_deteccao_")
+    caminho = os.path.join(base, "compilado.pdf")
+    pdf_compilado_sintetico(caminho, paginas)
+    cwd = os.getcwd()
+    try:
+        os.chdir(base)   # o modo debug grava o log no diretório atual
+        inicio = time.perf_counter()
+        referencia = extraindo_compilado.detectar_inicios_debug(caminho)
+        tempo_ref = time.perf_counter() - inicio
+    finally:
+        os.chdir(cwd)
+
+    print(f"\n📊 Detecção de inícios ({paginas} páginas, {len(referencia)} documentos)")
+    print(f" - sequencial (debug): {tempo_ref:6.2f}s  {paginas / tempo_ref:8.0f} págs/s")
+    try:
+        for n in processos:
+            inicio = time.perf_counter()
+            inicios = extraindo_compilado.detectar_inicios(caminho, processos=n)
+            tempo = time.perf_counter() - inicio
+            print(f" - processos={n:<8}: {tempo:6.2f}s  {paginas / tempo:8.0f} págs/s  (x{tempo_ref / tempo:.2f}) "
+                  f"{'✅ idêntico' if inicios == referencia else '❌ DIVERGENTE'}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+def benchmark_log_deteccao(paginas: int = 2000):
+    """Custo do log da detecção: desligado, só decisões (DEBUG + JSONL) e rastreio linha a linha (TRACE)."""
+    import glob
+    import logging
+    import shutil
+    import tempfile
+    import extraindo_compilado
+
+    base = tempfile.mkdtemp(prefix="bench_log_")
+    caminho = os.path.join(base, "compilado.pdf")
+    pdf_compilado_sintetico(caminho, paginas)
+    cwd = os.getcwd()
+    os.chdir(base)
+    try:
+        extraindo_compilado.detectar_inicios(caminho, processos=1)   # aquecimento
+        inicio = time.perf_counter()
+        referencia = extraindo_compilado.detectar_inicios(caminho, processos=1)
+        medicoes = [("log desligado", time.perf_counter() - inicio, referencia, 0)]
+        for nome, nivel in (("DEBUG + JSONL", logging.DEBUG), ("TRACE + JSONL", extraindo_compilado.TRACE)):
+            for arquivo in glob.glob("log_deteccao_*"):
+                os.remove(arquivo)
+            inicio = time.perf_counter()
+            inicios = extraindo_compilado.detectar_inicios_debug(caminho, nivel=nivel)
+            tempo = time.perf_counter() - inicio
+            tamanho = sum(os.path.getsize(a) for a in glob.glob("log_deteccao_*"))
+            medicoes.append((nome, tempo, inicios, tamanho))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(base, ignore_errors=True)
+
+    print(f"\n📊 Log da detecção ({paginas} páginas)")
+    for nome, tempo, inicios, tamanho in medicoes:
+        print(f" - {nome:<14}: {tempo:6.2f}s  {1000 * tempo / paginas * 1000:8.1f} ms / 1.000 págs  "
+              f"{tamanho / 1024:8.0f} KiB de log  {'✅' if inicios == referencia else '❌ DIVERGENTE'}")
+    return medicoes
+
+# -------------------------------------------------------------------
+# classificação de linhas: três normalizações + laços de regex x uma passada
+# -------------------------------------------------------------------
+def _classificador_antes():
+    """
+    Como limpar_linhas, parece_cabecalho e o laço do detector classificavam uma linha
+    antes de classificar_linha: função linha -> (linha útil?, rótulo aceito ou None).
+    """
+    import re
+    from extraindo_compilado import (strip_accents, rotulo_padrao, compiled_patterns, LINHAS_IRRELEVANTES_NORM,
+                                     PADROES_SECAO_NORM, MAX_OFFSET, MAX_LINE_LEN)
+
+    def parece_cabecalho(linha):
+        linha_stripped = linha.strip()
+        if len(linha_stripped) < 5:
+            return False
+        linha_norm = strip_accents(linha_stripped.upper())
+        return not any(pat.search(linha_norm) for pat in PADROES_SECAO_NORM)
+
+    def classificar(linha):
+        limpa = linha.strip()
+        if not limpa:
+            return False, None
+        norm = strip_accents(limpa.upper())
+        if any(re.search(p, norm) for p in LINHAS_IRRELEVANTES_NORM):
+            return False, None
+        linha_norm = strip_accents(limpa).upper()
+        for orig_pattern, comp_pat in compiled_patterns:
+            m = comp_pat.search(linha_norm)
+            if not m:
+                continue
+            if m.start() > MAX_OFFSET or len(linha_norm) > MAX_LINE_LEN or not parece_cabecalho(limpa):
+                continue
+            return True, rotulo_padrao(orig_pattern)
+        return True, None
+
+    return classificar
+
+def linhas_sinteticas(quantidade: int = 20000, semente: int = 0):
+    """Linhas de topo de página do SEI, com acentos, seções, rodapés e cabeçalhos deslocados."""
+    import random
+
+    sorteio = random.Random(semente)
+    modelos = CABECALHOS_SINTETICOS + [
+        "AGÊNCIA NACIONAL DE TELECOMUNICAÇÕES", "SAUS Quadra 06, Bloco H - Brasília/DF - CEP 70070-940",
+        "www.anatel.gov.br", "Telefone: (61) 2312-2000", "Referência: Processo nº 53500.053021/2018-91",
+        "Anexos: I - Relatório", "1 - Trata-se de processo administrativo.", "II - DA ANÁLISE",
+        "a) vide despacho anterior", "Ao Senhor Gerente, em referência ao DESPACHO nº 12",
+        "Texto do documento com menção ao parecer técnico e ao ofício circular enviado pela área responsável.",
+        "   ", "Ofício-Circular nº 3", "Nº 10 DESPACHO", "CERTIDÃO DE JULGAMENTO", "ᾳ DESPACHO ᾼ",
+    ]
+    return [(" " * sorteio.randint(0, 3)) + sorteio.choice(modelos) + (" " * sorteio.randint(0, 12))
+            for _ in range(quantidade)]
+
+def benchmark_classificador_linhas(quantidade: int = 20000):
+    """Custo por linha: classificação antiga x classificar_linha (e confere que o resultado é o mesmo)."""
+    import extraindo_compilado
+
+    linhas = linhas_sinteticas(quantidade)
+
+    def nova(linha):
+        c = extraindo_compilado.classificar_linha(linha)
+        if c is None or c.irrelevante:
+            return False, None
+        return True, c.rotulo
+
+    print(f"\n📊 Classificação de linhas ({quantidade} linhas)")
+    medicoes = {}
+    for nome, funcao in (("antes", _classificador_antes()), ("uma passada", nova)):
+        funcao(linhas[0])   # compila os regex fora da medição
+        inicio = time.perf_counter()
+        medicoes[nome] = [funcao(linha) for linha in linhas]
+        tempo = time.perf_counter() - inicio
+        print(f" - {nome:<12}: {1e6 * tempo / quantidade:6.2f} µs/linha")
+    print(f" - resultado  : {'✅ idêntico' if medicoes['antes'] == medicoes['uma passada'] else '❌ DIVERGENTE'}")
+    return medicoes
+
+def _separar_antes(pdf_path: str, inicios, output_dir: str):
+    """Laço anterior de separar_documentos (um insert_pdf por página, salvamento sequencial), sem prints."""
+    import fitz
+    from extraindo_compilado import sanitize_filename
+
+    doc_origem = fitz.open(pdf_path)
+    for i, (pg, tipo) in enumerate(inicios):
+        end_page = inicios[i + 1][0] if i + 1 < len(inicios) else len(doc_origem)
+        novo_pdf = fitz.open()
+        for page_num in range(pg, end_page):
+            novo_pdf.insert_pdf(doc_origem, from_page=page_num, to_page=page_num)
+        nome_tipo = sanitize_filename(tipo.replace(" ", "_").replace("(", "").replace(")", ""))
+        novo_pdf.save(os.path.join(output_dir, f"{i+1:02d}_{nome_tipo or 'SEM_TIPO'}.pdf"), garbage=0, deflate=True)
+        novo_pdf.close()
+    doc_origem.close()
+
+def _textos_pdfs(pasta: str):
+    import fitz
+
+    textos = {}
+    for nome in sorted(os.listdir(pasta)):
+        with fitz.open(os.path.join(pasta, nome)) as doc:
+            textos[nome] = [pagina.get_text() for pagina in doc]
+    return textos
+
+def benchmark_separacao(paginas: int = 2000, processos=(1, 2, 4, 8)):
+    """Separação de um compilado sintético: laço página a página anterior x intervalos em 1..N processos."""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    import extraindo_compilado
+
+    base = tempfile.mkdtemp(prefix="bench_separacao_")
+    caminho = os.path.join(base, "compilado.pdf")
+    saida = os.path.join(base, "documentos_separados")
+    try:
+        pdf_compilado_sintetico(caminho, paginas)
+        inicios = extraindo_compilado.detectar_inicios(caminho, processos=1)
+        referencia_dir = os.path.join(base, "antes")
+        os.makedirs(referencia_dir)
+        inicio = time.perf_counter()
+        _separar_antes(caminho, inicios, referencia_dir)
+        tempo_ref = time.perf_counter() - inicio
+        referencia = _textos_pdfs(referencia_dir)
+
+        print(f"\n📊 Separação de documentos ({paginas} páginas, {len(inicios)} documentos)")
+        print(f" - antes (página a página): {tempo_ref:6.2f}s  {paginas / tempo_ref:8.0f} págs/s")
+        for n in processos:
+            shutil.rmtree(saida, ignore_errors=True)
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                extraindo_compilado.separar_documentos(caminho, inicios, processos=n)
+            tempo = time.perf_counter() - inicio
+            print(f" - processos={n:<13}: {tempo:6.2f}s  {paginas / tempo:8.0f} págs/s  (x{tempo_ref / tempo:.2f}) "
+                  f"{'✅ idêntico' if _textos_pdfs(saida) == referencia else '❌ DIVERGENTE'}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+def _relatorio_antes(caminho: str, nome_processo: str, resultado: dict):
+    """Gravação anterior de validar_documento: um open/append por documento em relatorio.txt."""
+    documento_ok = all(resultado.values())
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(f"\n===========================\n")
+        f.write(f"processo: {nome_processo}\n")
+        for label, status in resultado.items():
+            f.write(f" - {label} : {'✅' if status else '❌'}\n")
+        f.write(f"Status final: {'COMPLETO ✅' if documento_ok else 'INCOMPLETO ⚠️'}\n")
+        f.write(f"===============================\n")
+
+def benchmark_resultados(documentos: int = 20000, semente: int = 0):
+    """relatorio.txt por append x BaseResultados em lotes, e consultas na base (com índices)."""
+    import random
+    import shutil
+    import tempfile
+    from analisar_spacy import criterios_obrigatorios
+    from entidades import Entidades
+    from resultados import BaseResultados
+
+    sorteio = random.Random(semente)
+    obrigatorios = [label for label, obrigatorio in criterios_obrigatorios.items() if obrigatorio]
+    casos = []
+    for n in range(documentos):
+        entidades = {label: [f"{label} {n}"] if sorteio.random() < 0.9 else [] for label in criterios_obrigatorios}
+        entidades["NUM_PROCESSO"] = [f"53500.{n:06d}/2018-91"]
+        texto = " ".join(t for textos in entidades.values() for t in textos)
+        spans, inicio = [], 0
+        for label, textos in entidades.items():
+            for trecho in textos:
+                spans.append(("ents", label, inicio, inicio + len(trecho)))
+                inicio += len(trecho) + 1
+        resultado = {label: bool(entidades[label]) for label in obrigatorios}
+        casos.append((f"doc_{n:06d}", Entidades.de_spans(spans), resultado, texto))
+
+    base_dir = tempfile.mkdtemp(prefix="bench_resultados_")
+    try:
+        inicio = time.perf_counter()
+        for processo, _, resultado, _ in casos:
+            _relatorio_antes(os.path.join(base_dir, "relatorio_antes.txt"), processo, resultado)
+        tempo_antes = time.perf_counter() - inicio
+
+        base = BaseResultados(os.path.join(base_dir, "resultados.sqlite"))
+        inicio = time.perf_counter()
+        for processo, entidades, resultado, texto in casos:
+            base.registrar(processo, entidades, resultado, texto)
+        base.gravar()
+        tempo_base = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        relatorio = base.gerar_relatorio(os.path.join(base_dir, "relatorio.txt"))
+        tempo_relatorio = time.perf_counter() - inicio
+        with open(relatorio, encoding="utf-8") as a, open(os.path.join(base_dir, "relatorio_antes.txt"),
+                                                          encoding="utf-8") as b:
+            igual = a.read() == b.read()
+
+        consultas = {
+            "faltando ASSINATURA_ELETRONICA (7 dias)":
+                lambda: base.faltando("ASSINATURA_ELETRONICA", desde=time.time() - 7 * 86400),
+            "documentos incompletos": lambda: base.documentos(completo=False),
+            "por número de processo": lambda: base.documentos(num_processo=f"53500.{documentos // 2:06d}/2018-91"),
+        }
+        print(f"\n📊 Resultados da validação ({documentos} documentos)")
+        print(f" - relatorio.txt (append por documento): {tempo_antes:6.2f}s  {documentos / tempo_antes:8.0f} docs/s")
+        print(f" - BaseResultados (lotes de {base.commit_a_cada}):  {tempo_base:6.2f}s  {documentos / tempo_base:8.0f} docs/s "
+              f"(com entidades e posições)")
+        print(f" - relatório gerado da base:          {tempo_relatorio:6.2f}s  "
+              f"{'✅ idêntico ao antigo' if igual else '❌ DIVERGENTE'}")
+        for nome, consulta in consultas.items():
+            inicio = time.perf_counter()
+            linhas = consulta()
+            print(f" - {nome:<38}: {(time.perf_counter() - inicio) * 1000:7.1f} ms  ({len(linhas)} linhas)")
+        base.fechar()
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+def benchmark_regiao_cabecalho(paginas: int = 2000, regioes=(0.15, 0.25, 0.35)):
+    """Relatório de extraindo_compilado.comparar_regiao_cabecalho num PDF sintético."""
+    import shutil
+    import tempfile
+    import extraindo_compilado
+
+    base = tempfile.mkdtemp(prefix="bench_regiao_")
+    caminho = os.path.join(base, "compilado.pdf")
+    try:
+        pdf_compilado_sintetico(caminho, paginas)
+        return extraindo_compilado.comparar_regiao_cabecalho(caminho, regioes)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def benchmark_servico(documentos: int = 200, clientes=(1, 16), esperas=(0.0, 0.01, 0.05), semente: int = 0):
+    """
+    servico_analise.ServicoAnalise com o modelo já carregado: vazão, latência p50/p99 e lote médio
+    para clientes enviando um documento por vez, com várias esperas máximas de micro-lote.
+    Para comparação, o custo de carregar o pipeline (pago a cada execução do main.py).
+    """
+    import shutil
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    import corpus_sintetico
+    import analisar_spacy
+    from servico_analise import ServicoAnalise, enviar
+
+    carga = _executar_isolado(
+        "import time, json, analisar_spacy; t = time.perf_counter(); analisar_spacy.obter_pipeline(); "
+        "print(json.dumps(time.perf_counter() - t))")
+    pasta = tempfile.mkdtemp(prefix="bench_servico_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, documentos, semente)
+        textos = [(documento, texto) for documento, _, texto in analisar_spacy.ler_textos(pasta)]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    nlp = analisar_spacy.obter_pipeline()
+
+    print(f"\n📊 Serviço de análise ({documentos} documentos; carga do pipeline por execução: {carga:.1f}s)")
+    print(f" {'clientes':>8} {'espera ms':>9} {'docs/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'lote médio':>10}")
+    for n in clientes:
+        for espera in esperas:
+            with ServicoAnalise(nlp=nlp, porta=0, espera_maxima=espera) as servico:
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(n) as executor:
+                    list(executor.map(lambda par: enviar(servico.url, par[1], par[0]), textos))
+                tempo = time.perf_counter() - inicio
+                m = servico.metricas()
+            print(f" {n:>8} {1000 * espera:>9.0f} {documentos / tempo:>8.1f} {m['latencia_p50_ms']:>8.1f} "
+                  f"{m['latencia_p99_ms']:>8.1f} {m['lote_medio']:>10.1f}")
+
+def _medir_longo(modo: str, pasta: str, caracteres: int):
+    """Executado em subprocesso: pico de RSS e tempo da análise de um texto de `caracteres` caracteres."""
+    import analisar_spacy
+
+    nlp = analisar_spacy.obter_pipeline()
+    partes, total = [], 0
+    while total < caracteres:
+        for _, _, texto in analisar_spacy.ler_textos(pasta):
+            partes.append(texto)
+            total += len(texto) + 1
+    texto = " ".join(partes)[:caracteres]
+    del partes
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    inicio = time.perf_counter()
+    if modo == "inteiro":
+        nlp.max_length = len(texto) + 1
+        entidades = analisar_spacy.extrair_entidades(nlp(texto), analisar_spacy.criar_matcher(nlp))
+    else:
+        _, spans = analisar_spacy.criar_extrator(nlp, spans=True)
+        entidades = analisar_spacy.entidades_de_spans(texto, analisar_spacy.analisar_longo(texto, nlp, spans))
+    print(json.dumps({"segundos": time.perf_counter() - inicio, "rss_antes": rss_antes,
+                      "rss_pico": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                      "entidades": sum(len(v) for v in entidades.values())}))
+
+def benchmark_documentos_longos(tamanhos=(250_000, 500_000, 1_000_000), semente: int = 0):
+    """Documento inteiro num Doc só (max_length aumentado) x analisar_longo em trechos: tempo e pico de RSS."""
+    import shutil
+    import tempfile
+    import corpus_sintetico
+    import analisar_spacy
+
+    pasta = tempfile.mkdtemp(prefix="bench_longos_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, 200, semente)
+        print(f"\n📊 Documentos longos (trechos de {analisar_spacy.TAMANHO_TRECHO} caracteres)")
+        print(f" {'caracteres':>10} {'modo':<8} {'tempo':>7} {'RSS +MB':>8} {'entidades':>9}")
+        for caracteres in tamanhos:
+            for modo in ("inteiro", "trechos"):
+                r = _executar_isolado(f"import benchmarks; benchmarks._medir_longo({modo!r}, {pasta!r}, {caracteres})")
+                print(f" {caracteres:>10} {modo:<8} {r['segundos']:>6.2f}s {r['rss_pico'] - r['rss_antes']:>8.1f} "
+                      f"{r['entidades']:>9}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+def _medir_entidades(pasta: str, documentos: int):
+    """Executado em subprocesso: memória retida pelos resultados de `documentos` documentos em cada forma."""
+    import gc
+    import tracemalloc
+    import analisar_spacy
+    from entidades import Entidades
+
+    nlp = analisar_spacy.obter_pipeline()
+    _, extrair_spans = analisar_spacy.criar_extrator(nlp, spans=True)
+    amostra = [(caminho, texto, extrair_spans(nlp(texto))) for _, caminho, texto in analisar_spacy.ler_textos(pasta)]
+
+    medidas = {}
+    for modo in ("dicionarios", "compacto"):
+        gc.collect()
+        tracemalloc.start()
+        resultados = {}
+        for n in range(documentos):
+            caminho, texto, spans = amostra[n % len(amostra)]
+            if modo == "dicionarios":
+                # o que analisar_textos guardava: um dict com uma lista por rótulo e cópias dos trechos
+                resultados[f"sei_{n:06d}.txt"] = analisar_spacy.entidades_de_spans(texto, spans)
+            else:
+                resultados[f"sei_{n:06d}.txt"] = Entidades.de_spans(spans, fonte=f"{caminho}.{n}")
+        medidas[modo] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del resultados
+    medidas["entidades_por_documento"] = sum(len(s) for _, _, s in amostra) / len(amostra)
+    print(json.dumps(medidas))
+
+def benchmark_entidades_compactas(documentos: int = 100_000, semente: int = 0):
+    """Memória dos resultados de analisar_textos: {label: [textos]} x entidades.Entidades, por 100 mil documentos."""
+    import shutil
+    import tempfile
+    import corpus_sintetico
+
+    pasta = tempfile.mkdtemp(prefix="bench_entidades_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, 200, semente)
+        r = _executar_isolado(f"import benchmarks; benchmarks._medir_entidades({pasta!r}, {documentos})")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    escala = 100_000 / documentos
+    print(f"\n📊 Resultados em memória ({documentos} documentos, {r['entidades_por_documento']:.1f} entidades/doc)")
+    for modo in ("dicionarios", "compacto"):
+        print(f" - {modo:<12} {r[modo] * escala / 2**20:8.1f} MB por 100 mil documentos "
+              f"({r[modo] / documentos:6.0f} bytes/doc)")
+    print(f" - redução: {r['dicionarios'] / r['compacto']:.1f}x")
+
+def benchmark_quase_duplicados(documentos: int = 1000, fracao_modelos: float = 0.7, semente: int = 0):
+    """
+    Corpus com `fracao_modelos` de documentos padronizados: análise completa de cada documento x
+    quase_duplicados.IndiceModelos. Confere que as entidades são as mesmas em todos os documentos.
+    """
+    import shutil
+    import tempfile
+    import corpus_sintetico
+    import analisar_spacy
+    from quase_duplicados import IndiceModelos
+
+    pasta = tempfile.mkdtemp(prefix="bench_quase_dup_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, documentos, semente, fracao_modelos=fracao_modelos)
+        textos = [(documento, texto) for documento, _, texto in analisar_spacy.ler_textos(pasta)]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    nlp = analisar_spacy.obter_pipeline()
+
+    inicio = time.perf_counter()
+    completos = dict(analisar_spacy.analisar_entradas(textos, nlp=nlp))
+    tempo_completo = time.perf_counter() - inicio
+
+    indice = IndiceModelos()
+    inicio = time.perf_counter()
+    derivados = dict(analisar_spacy.analisar_entradas(textos, nlp=nlp, indice_modelos=indice))
+    tempo_indice = time.perf_counter() - inicio
+
+    divergentes = [documento for documento in completos if completos[documento] != derivados[documento]]
+    r = indice.resumo()
+    print(f"\n📊 Quase-duplicados ({documentos} documentos, {fracao_modelos:.0%} padronizados)")
+    print(f" - análise completa: {tempo_completo:6.2f}s ({documentos / tempo_completo:6.1f} docs/s)")
+    print(f" - com modelos:      {tempo_indice:6.2f}s ({documentos / tempo_indice:6.1f} docs/s), "
+          f"{r['modelos']} modelo(s), {r['fracao_derivados']:.0%} derivados, "
+          f"{r['fracao_reanalisada']:.0%} do texto reanalisado")
+    print(f" - tempo economizado: {tempo_completo - tempo_indice:.2f}s medido, "
+          f"{r['tempo_economizado']:.2f}s estimado pelo índice")
+    print(f" - {'✅ mesmas entidades em todos os documentos' if not divergentes else f'❌ {len(divergentes)} divergente(s): ' + ', '.join(divergentes[:5])}")
+
+def benchmark_validacao_direcionada(documentos: int = 500, paragrafos: int = 60, semente: int = 0):
+    """
+    Validação pelo perfil do tipo com a análise completa x validacao_direcionada.VarreduraDirecionada
+    (cabeçalho e rodapé primeiro): latência por documento e conferência do resultado da validação.
+    """
+    import shutil
+    import tempfile
+    import corpus_sintetico
+    import analisar_spacy
+    from validacao_direcionada import VarreduraDirecionada, _percentil
+
+    pasta = tempfile.mkdtemp(prefix="bench_direcionada_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, documentos, semente, paragrafos=paragrafos)
+        textos = [(documento, texto) for documento, _, texto in analisar_spacy.ler_textos(pasta)]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    nlp = analisar_spacy.obter_pipeline()
+    criterios = {documento: analisar_spacy.criterios_do_tipo(analisar_spacy.tipo_documento(texto))
+                 for documento, texto in textos}
+
+    def validar(analises):
+        latencias, resultados = [], {}
+        inicio = time.perf_counter()
+        for documento, entidades in analises:
+            _, resultados[documento] = analisar_spacy.validar_documento(documento, entidades, criterios[documento],
+                                                                        imprimir=False)
+            agora = time.perf_counter()
+            latencias.append(agora - inicio)
+            inicio = agora
+        return latencias, resultados
+
+    latencias_completa, completos = validar(analisar_spacy.analisar_entradas(textos, nlp=nlp))
+    varredura = VarreduraDirecionada()
+    latencias_direcionada, direcionados = validar(analisar_spacy.analisar_entradas(textos, nlp=nlp,
+                                                                                   direcionada=varredura))
+    divergentes = [documento for documento in completos if completos[documento] != direcionados[documento]]
+    r = varredura.resumo()
+    media = sum(len(texto) for _, texto in textos) / len(textos)
+    print(f"\n📊 Validação por tipo ({len(textos)} documentos, {media:.0f} caracteres em média)")
+    for nome, latencias in (("completa", latencias_completa), ("direcionada", latencias_direcionada)):
+        print(f" - {nome:<12} {sum(latencias):6.2f}s  p50 {1000 * _percentil(latencias, 0.5):6.1f} ms  "
+              f"p95 {1000 * _percentil(latencias, 0.95):6.1f} ms por documento")
+    print(f" - texto analisado na direcionada: {r['fracao_analisada']:.0%}; modos: " +
+          ", ".join(f"{modo} {m['documentos']}" for modo, m in r["modos"].items()))
+    print(f" - {'✅ mesmo resultado da validação em todos os documentos' if not divergentes else f'❌ {len(divergentes)} divergente(s): ' + ', '.join(divergentes[:5])}")
+
+def benchmark_fila_trabalho(documentos: int = 300, compilados: int = 2, processos=(1, 2, 4),
+                            latencia_remota: float = 0.05, semente: int = 0):
+    """
+    fila_trabalho.py com `compilados` PDFs sintéticos e 1, 2, 4... trabalhadores: docs/s por etapa e conferência
+    de que cada documento foi analisado e registrado uma única vez na execução do trabalho.
+    """
+    import io
+    import sqlite3
+    import shutil
+    import tempfile
+    import contextlib
+    import corpus_sintetico
+    import extrair_texto
+    import fila_trabalho
+    from servidor_gemini_falso import ServidorGeminiFalso
+
+    base_dir = tempfile.mkdtemp(prefix="bench_fila_")
+    try:
+        pdfs = []
+        for n in range(compilados):
+            pdfs.append(os.path.join(base_dir, f"compilado_{n}.pdf"))
+            corpus_sintetico.gerar_compilado(pdfs[-1], documentos // compilados, semente + n, fracao_digitalizada=0.05)
+        print(f"\n📊 Fila de trabalho ({len(pdfs)} compilados, {documentos} documentos)")
+        print(f" {'processos':>9} {'tempo':>7} {'texto/s':>8} {'análise/s':>9} {'registrados':>11}")
+        with ServidorGeminiFalso(latencia=latencia_remota) as servidor:
+            for n in processos:
+                pasta = os.path.join(base_dir, f"trabalho_{n}")
+                fila = fila_trabalho.FilaTrabalho(pasta)
+                fila.adicionar(pdfs)
+                fila.fechar()
+                inicio = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    progresso = fila_trabalho.trabalhar(pasta, n, backend=extrair_texto.BackendHTTP(servidor.url),
+                                                        usar_cache=False)
+                tempo = time.perf_counter() - inicio
+                with sqlite3.connect(os.path.join(pasta, fila_trabalho.RESULTADOS)) as conn:
+                    registros, distintos = conn.execute("SELECT COUNT(*), COUNT(DISTINCT processo) "
+                                                        "FROM documentos").fetchone()
+                ok = registros == distintos == progresso["analise"]["total"] and not progresso["analise"]["falhou"]
+                print(f" {n:>9} {tempo:>6.1f}s {progresso['texto']['por_segundo']:>8.1f} "
+                      f"{progresso['analise']['por_segundo']:>9.1f} {registros:>7}/{distintos:<4}{'✅' if ok else '❌'}")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+def benchmark_prefiltro_ancoras(documentos: int = 300, tamanhos=(250_000, 1_000_000), semente: int = 0):
+    """
+    EntityRuler + Matcher x prefiltro_ancoras.PrefiltroAncoras. Confere os casos-limite (conferir_casos_limite) e
+    as entidades (analisar_entradas com e sem prefiltro) num corpus sintético e em documentos longos, e mede só as regras, sobre Docs já tokenizados, em
+    dois tipos de documento longo: um despacho de corpo extenso (poucas âncoras fora do cabeçalho e do rodapé)
+    e um compilado de documentos SEI (âncoras em todo o texto).
+    """
+    import random
+    import shutil
+    import tempfile
+    import corpus_sintetico
+    import analisar_spacy
+    from prefiltro_ancoras import PrefiltroAncoras, conferir_casos_limite
+
+    conferir_casos_limite()
+    pasta = tempfile.mkdtemp(prefix="bench_prefiltro_")
+    try:
+        corpus_sintetico.gerar_textos(pasta, documentos, semente)
+        curtos = [(documento, texto) for documento, _, texto in analisar_spacy.ler_textos(pasta)]
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    media_paragrafo = sum(map(len, corpus_sintetico.PARAGRAFOS)) / len(corpus_sintetico.PARAGRAFOS)
+    compilado = " ".join(texto for _, texto in curtos)
+    longos = []
+    for caracteres in tamanhos:
+        cabecalho, _, corpo, _ = corpus_sintetico.documento_sei(random.Random(semente),
+                                                                int(caracteres / media_paragrafo) + 1)
+        longos.append((f"corpo longo {caracteres // 1000}k",
+                       analisar_spacy.limpar_texto(f"{cabecalho}\n{corpo}")[-caracteres:]))
+        repeticoes = caracteres // len(compilado) + 1
+        longos.append((f"compilado {caracteres // 1000}k", (compilado * repeticoes)[:caracteres]))
+
+    nlp = analisar_spacy.obter_pipeline()
+    textos = curtos + longos
+    referencia = dict(analisar_spacy.analisar_entradas(textos, nlp=nlp))
+    prefiltradas = dict(analisar_spacy.analisar_entradas(textos, nlp=nlp, prefiltro=True))
+    divergentes = [documento for documento in referencia if referencia[documento] != prefiltradas[documento]]
+
+    ruler = nlp.get_pipe("entity_ruler")
+    matcher = analisar_spacy.criar_matcher(nlp)
+    prefiltro = PrefiltroAncoras(nlp)
+    nlp.max_length = max(nlp.max_length, max(len(texto) for _, texto in longos) + 1)
+    print(f"\n📊 Prefiltro por âncoras ({len(curtos)} documentos curtos + {len(longos)} longos)")
+    print(f" {'documento':<20} {'tokens':>8} {'EntityRuler':>11} {'prefiltro':>9} {'janelas':>8} {'tokens nelas':>12}")
+    for nome, texto in longos:
+        doc = nlp.make_doc(texto)
+        inicio = time.perf_counter()
+        spans_ruler = analisar_spacy.spans_entidades(ruler(doc), matcher)
+        tempo_ruler = time.perf_counter() - inicio
+        antes = dict(prefiltro.estatisticas)
+        doc = nlp.make_doc(texto)
+        inicio = time.perf_counter()
+        spans = prefiltro.spans(doc)
+        tempo_prefiltro = time.perf_counter() - inicio
+        if spans != spans_ruler:
+            divergentes.append(nome)
+        janelas = prefiltro.estatisticas["janelas"] - antes["janelas"]
+        fracao = (prefiltro.estatisticas["tokens_janelas"] - antes["tokens_janelas"]) / len(doc)
+        print(f" {nome:<20} {len(doc):>8} {tempo_ruler:>10.3f}s {tempo_prefiltro:>8.3f}s {janelas:>8} {fracao:>12.0%}")
+    print(f" - {'✅ mesmas entidades em todos os documentos' if not divergentes else f'❌ {len(divergentes)} divergente(s): ' + ', '.join(divergentes[:5])}")
+
+# -------------------------------------------------------------------
+# suíte ponta a ponta: corpus sintético, métricas por etapa e baseline
+# -------------------------------------------------------------------
+BASELINE_PATH = "benchmarks_baseline.json"
+TOLERANCIA_BASELINE = 0.10   # variação acima disso (vazão menor, p95 ou RSS maiores) é sinalizada
+ETAPAS_SUITE = ("deteccao", "separacao", "texto", "analise", "validacao", "fluxo")
+
+def _percentil(valores, p: float):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return 1000 * ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+def _medir_etapa(etapa: str, compilado: str, pasta_textos: str, latencia_remota: float):
+    """Executado em subprocesso (pico de RSS por etapa): mede uma etapa sobre o corpus sintético."""
+    import contextlib
+    import io
+    import tempfile
+    import fitz
+    import extraindo_compilado
+    import extrair_texto
+    from servidor_gemini_falso import ServidorGeminiFalso
+
+    with open(compilado.rsplit(".", 1)[0] + "_gabarito.json", encoding="utf-8") as f:
+        gabarito = json.load(f)
+    paginas, documentos = gabarito["paginas"], len(gabarito["inicios"])
+    latencias, extra = [], {}
+    temp = tempfile.mkdtemp(prefix="suite_")
+
+    def intervalos():
+        return extraindo_compilado.intervalos_documentos([tuple(i) for i in gabarito["inicios"]], paginas)
+
+    inicio = time.perf_counter()
+    if etapa == "deteccao":
+        with fitz.open(compilado) as doc:
+            candidatos = []
+            for pagina in doc:
+                t0 = time.perf_counter()
+                candidatos.append(extraindo_compilado.resumo_linhas(extraindo_compilado.linhas_topo(pagina)))
+                latencias.append(time.perf_counter() - t0)
+        inicios = extraindo_compilado.mesclar_candidatos(candidatos)
+        esperados = {(p, extraindo_compilado.rotulo_padrao(padrao)) for p, padrao in gabarito["inicios"]}
+        extra["inicios_corretos"] = f"{len(esperados & set(map(tuple, inicios)))}/{len(esperados)}"
+    elif etapa in ("separacao", "texto"):
+        with fitz.open(compilado) as origem, ServidorGeminiFalso(latencia=latencia_remota) as servidor:
+            backend = extrair_texto.BackendHTTP(servidor.url)
+            for i, primeira, fim, _ in intervalos():
+                t0 = time.perf_counter()
+                novo_pdf, _ = extraindo_compilado.montar_documento(origem, primeira, fim)
+                dados = novo_pdf.tobytes(garbage=0, deflate=True)
+                novo_pdf.close()
+                if etapa == "texto":
+                    # só a extração entra na medida
+                    t0 = time.perf_counter()
+                    with fitz.open(stream=dados, filetype="pdf") as documento:
+                        segmentos = extrair_texto.segmentar_pdf(documento, f"doc{i}", temp)
+                    extrair_texto.texto_dos_segmentos(segmentos, lambda: backend)
+                latencias.append(time.perf_counter() - t0)
+    elif etapa == "analise":
+        import analisar_spacy
+
+        from entidades import Entidades
+
+        nlp = analisar_spacy.obter_pipeline()
+        with open(pasta_textos.rstrip("/") + "_gabarito.json", encoding="utf-8") as f:
+            esperadas = json.load(f)
+        textos = {documento: texto for documento, _, texto in analisar_spacy.ler_textos(pasta_textos)}
+        entrada = {}
+        encontradas = total = 0
+
+        def entradas():
+            for documento, texto in textos.items():
+                entrada[documento] = time.perf_counter()
+                yield documento, texto
+
+        inicio = time.perf_counter()   # a carga do modelo e a leitura não entram na vazão
+        # as opções de main.gerar_pipeline, sem o cache (como na etapa "fluxo"); a latência de cada documento
+        # vai da entrada no lote até a saída das entidades
+        for documento, spans in analisar_spacy.analisar_entradas(entradas(), True, analisar_spacy.BATCH_SIZE, 1,
+                                                                 nlp, spans=True):
+            entidades = Entidades.de_spans(spans).resolver(textos[documento])
+            latencias.append(time.perf_counter() - entrada[documento])
+            for label, valores in esperadas[documento]["entidades"].items():
+                total += len(valores)
+                encontradas += sum(any(v in e for e in entidades.get(label, [])) for v in valores)
+        documentos = len(latencias)
+        paginas = 0
+        extra["cobertura_gabarito"] = f"{encontradas / max(total, 1):.1%}"
+    elif etapa == "validacao":
+        import analisar_spacy
+        from resultados import BaseResultados
+
+        base = BaseResultados(os.path.join(temp, "resultados.sqlite"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n, entidades in enumerate(gabarito["entidades"]):
+                t0 = time.perf_counter()
+                analisar_spacy.validar_documento(f"doc_{n}.txt", entidades, analisar_spacy.criterios_obrigatorios,
+                                                 base)
+                latencias.append(time.perf_counter() - t0)
+            base.fechar()
+    elif etapa == "fluxo":
+        import analisar_spacy
+        import main
+
+        analisar_spacy.obter_pipeline()
+        cwd = os.getcwd()
+        os.chdir(temp)   # resultados.sqlite e relatorio.txt do fluxo ficam no temporário
+        inicio = time.perf_counter()
+        try:
+            with ServidorGeminiFalso(latencia=latencia_remota) as servidor, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                resultados = main.executar_pipeline(os.path.join(cwd, compilado), usar_cache=False,
+                                                    backend=extrair_texto.BackendHTTP(servidor.url))
+        finally:
+            os.chdir(cwd)
+        extra["documentos_validados"] = len(resultados)
+    segundos = time.perf_counter() - inicio
+
+    print(json.dumps({
+        "documentos": documentos, "paginas": paginas, "segundos": segundos,
+        "docs_s": documentos / segundos, "pags_s": paginas / segundos if paginas else None,
+        "p50_ms": _percentil(latencias, 0.5), "p95_ms": _percentil(latencias, 0.95),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "extra": extra,
+    }))
+
+def _comparar_baseline(atual: dict, base: dict) -> str:
+    if not base:
+        return ""
+    avisos = []
+    for chave, maior_pior in (("docs_s", False), ("p95_ms", True), ("rss_mb", True)):
+        if not atual.get(chave) or not base.get(chave):
+            continue
+        variacao = atual[chave] / base[chave] - 1
+        piorou = variacao > TOLERANCIA_BASELINE if maior_pior else variacao < -TOLERANCIA_BASELINE
+        avisos.append(f"{chave} {variacao:+.0%}{' ⚠️' if piorou else ''}")
+    return "  ".join(avisos)
+
+def benchmark_suite(documentos: int = 300, semente: int = 0, fracao_digitalizada: float = 0.05,
+                    latencia_remota: float = 0.02, etapas=ETAPAS_SUITE, baseline: str = BASELINE_PATH,
+                    salvar_baseline: bool = False):
+    """
+    Gera um corpus sintético (corpus_sintetico.py) e mede cada etapa num processo próprio:
+    docs/s, págs/s, latência p50/p95 por item (página na detecção, documento nas demais) e pico de RSS.
+    Compara com o baseline gravado (se houver) e, com salvar_baseline=True, grava as medições atuais.
+    """
+    import shutil
+    import tempfile
+    import platform
+    import corpus_sintetico
+
+    base_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    compilado = os.path.join(base_dir, "compilado.pdf")
+    pasta_textos = os.path.join(base_dir, "textos")
+    try:
+        gabarito = corpus_sintetico.gerar_compilado(compilado, documentos, semente,
+                                                    fracao_digitalizada=fracao_digitalizada)
+        corpus_sintetico.gerar_textos(pasta_textos, documentos, semente)
+        corpus = {"documentos": documentos, "paginas": gabarito["paginas"], "semente": semente,
+                  "fracao_digitalizada": fracao_digitalizada, "latencia_remota": latencia_remota}
+
+        anterior = {}
+        if os.path.exists(baseline):
+            with open(baseline, encoding="utf-8") as f:
+                anterior = json.load(f)
+            if anterior.get("corpus") != corpus:
+                print(f"⚠️ baseline {baseline} foi medido com outro corpus: {anterior.get('corpus')}")
+
+        medicoes = {}
+        for etapa in etapas:
+            medicoes[etapa] = _executar_isolado(
+                f"import benchmarks; benchmarks._medir_etapa({etapa!r}, {compilado!r}, {pasta_textos!r}, "
+                f"{latencia_remota!r})"
+            )
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    print(f"\n📊 Suíte ponta a ponta ({documentos} documentos, {gabarito['paginas']} páginas, "
+          f"{len(gabarito['digitalizadas'])} digitalizadas)")
+    print(f" {'etapa':<10} {'docs/s':>9} {'págs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8}  comparação / extra")
+    fmt = lambda valor, casas: f"{valor:.{casas}f}" if valor is not None else "-"
+    for etapa, m in medicoes.items():
+        comparacao = _comparar_baseline(m, anterior.get("etapas", {}).get(etapa))
+        extra = "  ".join(f"{k}={v}" for k, v in m["extra"].items())
+        print(f" {etapa:<10} {fmt(m['docs_s'], 1):>9} {fmt(m['pags_s'], 1):>9} {fmt(m['p50_ms'], 2):>8} "
+              f"{fmt(m['p95_ms'], 2):>8} {m['rss_mb']:>8.1f}  {comparacao}  {extra}".rstrip())
+
+    if salvar_baseline:
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump({"corpus": corpus, "maquina": platform.platform(), "python": platform.python_version(),
+                       "etapas": medicoes}, f, ensure_ascii=False, indent=1)
+        print(f"💾 Baseline gravado em {baseline}")
+    return medicoes
+
+if __name__ == "__main__":
+    benchmark_processos()
+    benchmark_perfis()
+    benchmark_inicializacao()
+    benchmark_extracao()
+    benchmark_deteccao()
+    benchmark_regiao_cabecalho()
+    benchmark_log_deteccao()
+    benchmark_classificador_linhas()
+    benchmark_separacao()
+    benchmark_resultados()
+    benchmark_servico()
+    benchmark_documentos_longos()
+    benchmark_entidades_compactas()
+    benchmark_quase_duplicados()
+    benchmark_validacao_direcionada()
+    benchmark_fila_trabalho()
+    benchmark_prefiltro_ancoras()
+    benchmark_suite()
@@ -0,0 +1,135 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+CACHE_PATH = "cache_analise.sqlite"
+COMMIT_A_CADA = 200   # gravações acumuladas antes de cada commit
+FORMATO = 2           # conteúdo de cada resultado (2: spans com posições); entra na versão (analisar_spacy.versao_cache)
+
+
+def _sha256(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+def ancoras(padroes):
+    """
+    Palavras (em minúsculas) que precisam aparecer no texto para algum dos padrões casar,
+    a partir do primeiro token de cada um. None se algum padrão não tiver âncora literal
+    (começa com REGEX, atributo booleano ou token opcional) — aí qualquer texto pode ser afetado.
+    """
+    encontradas = set()
+    for padrao in padroes:
+        primeiro = padrao[0] if padrao else {}
+        if primeiro.get("OP") in ("?", "*"):
+            return None
+        valor = primeiro.get("LOWER", primeiro.get("TEXT", primeiro.get("ORTH")))
+        if isinstance(valor, str):
+            encontradas.add(valor.lower())
+        elif isinstance(valor, dict) and "IN" in valor:
+            encontradas.update(v.lower() for v in valor["IN"])
+        else:
+            return None
+    return encontradas
+
+
+class CacheAnalise:
+    """
+    Cache em disco (SQLite) dos spans (grupo, label, início, fim) de cada documento.
+
+    Chave: hash do texto limpo + versão do modo de análise (modelo, perfil, híbrido).
+    Cada resultado guarda a impressão digital dos padrões de cada rótulo no momento da análise;
+    se um padrão muda, só os documentos que contêm alguma âncora dele (antiga ou nova) são refeitos.
+    """
+
+    def __init__(self, impressoes: dict, padroes: dict, versao: str, caminho: str = CACHE_PATH):
+        self.caminho = caminho
+        self.impressoes = impressoes   # {fonte: hash dos padrões}
+        self.versao = versao
+        self.conn = sqlite3.connect(caminho)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                texto_sha  TEXT NOT NULL,
+                versao     TEXT NOT NULL,
+                impressoes TEXT NOT NULL,
+                entidades  TEXT NOT NULL,
+                PRIMARY KEY (texto_sha, versao)
+            );
+            CREATE TABLE IF NOT EXISTS padroes (
+                impressao TEXT PRIMARY KEY,
+                padroes   TEXT NOT NULL
+            );
+        """)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO padroes VALUES (?, ?)",
+            [(impressoes[fonte], json.dumps(p, ensure_ascii=False)) for fonte, p in padroes.items()],
+        )
+        self.conn.commit()
+        self._ancoras = {}
+        self._pendentes = 0
+        self.acertos = self.faltas = self.revalidados = self.invalidados = 0
+
+    def _ancoras_de(self, impressao):
+        if impressao not in self._ancoras:
+            linha = self.conn.execute("SELECT padroes FROM padroes WHERE impressao = ?", (impressao,)).fetchone()
+            self._ancoras[impressao] = ancoras(json.loads(linha[0])) if linha else None
+        return self._ancoras[impressao]
+
+    def _afetado(self, texto: str, antigas: dict) -> bool:
+        """O documento pode ter outro resultado com os padrões atuais?"""
+        texto_min = None
+        for fonte in set(antigas) | set(self.impressoes):
+            antiga, atual = antigas.get(fonte), self.impressoes.get(fonte)
+            if antiga == atual:
+                continue
+            for impressao in (antiga, atual):
+                palavras = self._ancoras_de(impressao) if impressao else set()
+                if palavras is None:
+                    return True
+                texto_min = texto_min if texto_min is not None else texto.lower()
+                if any(p in texto_min for p in palavras):
+                    return True
+        return False
+
+    def obter(self, texto: str):
+        """Spans em cache para o texto, ou None (falta)."""
+        sha = _sha256(texto)
+        linha = self.conn.execute(
+            "SELECT impressoes, entidades FROM resultados WHERE texto_sha = ? AND versao = ?", (sha, self.versao)
+        ).fetchone()
+        if linha is None:
+            self.faltas += 1
+            return None
+        antigas = json.loads(linha[0])
+        if antigas != self.impressoes:
+            if self._afetado(texto, antigas):
+                self.invalidados += 1
+                self.faltas += 1
+                return None
+            # nenhum padrão alterado pode casar neste texto: o resultado continua válido
+            self.revalidados += 1
+            self._gravar(sha, linha[1])
+        self.acertos += 1
+        return [tuple(span) for span in json.loads(linha[1])]
+
+    def guardar(self, texto: str, spans):
+        self._gravar(_sha256(texto), json.dumps(spans, ensure_ascii=False))
+
+    def _gravar(self, sha: str, entidades_json: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?)",
+            (sha, self.versao, json.dumps(self.impressoes, sort_keys=True), entidades_json),
+        )
+        self._pendentes += 1
+        if self._pendentes >= COMMIT_A_CADA:
+            self.conn.commit()
+            self._pendentes = 0
+
+    def fechar(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def relatorio(self):
+        total = self.acertos + self.faltas
+        print(f"\n♻️ Cache de análise ({os.path.basename(self.caminho)}): {self.acertos}/{total} acertos, "
+              f"{self.faltas} faltas ({self.invalidados} invalidados por mudança de padrão, "
+              f"{self.revalidados} reaproveitados apesar da mudança)")
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+CACHE_PATH = "cache_extracao.sqlite"
+TAMANHO_MAXIMO = 256 * 1024 * 1024   # bytes de texto guardados; acima disso sai o menos usado
+BLOCO_LEITURA = 1024 * 1024          # o PDF é lido em blocos para calcular o hash
+USOS_POR_COMMIT = 256                # acertos cujo ultimo_uso é gravado de uma vez (ou junto da próxima escrita)
+
+
+def sha256_arquivo(caminho: str) -> str:
+    """SHA-256 do arquivo, lido em blocos (não carrega o PDF inteiro na memória)."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def versao_prompt(prompt: str) -> str:
+    """Identificador curto do texto do prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class CacheExtracao:
+    """
+    Cache em disco (SQLite) do texto extraído de cada PDF.
+
+    Chave: SHA-256 dos bytes do PDF + modelo + versão do prompt + modo de extração.
+    Quando o texto guardado passa de `tamanho_maximo`, as entradas usadas há mais tempo são removidas.
+    O total guardado fica na tabela `totais`, mantida por triggers a cada inserção, troca ou remoção (vale
+    também para outros processos com o mesmo arquivo, como os trabalhadores de fila_trabalho).
+    O último uso de cada acerto é gravado em lotes, junto da próxima escrita.
+    Pode ser usado por várias threads (ex.: etapas do fluxo de main.executar_pipeline).
+    """
+
+    def __init__(self, caminho: str = CACHE_PATH, tamanho_maximo: int = TAMANHO_MAXIMO):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.trava = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS extracoes (
+                pdf_sha       TEXT NOT NULL,
+                modelo        TEXT NOT NULL,
+                versao_prompt TEXT NOT NULL,
+                modo          TEXT NOT NULL,
+                texto         TEXT NOT NULL,
+                tamanho       INTEGER NOT NULL,
+                ultimo_uso    REAL NOT NULL,
+                PRIMARY KEY (pdf_sha, modelo, versao_prompt, modo)
+            );
+            CREATE INDEX IF NOT EXISTS idx_extracoes_uso ON extracoes (ultimo_uso);
+            CREATE TABLE IF NOT EXISTS totais (id INTEGER PRIMARY KEY CHECK (id = 0), tamanho INTEGER NOT NULL);
+            CREATE TRIGGER IF NOT EXISTS extracoes_insercao AFTER INSERT ON extracoes BEGIN
+                UPDATE totais SET tamanho = tamanho + NEW.tamanho WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS extracoes_troca AFTER UPDATE OF tamanho ON extracoes BEGIN
+                UPDATE totais SET tamanho = tamanho + NEW.tamanho - OLD.tamanho WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS extracoes_remocao AFTER DELETE ON extracoes BEGIN
+                UPDATE totais SET tamanho = tamanho - OLD.tamanho WHERE id = 0;
+            END;
+        """)
+        # caches criados antes da tabela de totais: soma uma única vez
+        self.conn.execute("INSERT OR IGNORE INTO totais SELECT 0, COALESCE(SUM(tamanho), 0) FROM extracoes")
+        self.conn.commit()
+        self.usos = {}   # chave -> último uso ainda não gravado
+        self.acertos = self.faltas = self.removidos = 0
+
+    def obter(self, chave: tuple):
+        """Texto em cache para a chave (pdf_sha, modelo, versao_prompt, modo), ou None."""
+        with self.trava:
+            return self._obter(chave)
+
+    def _obter(self, chave: tuple):
+        linha = self.conn.execute(
+            "SELECT texto FROM extracoes WHERE pdf_sha = ? AND modelo = ? AND versao_prompt = ? AND modo = ?", chave
+        ).fetchone()
+        if linha is None:
+            self.faltas += 1
+            return None
+        self.usos[tuple(chave)] = time.time()
+        if len(self.usos) >= USOS_POR_COMMIT:
+            self._gravar_usos()
+            self.conn.commit()
+        self.acertos += 1
+        return linha[0]
+
+    def _gravar_usos(self):
+        """Grava os últimos usos pendentes na transação atual (o commit fica com quem chamou)."""
+        if self.usos:
+            self.conn.executemany(
+                "UPDATE extracoes SET ultimo_uso = ? WHERE pdf_sha = ? AND modelo = ? AND versao_prompt = ? AND modo = ?",
+                [(uso, *chave) for chave, uso in self.usos.items()],
+            )
+            self.usos.clear()
+
+    def guardar(self, chave: tuple, texto: str):
+        tamanho = len(texto.encode("utf-8"))
+        with self.trava:
+            self._gravar_usos()
+            # upsert em vez de INSERT OR REPLACE: a remoção feita pelo REPLACE não dispara o trigger de remoção
+            self.conn.execute(
+                "INSERT INTO extracoes VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (pdf_sha, modelo, versao_prompt, modo) DO UPDATE SET "
+                "texto = excluded.texto, tamanho = excluded.tamanho, ultimo_uso = excluded.ultimo_uso",
+                (*chave, texto, tamanho, time.time()))
+            self._liberar_espaco()
+            self.conn.commit()
+
+    def tamanho_total(self) -> int:
+        return self.conn.execute("SELECT tamanho FROM totais WHERE id = 0").fetchone()[0]
+
+    def _liberar_espaco(self):
+        total = self.tamanho_total()
+        if total <= self.tamanho_maximo:
+            return
+        remover = []
+        for linha in self.conn.execute(
+            "SELECT rowid, tamanho FROM extracoes ORDER BY ultimo_uso"
+        ):
+            if total <= self.tamanho_maximo:
+                break
+            remover.append((linha[0],))
+            total -= linha[1]
+        self.conn.executemany("DELETE FROM extracoes WHERE rowid = ?", remover)
+        self.removidos += len(remover)
+
+    def invalidar(self, versao: str = None, manter: str = None) -> int:
+        """
+        Remove as entradas da versão de prompt `versao`, ou, com `manter`,
+        as de todas as versões exceto essa. Devolve quantas foram removidas.
+        """
+        with self.trava:
+            self._gravar_usos()
+        if versao is not None:
+            cursor = self.conn.execute("DELETE FROM extracoes WHERE versao_prompt = ?", (versao,))
+        elif manter is not None:
+            cursor = self.conn.execute("DELETE FROM extracoes WHERE versao_prompt != ?", (manter,))
+        else:
+            cursor = self.conn.execute("DELETE FROM extracoes")
+        self.conn.commit()
+        return cursor.rowcount
+
+    def resumo(self):
+        """[(versao_prompt, modelo, entradas, bytes)]"""
+        return self.conn.execute(
+            "SELECT versao_prompt, modelo, COUNT(*), SUM(tamanho) FROM extracoes "
+            "GROUP BY versao_prompt, modelo ORDER BY versao_prompt"
+        ).fetchall()
+
+    def fechar(self):
+        with self.trava:
+            self._gravar_usos()
+        self.conn.commit()
+        self.conn.close()
+
+    def relatorio(self):
+        print(f"♻️ Cache de extração ({os.path.basename(self.caminho)}): {self.acertos} acertos, "
+              f"{self.faltas} faltas, {self.removidos} removidos por tamanho")
+
+
+def main(argv=None):
+    from extrair_texto import PROMPT_EXTRACAO
+
+    atual = versao_prompt(PROMPT_EXTRACAO)
+    parser = argparse.ArgumentParser(description="Gerencia o cache de extração de texto dos PDFs.")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("resumo", help="entradas por versão de prompt e modelo")
+    invalidar = comandos.add_parser("invalidar", help="remove entradas por versão de prompt")
+    grupo = invalidar.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--versao", help="versão de prompt a remover")
+    grupo.add_argument("--antigas", action="store_true", help=f"remove todas as versões exceto a atual ({atual})")
+    grupo.add_argument("--tudo", action="store_true", help="esvazia o cache")
+    args = parser.parse_args(argv)
+
+    cache = CacheExtracao(args.cache)
+    if args.comando == "resumo":
+        print(f"Versão atual do prompt: {atual}")
+        for versao, modelo, entradas, tamanho in cache.resumo():
+            print(f" - {versao} {modelo}: {entradas} PDFs, {tamanho / 1024:.1f} KiB"
+                  f"{' (atual)' if versao == atual else ''}")
+    else:
+        removidas = cache.invalidar(versao=args.versao, manter=atual if args.antigas else None)
+        print(f"🗑️ {removidas} entrada(s) removida(s) de {args.cache}")
+    cache.fechar()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import random
+import argparse
+import textwrap
+
+# Gerador de documentos SEI sintéticos, para benchmarks e testes de regressão sem dados reais:
+#   gerar_textos(pasta, 1000)        → .txt no formato que analisar_spacy lê (+ gabarito.json)
+#   gerar_compilado("c.pdf", 300)    → compilação de vários documentos, com os cabeçalhos de PALAVRAS_CHAVE
+# O gabarito guarda, por documento, os valores inseridos de cada rótulo (ou as páginas de início no PDF).
+
+GABARITO = "gabarito.json"
+LINHAS_POR_PAGINA = 48
+CARACTERES_POR_LINHA = 88   # abaixo de MAX_LINE_LEN, como nas páginas reais
+FRACAO_AUSENTES = 0.08      # chance de cada trecho com entidade ficar fora de um documento
+
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+         "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago", "Vanessa", "Wagner"]
+SOBRENOMES = ["Almeida", "Barbosa", "Cardoso", "Duarte", "Ferreira", "Gomes", "Lima", "Martins", "Nogueira",
+              "Oliveira", "Pereira", "Queiroz", "Ribeiro", "Santos", "Teixeira", "Vieira"]
+CARGOS = ["Gerente Regional", "Coordenador de Processo", "Especialista em Regulação", "Superintendente",
+          "Agente de Fiscalização", "Chefe de Divisão"]
+EMPRESAS = ["Alfa Telecomunicações Ltda", "Beta Radiodifusão S.A", "Conecta Internet Ltda", "Delta Sinais Eireli",
+            "Eco Rádio Comunitária", "Fibra Norte Ltda", "Gama Satélites S.A", "Horizonte Redes Ltda"]
+UNIDADES = ["ORCN/SOR", "FIGF/SFI", "GR01/SFI", "UO071/SFI", "CPOE/SCO"]
+EXTENSO = {5: "cinco", 10: "dez", 15: "quinze", 20: "vinte", 30: "trinta"}
+
+# (cabeçalho da primeira página, padrão de PALAVRAS_CHAVE que o detecta)
+TIPOS = [
+    ("OFÍCIO Nº {n}/{ano}/{unidade}-ANATEL", r"\bOF[IÍ]CIO"),
+    ("RELATÓRIO DE FISCALIZAÇÃO Nº {n}/{ano}/{unidade}", r"\bRELAT[ÓO]RIO DE FISCALIZ"),
+    ("PARECER Nº {n}/{ano}/{unidade}", r"\bPARECER\b"),
+    ("DESPACHO ORDINATÓRIO DE INSTAURAÇÃO Nº {n}/{ano}/SEI/{unidade}", r"\bDESPACHO\b"),
+    ("MEMORANDO Nº {n}/{ano}/{unidade}", r"\bMEMORANDO\b"),
+    ("PORTARIA Nº {n}, DE {dia} DE MARÇO DE {ano}", r"\bPORTARIA\b"),
+    ("CERTIDÃO DE INTIMAÇÃO CUMPRIDA", r"\bCERTID[ÃA]O(?:\s+DE\b)?"),
+    ("TERMO DE CANCELAMENTO DE DOCUMENTO", r"\bTERMO DE CANCELAMENTO DE DOCUMENTO\b"),
+    ("RECIBO ELETRÔNICO DE PROTOCOLO - SEI", r"\bRECIBO ELETR[OÔ]NICO DE PROTOCOLO\b"),
+]
+
+# tipos que costumam ser modelos padronizados: despacho, certidão e recibo
+TIPOS_MODELO = [3, 6, 8]
+
+PARAGRAFOS = [
+    "Trata-se de procedimento de apuração de descumprimento de obrigações instaurado em face da interessada, "
+    "em razão das irregularidades constatadas durante a ação de fiscalização.",
+    "Considerando os fatos narrados e os elementos constantes dos autos, encaminhe-se o presente para análise "
+    "e manifestação da área técnica competente.",
+    "A interessada foi devidamente notificada e apresentou manifestação tempestiva, a qual foi analisada e "
+    "considerada insuficiente para afastar as irregularidades apontadas.",
+    "As estações fiscalizadas operavam em desacordo com as características técnicas autorizadas, conforme "
+    "registros fotográficos e medições anexados ao relatório.",
+    "Dê-se ciência à interessada, facultando-lhe vista dos autos e a apresentação de defesa, nos termos da "
+    "regulamentação vigente.",
+    "Após o decurso do prazo, com ou sem manifestação, retornem os autos para prosseguimento do feito e "
+    "elaboração da proposta de decisão.",
+    "Ressalta-se que a ausência de manifestação não impede o regular prosseguimento do processo, que será "
+    "decidido com base nos elementos disponíveis.",
+]
+
+
+def _digitos_verificadores(numeros, pesos):
+    soma = sum(n * p for n, p in zip(numeros, pesos))
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+def cnpj(sorteio: random.Random) -> str:
+    """CNPJ com dígitos verificadores válidos (00.000.000/0001-00)."""
+    n = [sorteio.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    n.append(_digitos_verificadores(n, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    n.append(_digitos_verificadores(n, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    d = "".join(map(str, n))
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+def cpf(sorteio: random.Random) -> str:
+    """CPF com dígitos verificadores válidos (000.000.000-00)."""
+    n = [sorteio.randint(0, 9) for _ in range(9)]
+    n.append(_digitos_verificadores(n, range(10, 1, -1)))
+    n.append(_digitos_verificadores(n, range(11, 1, -1)))
+    d = "".join(map(str, n))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+def numero_processo(sorteio: random.Random) -> str:
+    """Número de processo SEI (53500.000000/0000-00)."""
+    return (f"{sorteio.choice([53500, 53504, 53508, 53528])}.{sorteio.randint(1, 999999):06d}/"
+            f"{sorteio.randint(2010, 2024)}-{sorteio.randint(0, 99):02d}")
+
+def documento_sei(sorteio: random.Random, paragrafos: int = 6, tipo: int = None, modelo: bool = False):
+    """
+    (cabeçalho, índice do tipo em TIPOS, corpo, entidades inseridas {label: [valores]}) de um documento.
+    Cada trecho com entidade pode faltar (FRACAO_AUSENTES), para haver documentos incompletos.
+    Com `modelo`, o corpo é o texto padrão do tipo (mesmos parágrafos, na mesma ordem): documentos
+    do mesmo tipo só diferem nos números, nomes e trechos ausentes, como certidões e recibos.
+    """
+    tipo = sorteio.randrange(len(TIPOS)) if tipo is None else tipo
+    ano = sorteio.randint(2015, 2024)
+    unidade = sorteio.choice(UNIDADES)
+    numero = sorteio.randint(1, 999)
+    cabecalho = TIPOS[tipo][0].format(n=numero, ano=ano, unidade=unidade, dia=sorteio.randint(1, 28))
+    signatario = f"{sorteio.choice(NOMES)} {sorteio.choice(SOBRENOMES)} {sorteio.choice(SOBRENOMES)}"
+    valores = {
+        "NUM_PROCESSO": numero_processo(sorteio),
+        "INTERESSADO": sorteio.choice(EMPRESAS),
+        "NUM_PROC_FISC": numero_processo(sorteio),
+        "RELATORIO_FISC": f"{sorteio.randint(1, 500)}/{ano}/{unidade.split('/')[0]}",
+        "NUM_PROC_ADM": numero_processo(sorteio),
+        "INFORME": f"{sorteio.randint(1, 300)}/{ano}",
+        "NUM_PASTA": f"RADAR{sorteio.choice(['RCTS', 'SMP', 'SCM'])}{ano}{sorteio.randint(0, 999999):06d}",
+        "CNPJ": cnpj(sorteio),
+        "CPF": cpf(sorteio),
+        "ARTIGO": str(sorteio.randint(1, 120)),
+        "RESOLUCAO": f"{sorteio.randint(100, 760)}/{ano - sorteio.randint(1, 10)}",
+        "PRAZO": sorteio.choice(list(EXTENSO)),
+        "ASSINATURA_ELETRONICA": signatario,
+        "HORA_ASSINATURA": f"{sorteio.randint(1, 28):02d}/{sorteio.randint(1, 12):02d}/{ano}, às "
+                           f"{sorteio.randint(8, 19):02d}:{sorteio.randint(0, 59):02d}",
+        "CODIGO_VERIFICADOR": str(sorteio.randint(1000000, 9999999)),
+        "CRC": f"{sorteio.getrandbits(32):08X}",
+        "NUM_SEI": str(sorteio.randint(1000000, 9999999)),
+    }
+    v = valores
+    trechos = [
+        (["NUM_PROCESSO", "INTERESSADO"], f"Processo nº {v['NUM_PROCESSO']} Interessado: {v['INTERESSADO']}"),
+        (["NUM_PROC_FISC", "RELATORIO_FISC"], f"Processo de Fiscalização nº {v['NUM_PROC_FISC']}. "
+                                             f"Relatório de Fiscalização nº {v['RELATORIO_FISC']}"),
+        (["NUM_PROC_ADM", "INFORME"], f"Processo Administrativo nº {v['NUM_PROC_ADM']}, Informe nº "
+                                      f"{v['INFORME']}/{unidade}, Pasta nº {v['NUM_PASTA']}"),
+        (["CNPJ", "CPF"], f"A interessada, inscrita no CNPJ/MF nº {v['CNPJ']}, representada pelo CPF "
+                          f"{v['CPF']},"),
+        (["ARTIGO", "RESOLUCAO", "PRAZO"], f"nos termos do artigo {v['ARTIGO']} da Resolução nº {v['RESOLUCAO']}, "
+                                           f"no prazo de {v['PRAZO']} ({EXTENSO[v['PRAZO']]}) dias."),
+    ]
+    assinatura = [
+        (["ASSINATURA_ELETRONICA", "HORA_ASSINATURA"],
+         f"Documento assinado eletronicamente por {signatario}, {sorteio.choice(CARGOS)}, em "
+         f"{v['HORA_ASSINATURA']}, conforme horário oficial de Brasília, com fundamento no art. 6º, § 1º, "
+         f"do Decreto nº 8.539, de 8 de outubro de 2015."),
+        (["CODIGO_VERIFICADOR", "CRC"],
+         f"A autenticidade deste documento pode ser conferida no site do SEI, informando o código verificador "
+         f"{v['CODIGO_VERIFICADOR']} e o código CRC {v['CRC']}."),
+        (["NUM_SEI"], f"Referência: Processo nº {v['NUM_PROCESSO']} SEI nº {v['NUM_SEI']}"),
+    ]
+
+    entidades = {"DESPACHO": [f"{numero}/{ano}"]} if tipo == 3 else {}   # o próprio cabeçalho
+    partes = []
+    for labels, trecho in trechos:
+        if sorteio.random() >= FRACAO_AUSENTES:
+            partes.append(trecho)
+            for label in labels:
+                entidades.setdefault(label, []).append(str(v[label]))
+    if modelo:
+        partes += [PARAGRAFOS[(tipo + k) % len(PARAGRAFOS)] for k in range(paragrafos)]
+    else:
+        partes += [sorteio.choice(PARAGRAFOS) for _ in range(paragrafos)]
+    for labels, trecho in assinatura:
+        if sorteio.random() >= FRACAO_AUSENTES:
+            partes.append(trecho)
+            for label in labels:
+                entidades.setdefault(label, []).append(str(v[label]))
+    return cabecalho, tipo, "\n".join(partes), entidades
+
+
+def gerar_textos(pasta: str, quantidade: int = 1000, semente: int = 0, paragrafos: int = 6,
+                 fracao_modelos: float = 0.0):
+    """
+    Grava `quantidade` documentos .txt (cabeçalho + corpo) em `pasta` e o gabarito
+    {arquivo: {"tipo", "entidades"}} em <pasta>_gabarito.json. Devolve o gabarito.
+    `fracao_modelos` dos documentos são modelos padronizados (certidão, recibo, despacho; ver documento_sei).
+    """
+    sorteio = random.Random(semente)
+    os.makedirs(pasta, exist_ok=True)
+    gabarito = {}
+    for n in range(quantidade):
+        if fracao_modelos and sorteio.random() < fracao_modelos:
+            cabecalho, tipo, corpo, entidades = documento_sei(sorteio, paragrafos * 2, sorteio.choice(TIPOS_MODELO),
+                                                              modelo=True)
+        else:
+            cabecalho, tipo, corpo, entidades = documento_sei(sorteio, sorteio.randint(paragrafos // 2, paragrafos * 2))
+        arquivo = f"sei_{n:06d}.txt"
+        with open(os.path.join(pasta, arquivo), "w", encoding="utf-8") as f:
+            f.write(f"AGÊNCIA NACIONAL DE TELECOMUNICAÇÕES\n{cabecalho}\n{corpo}\n")
+        gabarito[arquivo] = {"tipo": TIPOS[tipo][1], "entidades": entidades}
+    with open(_caminho_gabarito(pasta), "w", encoding="utf-8") as f:
+        json.dump(gabarito, f, ensure_ascii=False, indent=1)
+    return gabarito
+
+def _caminho_gabarito(destino: str) -> str:
+    return os.path.splitext(destino.rstrip("/\\"))[0] + "_" + GABARITO
+
+
+def _paginas_documento(cabecalho: str, corpo: str, sorteio: random.Random):
+    """Linhas de cada página: topo com órgão e endereço, cabeçalho na primeira, corpo quebrado em linhas."""
+    topo = ["AGÊNCIA NACIONAL DE TELECOMUNICAÇÕES",
+            "SAUS Quadra 06, Bloco H - Brasília/DF - CEP 70070-940 - www.anatel.gov.br"]
+    linhas = []
+    for paragrafo in corpo.split("\n"):
+        linhas += textwrap.wrap(paragrafo, CARACTERES_POR_LINHA) + [""]
+    por_pagina = LINHAS_POR_PAGINA - len(topo) - 2
+    paginas = []
+    for inicio in range(0, max(len(linhas), 1), por_pagina):
+        pagina = topo + ([cabecalho, ""] if not paginas else [])
+        pagina += linhas[inicio:inicio + por_pagina]
+        paginas.append(pagina)
+    # documentos longos: anexos com texto corrido
+    for _ in range(sorteio.choice([0, 0, 0, 1, 2, 4])):
+        paginas.append(topo + textwrap.wrap(" ".join(sorteio.choice(PARAGRAFOS) for _ in range(12)),
+                                            CARACTERES_POR_LINHA))
+    return paginas
+
+def gerar_compilado(caminho: str, documentos: int = 300, semente: int = 0, paragrafos: int = 6,
+                    fracao_digitalizada: float = 0.0):
+    """
+    PDF com `documentos` documentos SEI em sequência (tipos vizinhos sempre diferentes, como o detector
+    espera) e o gabarito {"inicios": [[página, padrão]], "entidades": [...]} em <caminho>_gabarito.json.
+    `fracao_digitalizada` das páginas vira só imagem (sem camada de texto), como páginas escaneadas.
+    Devolve o gabarito.
+    """
+    import fitz
+
+    sorteio = random.Random(semente)
+    doc = fitz.open()
+    inicios, entidades_docs = [], []
+    anterior = None
+    for _ in range(documentos):
+        tipo = sorteio.choice([t for t in range(len(TIPOS)) if t != anterior])
+        anterior = tipo
+        cabecalho, _, corpo, entidades = documento_sei(sorteio, sorteio.randint(paragrafos // 2, paragrafos * 2),
+                                                       tipo)
+        inicios.append([len(doc), TIPOS[tipo][1]])
+        entidades_docs.append(entidades)
+        for linhas in _paginas_documento(cabecalho, corpo, sorteio):
+            pagina = doc.new_page()
+            pagina.insert_text((40, 50), "\n".join(linhas), fontsize=8.5)
+
+    digitalizadas = sorted(sorteio.sample(range(len(doc)), int(len(doc) * fracao_digitalizada)))
+    for i in digitalizadas:
+        pix = doc[i].get_pixmap(dpi=100, alpha=False)
+        rect = doc[i].rect
+        doc.delete_page(i)
+        pagina = doc.new_page(pno=i, width=rect.width, height=rect.height)
+        pagina.insert_image(pagina.rect, stream=pix.tobytes("png"))
+    doc.save(caminho, garbage=3, deflate=True)
+    paginas = len(doc)
+    doc.close()
+
+    gabarito = {"paginas": paginas, "inicios": inicios, "entidades": entidades_docs, "digitalizadas": digitalizadas}
+    with open(_caminho_gabarito(caminho), "w", encoding="utf-8") as f:
+        json.dump(gabarito, f, ensure_ascii=False)
+    return gabarito
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera documentos SEI sintéticos (texto ou PDF compilado).")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    textos = comandos.add_parser("textos", help=".txt para analisar_spacy")
+    textos.add_argument("pasta")
+    textos.add_argument("--quantidade", type=int, default=1000)
+    textos.add_argument("--modelos", type=float, default=0.0, help="fração de documentos padronizados")
+    compilado = comandos.add_parser("compilado", help="PDF com vários documentos para extraindo_compilado")
+    compilado.add_argument("arquivo")
+    compilado.add_argument("--documentos", type=int, default=300)
+    compilado.add_argument("--digitalizadas", type=float, default=0.0, help="fração de páginas só com imagem")
+    for sub in (textos, compilado):
+        sub.add_argument("--semente", type=int, default=0)
+        sub.add_argument("--paragrafos", type=int, default=6, help="tamanho médio do corpo")
+    args = parser.parse_args(argv)
+
+    if args.comando == "textos":
+        gabarito = gerar_textos(args.pasta, args.quantidade, args.semente, args.paragrafos, args.modelos)
+        print(f"📝 {len(gabarito)} documentos em {args.pasta} (gabarito: {_caminho_gabarito(args.pasta)})")
+    else:
+        gabarito = gerar_compilado(args.arquivo, args.documentos, args.semente, args.paragrafos, args.digitalizadas)
+        print(f"📚 {args.arquivo}: {len(gabarito['inicios'])} documentos, {gabarito['paginas']} páginas, "
+              f"{len(gabarito['digitalizadas'])} digitalizadas (gabarito: {_caminho_gabarito(args.arquivo)})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
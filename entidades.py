@@ -0,0 +1,114 @@
+from array import array
+from functools import lru_cache
+from collections.abc import Mapping
+
+# Representação compacta das entidades de um documento: em vez de {label: [textos]} (um dict,
+# 18 listas e uma cópia de cada trecho por documento), um array de inteiros com as triplas
+# (id do rótulo, início, fim) no texto analisado. Os textos são recortados da fonte só quando pedidos.
+
+
+@lru_cache(maxsize=None)
+def _rotulos():
+    from analisar_spacy import pattern_labels   # importado aqui: analisar_spacy importa este módulo
+
+    return tuple(pattern_labels), {label: i for i, label in enumerate(pattern_labels)}
+
+
+class Entidades(Mapping):
+    """
+    Entidades de um documento como triplas (id do rótulo, início, fim) num array('i').
+    `fonte` é o caminho do .txt (lido e limpo com limpar_texto) ou uma função que devolve o texto analisado.
+    Funciona como o dicionário {label: [textos]} de extrair_entidades (inclusive na comparação com ele),
+    mas cada acesso aos textos relê a fonte: para vários rótulos, use resolver() uma vez.
+    """
+
+    __slots__ = ("posicoes", "fonte")
+
+    def __init__(self, posicoes: array = None, fonte=None):
+        self.posicoes = posicoes if posicoes is not None else array("i")
+        self.fonte = fonte
+
+    @classmethod
+    def de_spans(cls, spans, fonte=None):
+        """A partir de [(grupo, label, início, fim)] (analisar_spacy.spans_entidades)."""
+        _, ids = _rotulos()
+        posicoes = array("i")
+        for _, label, inicio, fim in spans:
+            posicoes.extend((ids[label], inicio, fim))
+        return cls(posicoes, fonte)
+
+    def spans(self):
+        """Gera (label, início, fim), na ordem de extração."""
+        rotulos, _ = _rotulos()
+        p = self.posicoes
+        for k in range(0, len(p), 3):
+            yield rotulos[p[k]], p[k + 1], p[k + 2]
+
+    def quantidade(self, label: str = None) -> int:
+        if label is None:
+            return len(self.posicoes) // 3
+        return self.posicoes[::3].count(_rotulos()[1][label])
+
+    def presentes(self) -> set:
+        """Rótulos com ao menos uma entidade (sem ler a fonte)."""
+        rotulos, _ = _rotulos()
+        return {rotulos[i] for i in set(self.posicoes[::3])}
+
+    def texto_origem(self) -> str:
+        if self.fonte is None:
+            raise ValueError("entidades sem fonte: passe o texto analisado")
+        if callable(self.fonte):
+            return self.fonte()
+        from analisar_spacy import limpar_texto
+
+        with open(self.fonte, "r", encoding="utf-8") as f:
+            return limpar_texto(f.read())
+
+    def com_posicoes(self, texto: str = None) -> dict:
+        """{label: [(texto, início, fim)]} dos rótulos presentes (formato de BaseResultados)."""
+        texto = self.texto_origem() if texto is None else texto
+        resultado = {}
+        for label, inicio, fim in self.spans():
+            resultado.setdefault(label, []).append((texto[inicio:fim], inicio, fim))
+        return resultado
+
+    def resolver(self, texto: str = None) -> dict:
+        """O dicionário {label: [textos]} completo, lendo a fonte uma única vez."""
+        texto = self.texto_origem() if texto is None else texto
+        rotulos, _ = _rotulos()
+        entidades = {label: [] for label in rotulos}
+        for label, inicio, fim in self.spans():
+            entidades[label].append(texto[inicio:fim])
+        return entidades
+
+    def __getitem__(self, label: str):
+        if label not in _rotulos()[1]:
+            raise KeyError(label)
+        if label not in self.presentes():
+            return []
+        texto = self.texto_origem()
+        return [texto[inicio:fim] for rotulo, inicio, fim in self.spans() if rotulo == label]
+
+    def __iter__(self):
+        return iter(_rotulos()[0])
+
+    def __len__(self):
+        return len(_rotulos()[0])
+
+    def items(self):
+        return self.resolver().items()
+
+    def values(self):
+        return self.resolver().values()
+
+    def __eq__(self, outro):
+        if isinstance(outro, Entidades):
+            return self.posicoes == outro.posicoes or self.resolver() == outro.resolver()
+        if isinstance(outro, Mapping):
+            return self.resolver() == dict(outro.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Entidades({self.quantidade()} entidades, fonte={self.fonte!r})"
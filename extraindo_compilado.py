@@ -1,15 +1,26 @@
 import unicodedata
 import fitz  # PyMuPDF
 import re
-import sys
 import os
+import json
+import time
+import logging
 from datetime import datetime
+from functools import lru_cache
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 # --- parâmetros ajustáveis ---
 MAX_OFFSET = 10       # quantos chars do início da linha a palavra pode aparecer
 MAX_LINE_LEN = 90     # comprimento máximo da linha para ser considerada cabeçalho
 NUM_LINHAS_ANALISAR = 12
+REGIAO_CABECALHO = None   # fração superior da página extraída (ex: 0.25); None = página inteira
 SEPARAR_DOCUMENTOS = True  # ✅ define se os documentos serão salvos separadamente
+PROCESSOS = os.cpu_count() or 1   # processos da detecção paralela (detectar_inicios)
+PAGINAS_POR_TAREFA = 200          # páginas lidas por tarefa do pool
+ZOOM_RASTER = 2.0         # escala da rasterização de páginas que não podem ser copiadas (2 = 144 dpi)
+FORMATO_RASTER = "png"    # "png" (sem perdas) ou "jpeg" (bem menor em páginas digitalizadas)
+QUALIDADE_JPEG = 80
 
 
 def sanitize_filename(name: str) -> str:
@@ -42,6 +53,11 @@ PALAVRAS_CHAVE = [
 ]
 compiled_patterns = [(p, re.compile(strip_accents(p), re.IGNORECASE)) for p in PALAVRAS_CHAVE]
 
+def rotulo_padrao(orig_pattern: str) -> str:
+    """Rótulo do tipo de documento gravado em `inicios`, derivado do texto do padrão."""
+    label = re.sub(r"[\\\[\]\(\)\?\*\+\^\$\|]", "", orig_pattern)
+    return strip_accents(label).upper().replace(r"\B", "").replace(r"\b", "").strip()
+
 # -------------------------------------------------------------------
 # linhas irrelevantes
 # -------------------------------------------------------------------
@@ -63,6 +79,97 @@ PADROES_SECAO = [
 ]
 PADROES_SECAO_NORM = [re.compile(strip_accents(p), re.IGNORECASE) for p in PADROES_SECAO]
 
+# -------------------------------------------------------------------
+# classificação de linhas em uma passada
+# -------------------------------------------------------------------
+class _TabelaSemAcentos(dict):
+    """Tabela de str.translate equivalente a strip_accents, preenchida sob demanda por caractere."""
+
+    def __missing__(self, codigo):
+        self[codigo] = valor = strip_accents(chr(codigo))
+        return valor
+
+_SEM_ACENTOS = _TabelaSemAcentos()
+
+def sem_acentos(texto: str) -> str:
+    """Mesmo resultado de strip_accents, sem NFD nem teste de categoria a cada chamada."""
+    return texto if texto.isascii() else texto.translate(_SEM_ACENTOS)
+
+ROTULOS_PADROES = [rotulo_padrao(p) for p in PALAVRAS_CHAVE]
+
+Classificacao = namedtuple("Classificacao", "linha irrelevante secao rotulo inicio fim")
+
+@lru_cache(maxsize=None)
+def _regex_classificador(max_offset: int):
+    """
+    Regex pré-compilados, com um grupo nomeado por padrão:
+    irrelevantes e seções numa alternância cada (qual casou = m.lastgroup);
+    palavras-chave numa alternância "começa até max_offset" (filtro rápido) e, para a prioridade
+    pela ordem da lista, num único match com um lookahead opcional por padrão.
+    """
+    irrelevantes = "|".join(f"(?P<irrelevante_{i}>{p})" for i, p in enumerate(LINHAS_IRRELEVANTES_NORM))
+    secoes = "|".join(f"(?P<secao_{i}>{strip_accents(p)})" for i, p in enumerate(PADROES_SECAO))
+    chaves = [strip_accents(p) for p in PALAVRAS_CHAVE]
+    prioridade = re.compile("".join(f"(?=.{{0,{max_offset}}}?(?P<chave_{i}>{p}))?" for i, p in enumerate(chaves)),
+                            re.IGNORECASE | re.DOTALL)
+    return (
+        re.compile(irrelevantes),
+        re.compile(secoes, re.IGNORECASE),
+        re.compile(f".{{0,{max_offset}}}?(?:{'|'.join(chaves)})", re.IGNORECASE | re.DOTALL),
+        prioridade,
+        [prioridade.groupindex[f"chave_{i}"] - 1 for i in range(len(chaves))],
+    )
+
+def _indice(nome_grupo: str) -> int:
+    return int(nome_grupo.rsplit("_", 1)[1])
+
+def classificar_linha(linha: str):
+    """
+    Normaliza a linha uma vez e responde às perguntas de limpar_linhas, parece_cabecalho
+    e do detector, na mesma ordem e com os mesmos critérios. None para linha vazia; senão
+    Classificacao com o padrão irrelevante que casou (se houver, os demais campos não são
+    avaliados), o padrão de seção e o rótulo aceito como cabeçalho, com a posição: primeiro
+    padrão da lista começando até MAX_OFFSET, em linha de até MAX_LINE_LEN caracteres.
+    """
+    limpa = linha.strip()
+    if not limpa:
+        return None
+    irrelevantes, secoes, qualquer_chave, prioridade, indices_chave = _regex_classificador(MAX_OFFSET)
+
+    norm = sem_acentos(limpa.upper())
+    m = irrelevantes.search(norm)
+    if m:
+        return Classificacao(limpa, LINHAS_IRRELEVANTES[_indice(m.lastgroup)], None, None, None, None)
+    m = secoes.search(norm)
+    secao = PADROES_SECAO[_indice(m.lastgroup)] if m else None
+    if secao is not None or len(limpa) < 5:
+        return Classificacao(limpa, None, secao, None, None, None)
+
+    # as palavras-chave sempre usaram strip_accents(linha).upper(), que só difere da forma
+    # acima em alguns caracteres gregos (iota subscrito)
+    norm_chave = norm if limpa.isascii() else sem_acentos(limpa).upper()
+    if len(norm_chave) > MAX_LINE_LEN or not qualquer_chave.match(norm_chave):
+        return Classificacao(limpa, None, None, None, None, None)
+    m = prioridade.match(norm_chave)
+    grupos = m.groups()
+    for i, indice in enumerate(indices_chave):
+        if grupos[indice] is not None:
+            inicio, fim = m.span(indice + 1)
+            return Classificacao(limpa, None, None, ROTULOS_PADROES[i], inicio, fim)
+    return Classificacao(limpa, None, None, None, None, None)
+
+def resumo_linhas(linhas):
+    """(nº de linhas úteis, rótulo do cabeçalho ou None), classificando cada linha uma única vez."""
+    n_linhas, rotulo = 0, None
+    for linha in linhas:
+        c = classificar_linha(linha)
+        if c is None or c.irrelevante:
+            continue
+        n_linhas += 1
+        if rotulo is None:
+            rotulo = c.rotulo
+    return n_linhas, rotulo
+
 # -------------------------------------------------------------------
 # limpeza de linhas
 # -------------------------------------------------------------------
@@ -70,18 +177,10 @@ def limpar_linhas(linhas):
     """Remove linhas administrativas e de rodapé."""
     linhas_filtradas = []
     for linha in linhas:
-        linha_clean = linha.strip()
-        if not linha_clean:
-            continue
-        linha_norm = strip_accents(linha_clean.upper())
-        skip = False
-        for p in LINHAS_IRRELEVANTES_NORM:
-            if re.search(p, linha_norm):
-                skip = True
-                break
-        if skip:
+        c = classificar_linha(linha)
+        if c is None or c.irrelevante:
             continue
-        linhas_filtradas.append(linha_clean)
+        linhas_filtradas.append(c.linha)
     return linhas_filtradas
 
 # -------------------------------------------------------------------
@@ -91,182 +190,408 @@ def parece_cabecalho(linha: str) -> bool:
     linha_stripped = linha.strip()
     if len(linha_stripped) < 5:
         return False
-    linha_norm = strip_accents(linha_stripped.upper())
-    if any(pat.search(linha_norm) for pat in PADROES_SECAO_NORM):
-        return False
-    if len(linha_stripped.split()) < 1:
-        return False
-    return True
+    secoes = _regex_classificador(MAX_OFFSET)[1]
+    return not secoes.search(sem_acentos(linha_stripped.upper()))
+
+# -------------------------------------------------------------------
+# log com níveis:
+#   INFO  -> início/resumo da análise
+#   DEBUG -> decisão de cada página (+ registro JSONL em "extraindo_compilado.decisoes")
+#   TRACE -> rastreio linha a linha (só é montado se o nível estiver ativo)
+# -------------------------------------------------------------------
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+logger = logging.getLogger("extraindo_compilado")
+logger_decisoes = logging.getLogger("extraindo_compilado.decisoes")
+logger_decisoes.propagate = False   # o JSONL não se mistura com o log de texto
+
+def _registrar_decisao(i: int, n_linhas: int, label, inicio, tipo_atual):
+    """Uma linha JSON por página, se logger_decisoes estiver ativo em DEBUG."""
+    if not logger_decisoes.isEnabledFor(logging.DEBUG):
+        return
+    if not n_linhas:
+        decisao = "sem_linhas"
+    elif inicio is not None:
+        decisao = "inicio_forcado" if label is None else "novo_inicio"
+    else:
+        decisao = "continuacao" if label is not None else "sem_cabecalho"
+    logger_decisoes.debug(json.dumps({
+        "pagina": i + 1, "linhas_uteis": n_linhas, "candidato": label,
+        "decisao": decisao, "tipo_atual": inicio[1] if inicio else tipo_atual,
+    }, ensure_ascii=False))
 
 # -------------------------------------------------------------------
-# função principal com log em arquivo
+# decisão por página (independente das outras) + regra sequencial
 # -------------------------------------------------------------------
-def detectar_inicios_debug(pdf_path: str):
+def candidato_pagina(linhas):
     """
-    Detecta inícios de documentos em um PDF com base em palavras-chave.
-    🔹 Gera log detalhado em arquivo
-    🔹 Garante que a página 1 sempre será considerada início de documento
+    Primeiro rótulo aceito como cabeçalho nas linhas úteis da página, ou None.
+    Não depende das outras páginas: a continuação (tipo_atual) é decidida em proximo_inicio.
     """
-    doc = fitz.open(pdf_path)
-    inicios = []
-    tipo_atual = None
+    rastrear = logger.isEnabledFor(TRACE)
+    if not rastrear:
+        for linha in linhas:
+            c = classificar_linha(linha)
+            if c is not None and c.rotulo is not None:
+                return c.rotulo
+        return None
 
-    # --- prepara log ---
-    log_name = f"log_deteccao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    sys.stdout = open(log_name, "w", encoding="utf-8")
-    print(f"📘 Iniciando análise: {pdf_path}")
-    print(f"🕒 Log salvo em: {log_name}\n")
-    print(f"Total de páginas: {len(doc)}\n")
+    # rastreio: mesmo resultado, mas padrão a padrão, para registrar cada rejeição
+    for linha in linhas:
+        linha_norm = strip_accents(linha).upper()
+        logger.log(TRACE, "🔸 Linha: %r", linha)
+        logger.log(TRACE, "   ↳ Normalizada: %r (len=%d)", linha_norm, len(linha_norm))
+
+        for orig_pattern, comp_pat in compiled_patterns:
+            m = comp_pat.search(linha_norm)
+            if not m:
+                continue
+
+            start = m.start()
+            end = m.end()
+            l_len = len(linha_norm)
+            is_header = parece_cabecalho(linha)
+            label = rotulo_padrao(orig_pattern)
+
+            logger.log(TRACE, "   ✅ Match em '%s' (pos=%d-%d) usando padrão %r", label, start, end, orig_pattern)
+
+            if start > MAX_OFFSET:
+                logger.log(TRACE, "   🚫 Rejeitado: posição inicial %d > %d", start, MAX_OFFSET)
+                continue
+            if l_len > MAX_LINE_LEN:
+                logger.log(TRACE, "   🚫 Rejeitado: linha muito longa (%d>%d)", l_len, MAX_LINE_LEN)
+                continue
+            if not is_header:
+                logger.log(TRACE, "   🚫 Rejeitado: linha não parece cabeçalho")
+                continue
+
+            return label
+    return None
+
+def proximo_inicio(i: int, label, tipo_atual):
+    """
+    Regra sequencial: o início que a página i acrescenta (ou None), dado o tipo do documento atual.
+    Mesmo tipo da página anterior = continuação; a página 1 sem palavra-chave é forçada como início.
+    """
+    if label is not None:
+        return (i, label) if label != tipo_atual else None
+    if i == 0:
+        return (0, "INÍCIO AUTOMÁTICO")
+    return None
 
-    for i, page in enumerate(doc):
-        texto = page.get_text("text")
-        raw_lines = texto.splitlines()[:NUM_LINHAS_ANALISAR]
-        linhas = limpar_linhas(raw_lines)
-        if not linhas:
+def linhas_topo(page, regiao=REGIAO_CABECALHO):
+    """
+    Primeiras NUM_LINHAS_ANALISAR linhas da página. Com `regiao`, só a faixa superior
+    (essa fração da altura) é extraída, via clip, em vez do texto da página inteira.
+    """
+    clip = None
+    if regiao:
+        r = page.rect
+        clip = fitz.Rect(r.x0, r.y0, r.x1, r.y0 + r.height * regiao)
+    return page.get_text("text", clip=clip).splitlines()[:NUM_LINHAS_ANALISAR]
+
+def linhas_uteis(page, regiao=REGIAO_CABECALHO):
+    return limpar_linhas(linhas_topo(page, regiao))
+
+def _candidatos_paginas(doc, inicio: int, fim: int, regiao=REGIAO_CABECALHO):
+    """Gera (nº de linhas úteis, rótulo ou None) das páginas inicio..fim-1."""
+    for i in range(inicio, fim):
+        raw_lines = linhas_topo(doc[i], regiao)
+        if not logger.isEnabledFor(TRACE):
+            yield resumo_linhas(raw_lines)
             continue
+        linhas = limpar_linhas(raw_lines)
+        if linhas:
+            logger.log(TRACE, "\n===========================\n📄 Página %d — %d linhas úteis\n"
+                              "===========================\n", i + 1, len(linhas))
+            logger.log(TRACE, "raw lines: %r\n", raw_lines)
+        yield len(linhas), candidato_pagina(linhas) if linhas else None
 
-        print(f"\n===========================")
-        print(f"📄 Página {i+1} — {len(linhas)} linhas úteis")
-        print("===========================\n")
-
-        print(f"raw lines: {raw_lines}\n")
-
-        found_in_page = False
+def mesclar_candidatos(candidatos):
+    """
+    Aplica a regra sequencial (tipo_atual, página 1) aos candidatos de todas as páginas.
+    Aceita um gerador: cada decisão é registrada logo após a página correspondente.
+    """
+    inicios = []
+    tipo_atual = None
+    for i, (n_linhas, label) in enumerate(candidatos):
+        if not n_linhas:
+            _registrar_decisao(i, n_linhas, label, None, tipo_atual)
+            continue
+        inicio = proximo_inicio(i, label, tipo_atual)
+        _registrar_decisao(i, n_linhas, label, inicio, tipo_atual)
+
+        if inicio is None and label is not None:
+            logger.debug("    🔁 Mesmo tipo detectado (%s) → continuação do mesmo documento.\n", label)
+        elif inicio is not None and label is None:
+            logger.debug("⚠️ Nenhuma palavra-chave encontrada na página 1, "
+                         "mas ela será forçada como início de documento.\n")
+        elif inicio is not None:
+            logger.debug("   🎯 Aceito: detectado novo início -> %r\n", label)
+
+        if inicio is not None:
+            # 🎯 Novo documento detectado
+            inicios.append(inicio)
+            tipo_atual = inicio[1]
+    return inicios
 
-        for linha in linhas:
-            linha_norm = strip_accents(linha).upper()
-            print(f"🔸 Linha: {linha!r}")
-            print(f"   ↳ Normalizada: {linha_norm!r} (len={len(linha_norm)})")
-
-            if found_in_page:
-                print("   ⚠️ Já houve um início detectado nesta página → ignorando o restante.\n")
-                break
-
-            for orig_pattern, comp_pat in compiled_patterns:
-                m = comp_pat.search(linha_norm)
-                if not m:
-                    continue
-
-                start = m.start()
-                end = m.end()
-                l_len = len(linha_norm)
-                is_header = parece_cabecalho(linha)
-
-                label = re.sub(r"[\\\[\]\(\)\?\*\+\^\$\|]", "", orig_pattern)
-                label = strip_accents(label).upper().replace(r"\B", "").replace(r"\b", "").strip()
-
-                print(f"   ✅ Match em '{label}' (pos={start}-{end}) usando padrão {orig_pattern!r}")
-
-                if start > MAX_OFFSET:
-                    print(f"   🚫 Rejeitado: posição inicial {start} > {MAX_OFFSET}")
-                    continue
-                if l_len > MAX_LINE_LEN:
-                    print(f"   🚫 Rejeitado: linha muito longa ({l_len}>{MAX_LINE_LEN})")
-                    continue
-                if not is_header:
-                    print(f"   🚫 Rejeitado: linha não parece cabeçalho")
-                    continue
-
-                if label == tipo_atual:
-                    print(f"    🔁 Mesmo tipo detectado ({label}) → continuação do mesmo documento.\n")
-                    found_in_page = True
-                    break
-
-                # 🎯 Novo documento detectado
-                inicios.append((i, label))
-                tipo_atual = label
-                found_in_page = True
-                print(f"   🎯 Aceito: detectado novo início -> {label!r}\n")
-                break
-
-            if found_in_page:
-                break
-
-        if i == 0 and not found_in_page:
-            print("⚠️ Nenhuma palavra-chave encontrada na página 1, mas ela será forçada como início de documento.\n")
-            inicios.append((0, "INÍCIO AUTOMÁTICO"))
-            tipo_atual = "INÍCIO AUTOMÁTICO"
-
-    doc.close()
-
-    print("\n\n📋 RESUMO DOS TIPOS DETECTADOS:")
-    for idx, (pg, tipo) in enumerate(inicios, start=1):
-        print(f"   {idx:02d}. Página {pg+1} → {tipo}")
-    print("\n✅ Fim da análise.")
-    sys.stdout = sys.__stdout__
+# -------------------------------------------------------------------
+# detecção: sequencial ou com as páginas em blocos num pool de processos
+# -------------------------------------------------------------------
+def _candidatos_intervalo(pdf_path: str, inicio: int, fim: int, regiao=REGIAO_CABECALHO):
+    """Executado no pool: candidatos das páginas inicio..fim-1."""
+    with fitz.open(pdf_path) as doc:
+        return list(_candidatos_paginas(doc, inicio, fim, regiao))
 
+def detectar_inicios(pdf_path: str, processos: int = PROCESSOS, paginas_por_tarefa: int = PAGINAS_POR_TAREFA,
+                     regiao=REGIAO_CABECALHO):
+    """
+    Detecta inícios de documentos em um PDF com base em palavras-chave.
+    Com processos > 1, as páginas são lidas em blocos num pool e a regra sequencial
+    é aplicada no fim (o rastreio TRACE só é emitido no modo sequencial).
+    Garante que a página 1 sempre será considerada início de documento.
+    """
+    with fitz.open(pdf_path) as doc:
+        total = len(doc)
+        logger.info("📘 Iniciando análise: %s", pdf_path)
+        logger.info("Total de páginas: %d\n", total)
+        blocos = [(inicio, min(inicio + paginas_por_tarefa, total))
+                  for inicio in range(0, total, paginas_por_tarefa)]
+
+        if processos <= 1 or len(blocos) <= 1:
+            inicios = mesclar_candidatos(_candidatos_paginas(doc, 0, total, regiao))
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                partes = executor.map(_candidatos_intervalo, [pdf_path] * len(blocos), *zip(*blocos),
+                                      [regiao] * len(blocos))
+                inicios = mesclar_candidatos(c for parte in partes for c in parte)
+
+    if logger.isEnabledFor(logging.INFO):
+        resumo = "\n".join(f"   {idx:02d}. Página {pg+1} → {tipo}" for idx, (pg, tipo) in enumerate(inicios, start=1))
+        logger.info("\n\n📋 RESUMO DOS TIPOS DETECTADOS:\n%s\n\n✅ Fim da análise.", resumo)
     return inicios
 
+def detectar_inicios_debug(pdf_path: str, regiao=REGIAO_CABECALHO, nivel: int = TRACE):
+    """
+    detectar_inicios sequencial gravando, só durante a chamada:
+    🔹 log_deteccao_<data>.txt com o log até `nivel` (TRACE = linha a linha)
+    🔹 log_deteccao_<data>.jsonl com a decisão de cada página
+    Durante a chamada o logger não propaga: o rastro não chega aos handlers do processo.
+    """
+    base = f"log_deteccao_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    formato = logging.Formatter("%(message)s")
+    arquivo_texto = logging.FileHandler(base + ".txt", mode="w", encoding="utf-8")
+    arquivo_jsonl = logging.FileHandler(base + ".jsonl", mode="w", encoding="utf-8")
+    for handler in (arquivo_texto, arquivo_jsonl):
+        handler.setFormatter(formato)
+
+    niveis, propaga = (logger.level, logger_decisoes.level), logger.propagate
+    logger.setLevel(nivel)
+    logger.propagate = False
+    logger_decisoes.setLevel(logging.DEBUG)
+    logger.addHandler(arquivo_texto)
+    logger_decisoes.addHandler(arquivo_jsonl)
+    try:
+        logger.info("🕒 Log salvo em: %s.txt (decisões em %s.jsonl)\n", base, base)
+        return detectar_inicios(pdf_path, processos=1, regiao=regiao)
+    finally:
+        logger.removeHandler(arquivo_texto)
+        logger_decisoes.removeHandler(arquivo_jsonl)
+        logger.setLevel(niveis[0])
+        logger.propagate = propaga
+        logger_decisoes.setLevel(niveis[1])
+        arquivo_texto.close()
+        arquivo_jsonl.close()
+
+def comparar_regiao_cabecalho(pdf_path: str, regioes=(0.15, 0.25, 0.35)):
+    """
+    Relatório do modo só-cabeçalho: para cada fração de página, quantas linhas úteis
+    da extração completa ele vê, em quantas páginas o candidato muda, se os inícios
+    são os mesmos e o tempo de extração por 1.000 páginas.
+    """
+    with fitz.open(pdf_path) as doc:
+        total = len(doc)
+        for page in doc:   # aquecimento (fontes e objetos carregados), para não penalizar a primeira medição
+            page.get_text("text")
+        inicio = time.perf_counter()
+        completas = [limpar_linhas(linhas_topo(page, None)) for page in doc]
+        ms_completo = 1000 * (time.perf_counter() - inicio) * 1000 / total
+
+        referencia = [(len(l), candidato_pagina(l) if l else None) for l in completas]
+        inicios_ref = mesclar_candidatos(referencia)
+        n_linhas = sum(len(l) for l in completas)
+
+        print(f"\n📐 Região de cabeçalho x página inteira ({total} páginas, {n_linhas} linhas úteis)")
+        print(f" - página inteira: {ms_completo:8.1f} ms / 1.000 págs")
+        relatorio = {"pagina_inteira": {"ms_por_mil": ms_completo}}
+        for regiao in regioes:
+            inicio = time.perf_counter()
+            recortadas = [limpar_linhas(linhas_topo(page, regiao)) for page in doc]
+            ms = 1000 * (time.perf_counter() - inicio) * 1000 / total
+
+            vistas = sum(sum((Counter(a) & Counter(b)).values()) for a, b in zip(completas, recortadas))
+            paginas_diferentes = [i for i, (a, b) in enumerate(zip(completas, recortadas)) if a != b]
+            candidatos = [(len(l), candidato_pagina(l) if l else None) for l in recortadas]
+            candidatos_diferentes = [i for i, (a, b) in enumerate(zip(referencia, candidatos)) if a != b]
+            iguais = mesclar_candidatos(candidatos) == inicios_ref
+
+            print(f" - topo {regiao:4.0%}     : {ms:8.1f} ms / 1.000 págs (x{ms_completo / ms:.2f})  "
+                  f"linhas vistas {vistas}/{n_linhas}  páginas com linhas diferentes {len(paginas_diferentes)}  "
+                  f"candidatos diferentes {len(candidatos_diferentes)}  "
+                  f"{'✅ mesmos inícios' if iguais else '❌ inícios diferentes'}")
+            if candidatos_diferentes:
+                print(f"   páginas com candidato diferente: {[i + 1 for i in candidatos_diferentes[:10]]}")
+            relatorio[regiao] = {
+                "ms_por_mil": ms, "linhas_vistas": vistas, "linhas": n_linhas,
+                "paginas_diferentes": paginas_diferentes, "candidatos_diferentes": candidatos_diferentes,
+                "mesmos_inicios": iguais,
+            }
+    return relatorio
+
 # -------------------------------------------------------------------
 # separação opcional dos documentos detectados
 # -------------------------------------------------------------------
-def separar_documentos(pdf_path: str, inicios):
+def _rasterizar_pagina(novo_pdf, page, zoom: float, formato: str, qualidade: int):
+    """Insere a página como imagem, no tamanho original, codificada em `formato`."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if formato == "jpeg":
+        imagem = pix.tobytes("jpeg", jpg_quality=qualidade)
+    else:
+        imagem = pix.tobytes("png")
+    pix = None   # libera o bitmap antes de montar a próxima página
+    nova = novo_pdf.new_page(width=page.rect.width, height=page.rect.height)
+    nova.insert_image(nova.rect, stream=imagem)
+
+def nome_documento(i: int, tipo: str) -> str:
+    """Nome (sem extensão) do documento i: número de ordem + tipo sanitizado."""
+    # 🔤 Sanitiza o nome do arquivo para evitar erros no Windows
+    nome_tipo = sanitize_filename(tipo.replace(" ", "_").replace("(", "").replace(")", ""))
+    return f"{i+1:02d}_{nome_tipo or 'SEM_TIPO'}"
+
+def intervalos_documentos(inicios, total_paginas: int):
+    """[(i, primeira página, página após a última, tipo)] de cada documento detectado."""
+    return [(i, pg, inicios[i + 1][0] if i + 1 < len(inicios) else total_paginas, tipo)
+            for i, (pg, tipo) in enumerate(inicios)]
+
+def montar_documento(doc_origem, inicio: int, fim: int, zoom: float = ZOOM_RASTER,
+                     formato: str = FORMATO_RASTER, qualidade: int = QUALIDADE_JPEG):
+    """
+    Novo PDF (em memória) com as páginas [inicio, fim) copiadas como um único intervalo; se falhar,
+    página a página, rasterizando só as que não puderem ser copiadas. Devolve (pdf, mensagens).
+    """
+    novo_pdf = fitz.open()
+    mensagens = []
+    antes = novo_pdf.page_count
+    try:
+        novo_pdf.insert_pdf(doc_origem, from_page=inicio, to_page=fim - 1)
+        mensagens.append(f"   🟢 Copiadas páginas {inicio+1}–{fim}" if fim - inicio > 1 else f"   🟢 Copiada página {fim}")
+        return novo_pdf, mensagens
+    except Exception as e0:
+        if novo_pdf.page_count > antes:
+            novo_pdf.delete_pages(from_page=antes, to_page=novo_pdf.page_count - 1)
+        mensagens.append(f"   ⚠️ Falha ao copiar páginas {inicio+1}–{fim} em bloco, copiando uma a uma... ({e0})")
+
+    for page_num in range(inicio, fim):
+        try:
+            # === TENTATIVA 1: cópia direta (melhor qualidade) ===
+            novo_pdf.insert_pdf(doc_origem, from_page=page_num, to_page=page_num)
+        except Exception as e1:
+            mensagens.append(f"   ⚠️ Falha ao copiar página {page_num+1}, tentando rasterizar... ({e1})")
+            try:
+                _rasterizar_pagina(novo_pdf, doc_origem.load_page(page_num), zoom, formato, qualidade)
+                mensagens.append(f"   🟢 Página {page_num+1} convertida via imagem (rasterização).")
+            except Exception as e2:
+                mensagens.append(f"   ❌ Erro total ao inserir página {page_num+1}: {e2}")
+                erro_page = novo_pdf.new_page()
+                erro_page.insert_text((50, 100), f"[ERRO AO INSERIR PÁG {page_num+1}]", fontsize=16)
+    return novo_pdf, mensagens
+
+def _salvar_documentos(pdf_path: str, output_dir: str, documentos, zoom: float, formato: str, qualidade: int):
+    """
+    Monta e salva um grupo de documentos (i, inicio, fim, tipo), abrindo o PDF de origem
+    uma vez. Roda no pool de separar_documentos; devolve [(caminho salvo ou None, mensagens)].
+    """
+    resultados = []
+    with fitz.open(pdf_path) as doc_origem:
+        for i, inicio, fim, tipo in documentos:
+            mensagens = [f"\n📄 Criando documento {i+1}: {tipo} ({fim - inicio} pág.)"]
+            novo_pdf, copia = montar_documento(doc_origem, inicio, fim, zoom, formato, qualidade)
+            mensagens += copia
+            out_path = os.path.join(output_dir, nome_documento(i, tipo) + ".pdf")
+            salvo = None
+            try:
+                if novo_pdf.page_count > 0:
+                    # 🔐 Salvamento seguro, sem otimizações destrutivas
+                    novo_pdf.save(out_path, garbage=0, deflate=True)
+                    mensagens.append(f"✅ Documento salvo: {out_path} ({novo_pdf.page_count} pág.)")
+                    salvo = out_path
+                else:
+                    mensagens.append(f"❌ Documento vazio (0 páginas) - não salvo: {out_path}")
+            except Exception as e3:
+                mensagens.append(f"❌ Erro crítico ao salvar {out_path}: {e3}")
+            finally:
+                novo_pdf.close()
+            resultados.append((salvo, mensagens))
+    return resultados
+
+def separar_documentos(pdf_path: str, inicios, processos: int = PROCESSOS,
+                       paginas_por_tarefa: int = PAGINAS_POR_TAREFA, zoom_raster: float = ZOOM_RASTER,
+                       formato_raster: str = FORMATO_RASTER, qualidade_jpeg: int = QUALIDADE_JPEG):
     """
     Separa documentos detectados em PDFs individuais.
-    Modo híbrido: tenta copiar página original; se falhar, rasteriza.
+    Cada documento é copiado como um intervalo de páginas; só se isso falhar, página a página,
+    rasterizando as que não puderem ser copiadas (zoom_raster, formato_raster, qualidade_jpeg).
+    Com processos > 1, grupos de documentos (~paginas_por_tarefa páginas) são montados e salvos num pool.
     Corrigido para evitar caracteres inválidos no nome do arquivo (ex: ':').
+    Devolve os caminhos dos PDFs salvos.
     """
     if not SEPARAR_DOCUMENTOS:
         print("⚙️ Separação de documentos desativada.")
-        return
+        return []
 
     print("\n📂 Iniciando separação de documentos...")
     output_dir = os.path.join(os.path.dirname(pdf_path), "documentos_separados")
     os.makedirs(output_dir, exist_ok=True)
 
-    # Abre o documento de origem apenas uma vez
-    doc_origem = fitz.open(pdf_path)
-
-    for i, (pg, tipo) in enumerate(inicios):
-        start_page = pg
-        end_page = inicios[i + 1][0] if i + 1 < len(inicios) else len(doc_origem)
-        novo_pdf = fitz.open()
-        total_paginas = end_page - start_page
+    with fitz.open(pdf_path) as doc:
+        total = len(doc)
+    grupos, grupo, paginas_grupo = [], [], 0
+    for i, pg, fim, tipo in intervalos_documentos(inicios, total):
+        grupo.append((i, pg, fim, tipo))
+        paginas_grupo += fim - pg
+        if paginas_grupo >= paginas_por_tarefa:
+            grupos.append(grupo)
+            grupo, paginas_grupo = [], 0
+    if grupo:
+        grupos.append(grupo)
+
+    argumentos = ([pdf_path] * len(grupos), [output_dir] * len(grupos), grupos, [zoom_raster] * len(grupos),
+                  [formato_raster] * len(grupos), [qualidade_jpeg] * len(grupos))
+    salvos = []
+    if processos <= 1 or len(grupos) <= 1:
+        partes = map(_salvar_documentos, *argumentos)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=processos)
+        partes = executor.map(_salvar_documentos, *argumentos)
+    try:
+        for parte in partes:   # na ordem dos documentos
+            for salvo, mensagens in parte:
+                print("\n".join(mensagens))
+                if salvo:
+                    salvos.append(salvo)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-        print(f"\n📄 Criando documento {i+1}: {tipo} ({total_paginas} pág.)")
-
-        for page_num in range(start_page, end_page):
-            try:
-                # === TENTATIVA 1: cópia direta (melhor qualidade) ===
-                novo_pdf.insert_pdf(doc_origem, from_page=page_num, to_page=page_num)
-                print(f"   🟢 Copiada página {page_num+1}")
-            except Exception as e1:
-                print(f"   ⚠️ Falha ao copiar página {page_num+1}, tentando rasterizar... ({e1})")
-                try:
-                    page = doc_origem.load_page(page_num)
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
-                    img_as_pdf = fitz.open("pdf", pix.tobytes(format="pdf"))
-                    novo_pdf.insert_pdf(img_as_pdf)
-                    img_as_pdf.close()
-                    print(f"   🟢 Página {page_num+1} convertida via imagem (rasterização).")
-                except Exception as e2:
-                    print(f"   ❌ Erro total ao inserir página {page_num+1}: {e2}")
-                    erro_page = novo_pdf.new_page()
-                    erro_page.insert_text((50, 100), f"[ERRO AO INSERIR PÁG {page_num+1}]", fontsize=16)
-
-        # 🔤 Sanitiza o nome do arquivo para evitar erros no Windows
-        nome_tipo = sanitize_filename(tipo.replace(" ", "_").replace("(", "").replace(")", ""))
-        out_path = os.path.join(output_dir, f"{i+1:02d}_{nome_tipo or 'SEM_TIPO'}.pdf")
-
-        try:
-            if novo_pdf.page_count > 0:
-                # 🔐 Salvamento seguro, sem otimizações destrutivas
-                novo_pdf.save(out_path, garbage=0, deflate=True)
-                print(f"✅ Documento salvo: {out_path} ({novo_pdf.page_count} pág.)")
-            else:
-                print(f"❌ Documento vazio (0 páginas) - não salvo: {out_path}")
-        except Exception as e3:
-            print(f"❌ Erro crítico ao salvar {out_path}: {e3}")
-        finally:
-            novo_pdf.close()
-
-    doc_origem.close()
     print("\n📁 Separação concluída!\n")
+    return salvos
 
 # -------------------------------------------------------------------
 # execução principal
 # -------------------------------------------------------------------
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     PDF_PATH = "validar_docs/SEI_53500.053021_2018_91.pdf"  # seu arquivo
     inicios = detectar_inicios_debug(PDF_PATH)
     separar_documentos(PDF_PATH, inicios)
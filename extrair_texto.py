@@ -1,14 +1,64 @@
 import os
 import re
+import json
+import time
+import random
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-import google.generativeai as genai
+import fitz  # PyMuPDF
+from cache_extracao import CacheExtracao, sha256_arquivo, versao_prompt
+# google.generativeai é importado sob demanda (BackendGemini): os testes com o
+# servidor falso (servidor_gemini_falso.py) não precisam da biblioteca nem de rede
 
 # Diretórios
 INPUT_DIR = "/home/alek/PycharmProjects/PythonProject/documentos_separados"
 OUTPUT_DIR = "/home/alek/PycharmProjects/PythonProject/texts_extraidos"
 
 # Configuração da API Gemini
-genai.configure(api_key="")
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+MODELO_GEMINI = "gemini-2.5-flash"
+
+PROMPT_EXTRACAO = (
+    "Extraia **todo o texto legível** deste documento PDF de forma contínua. "
+    "Remova formatações, quebras de linha, cabeçalhos, rodapés, numeração de páginas e caracteres estranhos. "
+    "Mantenha apenas o conteúdo textual principal em uma única linha (ou frases separadas por ponto final). "
+    "Preserve números, siglas, nomes e símbolos como nº, /, -, . e %. "
+    "Retorne o texto limpo e linearizado, ideal para processamento com spaCy."
+)
+
+# --- extração concorrente ---
+CONCORRENCIA = 4               # chamadas simultâneas à API
+REQUISICOES_POR_SEGUNDO = 2.0  # taxa média permitida (token bucket)
+RAJADA = 4                     # requisições que podem sair de uma vez (capacidade do balde)
+TENTATIVAS = 5                 # tentativas por PDF em erros transitórios
+ESPERA_BASE = 1.0              # segundos; dobra a cada nova tentativa
+ESPERA_MAXIMA = 30.0
+
+# --- extração híbrida: camada de texto do PDF, Gemini só nas páginas sem texto ---
+EXTRACAO_HIBRIDA = True
+MIN_CARACTERES_PAGINA = 40        # menos que isso (sem contar espaços): página tratada como imagem
+MAX_FRACAO_LIXO = 0.2             # fração máxima de caracteres estranhos (glifos sem mapeamento, �...)
+SEGUNDOS_POR_PAGINA_REMOTA = 3.0  # estimativa usada no cálculo da economia se nenhuma página for ao Gemini
+USAR_CACHE_EXTRACAO = True       # reaproveita o texto de PDFs já extraídos (cache_extracao.py)
+CARACTERES_ACEITOS = set(".,;:!?()[]{}/\\-–—%º°ª§\"'“”‘’@#$&*+=<>_|…•")
+
+# exceções da API (google.api_core.exceptions) que valem nova tentativa
+ERROS_TRANSITORIOS_GEMINI = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted",
+}
+
+class ErroExtracao(Exception):
+    """Falha definitiva na extração de um PDF (nada é gravado)."""
+
+class ErroTransitorio(ErroExtracao):
+    """Falha que pode ser repetida: limite de taxa, indisponibilidade, timeout, resposta vazia."""
+
 
 def limpar_texto(texto: str) -> str:
     """Limpa e normaliza o texto extraído."""
@@ -16,51 +66,317 @@ def limpar_texto(texto: str) -> str:
     texto = re.sub(r'–', '-', texto)
     return texto.strip()
 
-def extrair_texto_via_gemini(caminho_pdf: str) -> str:
+def _texto_da_resposta(texto: str, caminho_pdf: str) -> str:
+    texto = ' '.join((texto or "").split())  # remove múltiplos espaços e quebras
+    if not texto:
+        raise ErroTransitorio(f"resposta vazia para {os.path.basename(caminho_pdf)}")
+    return texto
+
+# -------------------------------------------------------------------
+# backends: qualquer objeto com extrair(caminho_pdf) -> str
+# (lança ErroTransitorio para repetir, ErroExtracao para desistir)
+# -------------------------------------------------------------------
+class BackendGemini:
+    """Envia o PDF para o Gemini e devolve o texto linearizado."""
+
+    def __init__(self, modelo: str = MODELO_GEMINI, prompt: str = PROMPT_EXTRACAO, api_key: str = GEMINI_API_KEY):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.nome_modelo = modelo
+        self.modelo = genai.GenerativeModel(modelo)
+        self.prompt = prompt
+
+    def extrair(self, caminho_pdf: str) -> str:
+        try:
+            file_ref = self.genai.upload_file(caminho_pdf)
+            response = self.modelo.generate_content([file_ref, self.prompt])
+            texto = response.text if response else ""
+        except Exception as e:
+            if type(e).__name__ in ERROS_TRANSITORIOS_GEMINI or isinstance(e, (TimeoutError, ConnectionError)):
+                raise ErroTransitorio(f"{type(e).__name__}: {e}") from e
+            raise ErroExtracao(f"{type(e).__name__}: {e}") from e
+        return _texto_da_resposta(texto, caminho_pdf)
+
+class BackendHTTP:
+    """
+    Backend para um serviço HTTP compatível com servidor_gemini_falso.py:
+    POST do PDF em `url`, resposta JSON {"texto": ...}.
+    """
+
+    STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, url: str, prompt: str = PROMPT_EXTRACAO, timeout: float = 60.0, nome_modelo: str = "http"):
+        self.url = url
+        self.nome_modelo = nome_modelo
+        self.prompt = prompt
+        self.timeout = timeout
+
+    def extrair(self, caminho_pdf: str) -> str:
+        with open(caminho_pdf, "rb") as f:
+            corpo = f.read()
+        requisicao = urllib.request.Request(self.url, data=corpo, method="POST", headers={
+            "Content-Type": "application/pdf",
+            "X-Arquivo": os.path.basename(caminho_pdf).encode("utf-8").hex(),
+            "X-Prompt": self.prompt.encode("utf-8").hex(),
+        })
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+                texto = json.loads(resposta.read().decode("utf-8")).get("texto", "")
+        except urllib.error.HTTPError as e:
+            if e.code in self.STATUS_TRANSITORIOS:
+                raise ErroTransitorio(f"HTTP {e.code}") from e
+            raise ErroExtracao(f"HTTP {e.code}") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise ErroTransitorio(str(e)) from e
+        return _texto_da_resposta(texto, caminho_pdf)
+
+# -------------------------------------------------------------------
+# controle de taxa e novas tentativas
+# -------------------------------------------------------------------
+class LimitadorTaxa:
+    """Token bucket compartilhado entre as threads: `taxa` fichas/s, até `capacidade` acumuladas."""
+
+    def __init__(self, taxa: float = REQUISICOES_POR_SEGUNDO, capacidade: int = RAJADA):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = float(capacidade)
+        self.ultimo = time.monotonic()
+        self.trava = threading.Lock()
+
+    def adquirir(self):
+        """Bloqueia até haver uma ficha disponível e a consome."""
+        while True:
+            with self.trava:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade, self.fichas + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.taxa
+            time.sleep(espera)
+
+def extrair_com_retentativas(backend, caminho_pdf: str, limitador: LimitadorTaxa = None,
+                             tentativas: int = TENTATIVAS, espera_base: float = ESPERA_BASE,
+                             espera_maxima: float = ESPERA_MAXIMA) -> str:
+    """
+    Chama backend.extrair respeitando o limitador; em ErroTransitorio espera
+    espera_base * 2^n (com jitter, até espera_maxima) e tenta de novo.
+    Depois da última tentativa, relança o erro.
+    """
+    for tentativa in range(tentativas):
+        if limitador:
+            limitador.adquirir()
+        try:
+            return backend.extrair(caminho_pdf)
+        except ErroTransitorio:
+            if tentativa == tentativas - 1:
+                raise
+            espera = min(espera_maxima, espera_base * 2 ** tentativa)
+            time.sleep(espera * random.uniform(0.5, 1.0))
+
+def extrair_texto_via_gemini(caminho_pdf: str, backend=None, limitador: LimitadorTaxa = None) -> str:
     """
     Envia o PDF para o modelo Gemini e retorna o texto limpo,
     pronto para extração de entidades com spaCy.
+    Lança ErroExtracao se não for possível obter texto.
+    """
+    return extrair_com_retentativas(backend or BackendGemini(), caminho_pdf, limitador)
+
+def gravar_texto(caminho_saida: str, texto: str):
+    if os.path.exists(caminho_saida):
+        with open(caminho_saida, "r", encoding="utf-8") as f:
+            if f.read() == texto:
+                return
+    # grava num temporário e renomeia: nunca fica um .txt vazio ou pela metade
+    temporario = caminho_saida + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporario, caminho_saida)
+
+def fracao_lixo(texto: str) -> float:
+    """Fração dos caracteres visíveis que não são letras, dígitos ou pontuação comum."""
+    visiveis = [c for c in texto if not c.isspace()]
+    if not visiveis:
+        return 1.0
+    return sum(1 for c in visiveis if not (c.isalnum() or c in CARACTERES_ACEITOS)) / len(visiveis)
+
+def pagina_utilizavel(texto: str) -> bool:
+    """A camada de texto da página tem conteúdo suficiente e legível?"""
+    return len("".join(texto.split())) >= MIN_CARACTERES_PAGINA and fracao_lixo(texto) <= MAX_FRACAO_LIXO
+
+def preparar_pdf(caminho_pdf: str, pasta_temp: str):
+    """
+    Lê a camada de texto de cada página e divide o PDF em segmentos, na ordem das páginas:
+    ("local", texto, n_paginas) ou ("remoto", caminho_pdf, n_paginas).
+    Cada sequência contínua de páginas sem texto utilizável vira um PDF temporário
+    (o próprio arquivo, se nenhuma página tiver texto), enviado ao backend numa única chamada.
     """
     try:
-        file_ref = genai.upload_file(caminho_pdf)
-        response = genai.GenerativeModel("gemini-2.5-flash").generate_content([
-            file_ref,
-            (
-                "Extraia **todo o texto legível** deste documento PDF de forma contínua. "
-                "Remova formatações, quebras de linha, cabeçalhos, rodapés, numeração de páginas e caracteres estranhos. "
-                "Mantenha apenas o conteúdo textual principal em uma única linha (ou frases separadas por ponto final). "
-                "Preserve números, siglas, nomes e símbolos como nº, /, -, . e %. "
-                "Retorne o texto limpo e linearizado, ideal para processamento com spaCy."
-            )
-        ])
-        if response and response.text:
-            texto = response.text.strip()
-            # Normalização extra para garantir consistência
-            texto = ' '.join(texto.split())  # remove múltiplos espaços e quebras
-            return texto
-        return ""
+        doc = fitz.open(caminho_pdf)
     except Exception as e:
-        print(f"Erro ao processar {os.path.basename(caminho_pdf)}: {e}")
-        return ""
+        print(f"⚠️ PyMuPDF não abriu {os.path.basename(caminho_pdf)} ({e}); enviando o PDF inteiro")
+        return [("remoto", caminho_pdf, 0)]
 
-def processar_pdfs(pasta_entrada: str = INPUT_DIR):
-    """Processa todos os PDFs da pasta e salva o texto extraído em .txt."""
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    with doc:
+        return segmentar_pdf(doc, os.path.splitext(os.path.basename(caminho_pdf))[0], pasta_temp, caminho_pdf)
+
+def segmentar_pdf(doc, nome: str, pasta_temp: str, caminho_pdf: str = None, hibrido: bool = True):
+    """
+    Segmentos de preparar_pdf para um documento já aberto (ex.: montado em memória).
+    Sem `caminho_pdf`, até o documento inteiro é gravado em pasta_temp quando vai ao backend;
+    com hibrido=False, o documento inteiro vai ao backend.
+    """
+    textos = [pagina.get_text("text") for pagina in doc] if hibrido else [""] * len(doc)
+    segmentos = []
+    paginas = enumerate(textos)
+    for utilizavel, grupo in groupby(paginas, key=lambda item: pagina_utilizavel(item[1])):
+        grupo = list(grupo)
+        if utilizavel:
+            segmentos.append(("local", " ".join(texto for _, texto in grupo), len(grupo)))
+            continue
+        inicio, fim = grupo[0][0], grupo[-1][0]
+        if len(grupo) == len(textos) and caminho_pdf is not None:
+            caminho = caminho_pdf
+        else:
+            caminho = os.path.join(pasta_temp, f"{nome}_p{inicio + 1}-{fim + 1}.pdf")
+            with fitz.open() as parte:
+                parte.insert_pdf(doc, from_page=inicio, to_page=fim)
+                parte.save(caminho)
+        segmentos.append(("remoto", caminho, len(grupo)))
+    return segmentos
+
+def texto_dos_segmentos(segmentos, obter_backend, limitador: LimitadorTaxa = None, tentativas: int = TENTATIVAS,
+                        espera_base: float = ESPERA_BASE, estatisticas: dict = None, trava=None) -> str:
+    """
+    Junta, na ordem, o texto local e o devolvido pelo backend para cada segmento remoto
+    e devolve o texto limpo. Lança ErroExtracao se não sobrar texto.
+    """
+    partes = []
+    for origem, conteudo, n_paginas in segmentos:
+        if origem == "local":
+            partes.append(conteudo)
+            continue
+        inicio = time.perf_counter()
+        partes.append(extrair_com_retentativas(obter_backend(), conteudo, limitador,
+                                               tentativas=tentativas, espera_base=espera_base))
+        if estatisticas is not None:
+            with trava:
+                estatisticas["tempo_remoto"] += time.perf_counter() - inicio
+                estatisticas["chamadas_remotas"] += 1
+                estatisticas["paginas_remotas"] += n_paginas
+    texto = limpar_texto(" ".join(partes))
+    if not texto:
+        raise ErroExtracao("nenhum texto extraído")
+    return texto
+
+def chave_cache(caminho_pdf: str, backend=None, hibrido: bool = EXTRACAO_HIBRIDA, pdf_sha: str = None) -> tuple:
+    """
+    (sha256 do PDF, modelo, versão do prompt, modo) — o modo inclui os limiares da camada de texto.
+    `pdf_sha` substitui o hash do arquivo (ex.: documento montado em memória a partir de um compilado).
+    """
+    modelo = getattr(backend, "nome_modelo", MODELO_GEMINI)
+    prompt = getattr(backend, "prompt", PROMPT_EXTRACAO)
+    modo = f"hibrido:{MIN_CARACTERES_PAGINA}:{MAX_FRACAO_LIXO}" if hibrido else "remoto"
+    return pdf_sha or sha256_arquivo(caminho_pdf), modelo, versao_prompt(prompt), modo
+
+def relatorio_extracao(estatisticas: dict):
+    locais, remotas = estatisticas["paginas_locais"], estatisticas["paginas_remotas"]
+    total = locais + remotas
+    if not total:
+        return
+    por_pagina = estatisticas["tempo_remoto"] / remotas if remotas else SEGUNDOS_POR_PAGINA_REMOTA
+    economia = locais * por_pagina - estatisticas["tempo_local"]
+    print(f"📑 Páginas: {locais}/{total} pela camada de texto ({estatisticas['tempo_local']:.1f}s), "
+          f"{remotas} pelo backend remoto em {estatisticas['chamadas_remotas']} chamada(s) "
+          f"({estatisticas['tempo_remoto']:.1f}s)")
+    print(f"⏱️ Economia estimada: {economia:.1f}s ({por_pagina:.2f}s por página remota"
+          f"{'' if remotas else ', estimativa'})")
+
+def processar_pdfs(pasta_entrada: str = INPUT_DIR, pasta_saida: str = OUTPUT_DIR, backend=None,
+                   concorrencia: int = CONCORRENCIA, requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                   rajada: int = RAJADA, tentativas: int = TENTATIVAS, espera_base: float = ESPERA_BASE,
+                   hibrido: bool = EXTRACAO_HIBRIDA, usar_cache: bool = USAR_CACHE_EXTRACAO):
+    """
+    Processa todos os PDFs da pasta em paralelo e salva o texto extraído em .txt.
+    No modo híbrido, as páginas com camada de texto são lidas localmente (PyMuPDF)
+    e só as demais vão ao backend remoto.
+    Com o cache, PDFs já extraídos (mesmo conteúdo, prompt e modelo) não são reprocessados
+    e o .txt só é regravado se mudou.
+    PDFs que falharem (mesmo após as novas tentativas) não geram arquivo e são listados no final.
+    Devolve {"ok": [...], "falhas": {arquivo: erro}, "estatisticas": {...}}.
+    """
+    if not os.path.exists(pasta_saida):
+        os.makedirs(pasta_saida)
 
     arquivos_pdf = [f for f in os.listdir(pasta_entrada) if f.lower().endswith(".pdf")]
     if not arquivos_pdf:
         print("Nenhum PDF encontrado.")
-        return
+        return {"ok": [], "falhas": {}, "estatisticas": {}}
+
+    limitador = LimitadorTaxa(requisicoes_por_segundo, rajada)
+    trava = threading.Lock()
+    estatisticas = {"paginas_locais": 0, "paginas_remotas": 0, "chamadas_remotas": 0,
+                    "tempo_local": 0.0, "tempo_remoto": 0.0}
+    backends = [backend]
+
+    def obter_backend():
+        # o Gemini só é configurado se alguma página precisar dele
+        with trava:
+            if backends[0] is None:
+                backends[0] = BackendGemini()
+        return backends[0]
 
-    for arquivo in tqdm(arquivos_pdf, desc="Extraindo texto dos PDFs", ncols=80):
-        caminho_pdf = os.path.join(pasta_entrada, arquivo)
-        texto_extraido = extrair_texto_via_gemini(caminho_pdf)
+    def tarefa(arquivo, segmentos):
+        texto = texto_dos_segmentos(segmentos, obter_backend, limitador, tentativas, espera_base, estatisticas, trava)
+        gravar_texto(os.path.join(pasta_saida, os.path.splitext(arquivo)[0] + ".txt"), texto)
+        return texto
 
-        nome_saida = os.path.splitext(arquivo)[0] + ".txt"
-        caminho_saida = os.path.join(OUTPUT_DIR, nome_saida)
+    cache = CacheExtracao() if usar_cache else None
+    ok, falhas = [], {}
+    with tempfile.TemporaryDirectory(prefix="extracao_") as pasta_temp, \
+            ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        futuros, chaves = {}, {}
+        # a leitura com PyMuPDF fica na thread principal (o fitz não é thread-safe);
+        # só as chamadas ao backend rodam no pool
+        for arquivo in arquivos_pdf:
+            caminho_pdf = os.path.join(pasta_entrada, arquivo)
+            if cache:
+                chaves[arquivo] = chave_cache(caminho_pdf, backend, hibrido)
+                texto = cache.obter(chaves[arquivo])
+                if texto is not None:
+                    gravar_texto(os.path.join(pasta_saida, os.path.splitext(arquivo)[0] + ".txt"), texto)
+                    ok.append(arquivo)
+                    continue
+            if hibrido:
+                inicio = time.perf_counter()
+                segmentos = preparar_pdf(caminho_pdf, pasta_temp)
+                estatisticas["tempo_local"] += time.perf_counter() - inicio
+                estatisticas["paginas_locais"] += sum(n for origem, _, n in segmentos if origem == "local")
+            else:
+                segmentos = [("remoto", caminho_pdf, 0)]
+            futuros[executor.submit(tarefa, arquivo, segmentos)] = arquivo
 
-        with open(caminho_saida, "w", encoding="utf-8") as f:
-            f.write(texto_extraido)
+        for futuro in tqdm(as_completed(futuros), total=len(futuros), desc="Extraindo texto dos PDFs", ncols=80):
+            arquivo = futuros[futuro]
+            try:
+                texto = futuro.result()
+                ok.append(arquivo)
+            except (ErroExtracao, OSError) as e:
+                falhas[arquivo] = str(e)
+                continue
+            if cache:
+                cache.guardar(chaves[arquivo], texto)
 
-    print(f"\nTextos extraídos salvos em: {OUTPUT_DIR}")
\ No newline at end of file
+    print(f"\nTextos extraídos salvos em: {pasta_saida} ({len(ok)}/{len(arquivos_pdf)})")
+    if falhas:
+        print(f"⚠️ {len(falhas)} PDF(s) sem texto (nenhum arquivo gravado):")
+        for arquivo, erro in falhas.items():
+            print(f" - {arquivo}: {erro}")
+    relatorio_extracao(estatisticas)
+    if cache:
+        cache.relatorio()
+        cache.fechar()
+    return {"ok": ok, "falhas": falhas, "estatisticas": estatisticas}
@@ -0,0 +1,537 @@
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import extrair_texto
+from resultados import BaseResultados
+from entidades import Entidades
+
+# -------------------------------------------------------------------
+# execuções em lote retomáveis: fila de trabalho em SQLite
+# -------------------------------------------------------------------
+# Um trabalho é uma pasta com a fila (fila.sqlite), os textos extraídos e a base de resultados.
+# Cada documento passa por três etapas, cada uma uma tarefa na fila:
+#   deteccao (um compilado) → texto (um documento do compilado) → analise (o .txt do documento)
+# Os trabalhadores (processos nesta máquina ou em outras que vejam a mesma pasta) reservam tarefas por
+# PRAZO_RESERVA segundos, renovados enquanto estão vivos: a reserva de um trabalhador que caiu expira e a
+# tarefa volta para a fila, contando como uma tentativa (uma tarefa que derruba o processo acaba como
+# "falhou", como as que dão erro). Concluir uma tarefa e criar as da etapa seguinte é uma única transação, então
+# um trabalho interrompido continua de onde parou.
+
+FILA = "fila.sqlite"
+PASTA_TEXTOS = "textos"
+RESULTADOS = "resultados.sqlite"
+ETAPAS = ("deteccao", "texto", "analise")
+PRAZO_RESERVA = 300.0      # segundos até a reserva de um trabalhador sem sinal de vida expirar
+TAREFAS_POR_RESERVA = {"deteccao": 1, "texto": 16, "analise": 64}
+TENTATIVAS_TAREFA = 3      # falhas até a tarefa ficar como "falhou"
+INTERVALO_ESPERA = 1.0     # segundos entre consultas quando só restam tarefas reservadas por outros
+ESPERA_TRAVA = 60.0        # segundos esperando outro processo liberar o arquivo da fila
+JANELA_VAZAO = 60.0        # segundos considerados na vazão recente (progresso)
+
+
+class FilaTrabalho:
+    """
+    Fila de tarefas de um trabalho (pasta). Cada tarefa é única por (etapa, chave) e está pendente,
+    reservada (com dono e validade), concluida ou falhou (após TENTATIVAS_TAREFA erros, com o último).
+    O arquivo fica no diário padrão do SQLite (sem WAL), que funciona também num disco compartilhado.
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+        os.makedirs(os.path.join(pasta, PASTA_TEXTOS), exist_ok=True)
+        # autocommit: as transações são abertas com BEGIN IMMEDIATE (trava de escrita desde o início)
+        self.conn = sqlite3.connect(os.path.join(pasta, FILA), timeout=ESPERA_TRAVA, isolation_level=None)
+        self.conn.executescript("""
+            PRAGMA journal_mode = DELETE;
+            CREATE TABLE IF NOT EXISTS tarefas (
+                id         INTEGER PRIMARY KEY,
+                etapa      TEXT NOT NULL,
+                chave      TEXT NOT NULL,
+                dados      TEXT NOT NULL,   -- JSON com o que a etapa precisa
+                estado     TEXT NOT NULL DEFAULT 'pendente',
+                dono       TEXT,
+                expira     REAL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                erro       TEXT,
+                inicio     REAL,
+                fim        REAL,
+                UNIQUE (etapa, chave)
+            );
+            CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON tarefas (etapa, estado, id);
+            CREATE TABLE IF NOT EXISTS trabalho (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+        """)
+
+    @contextmanager
+    def _transacao(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def caminho(self, *partes) -> str:
+        return os.path.join(self.pasta, *partes)
+
+    def execucao(self) -> int:
+        """Execução da base de resultados (RESULTADOS, na pasta) em que todos os trabalhadores registram."""
+        with self._transacao() as conn:
+            linha = conn.execute("SELECT valor FROM trabalho WHERE chave = 'execucao'").fetchone()
+            if linha:
+                return int(linha[0])
+            base = BaseResultados(self.caminho(RESULTADOS), origem=os.path.basename(os.path.abspath(self.pasta)),
+                                  wal=False)
+            execucao = base.iniciar_execucao()
+            base.fechar()
+            conn.execute("INSERT INTO trabalho VALUES ('execucao', ?)", (str(execucao),))
+            return execucao
+
+    def adicionar(self, pdfs) -> int:
+        """Inclui compilados no trabalho (os já incluídos são ignorados). Devolve quantos entraram."""
+        self.execucao()
+        novos = 0
+        with self._transacao() as conn:
+            rotulos = {json.loads(dados)["rotulo"] for dados, in
+                       conn.execute("SELECT dados FROM tarefas WHERE etapa = 'deteccao'")}
+            for pdf in pdfs:
+                pdf = os.path.abspath(pdf)
+                base = rotulo = os.path.splitext(os.path.basename(pdf))[0]
+                n = 1
+                while rotulo in rotulos:   # compilados com o mesmo nome em pastas diferentes
+                    n += 1
+                    rotulo = f"{base}_{n}"
+                cursor = conn.execute("INSERT OR IGNORE INTO tarefas (etapa, chave, dados) VALUES ('deteccao', ?, ?)",
+                                      (pdf, json.dumps({"pdf": pdf, "rotulo": rotulo}, ensure_ascii=False)))
+                if cursor.rowcount:
+                    rotulos.add(rotulo)
+                    novos += 1
+        return novos
+
+    def reservar(self, dono: str, etapas=ETAPAS):
+        """
+        Reserva até TAREFAS_POR_RESERVA tarefas de uma etapa (a mais adiantada com tarefas livres, para
+        os documentos saírem do fluxo assim que possível). Devolve (etapa, [(id, chave, dados)]).
+        As reservas expiradas voltam antes à fila como uma falha (ver falhar).
+        """
+        agora = time.time()
+        with self._transacao() as conn:
+            conn.execute(
+                "UPDATE tarefas SET tentativas = tentativas + 1, erro = ?, dono = NULL, expira = NULL, fim = ?, "
+                "estado = CASE WHEN tentativas + 1 >= ? THEN 'falhou' ELSE 'pendente' END "
+                "WHERE estado = 'reservada' AND expira < ?",
+                ("reserva expirada: o trabalhador parou sem concluir a tarefa", agora, TENTATIVAS_TAREFA, agora)
+            )
+            for etapa in sorted(etapas, key=ETAPAS.index, reverse=True):
+                linhas = conn.execute(
+                    "SELECT id, chave, dados FROM tarefas WHERE etapa = ? AND estado = 'pendente' ORDER BY id LIMIT ?",
+                    (etapa, TAREFAS_POR_RESERVA[etapa])
+                ).fetchall()
+                if linhas:
+                    conn.executemany("UPDATE tarefas SET estado = 'reservada', dono = ?, expira = ?, inicio = ? "
+                                     "WHERE id = ?", [(dono, agora + PRAZO_RESERVA, agora, id_) for id_, _, _ in linhas])
+                    return etapa, [(id_, chave, json.loads(dados)) for id_, chave, dados in linhas]
+        return None, []
+
+    def concluir(self, dono: str, ids, novas=()) -> bool:
+        """
+        Marca as tarefas como concluídas e cria as `novas` [(etapa, chave, dados)], na mesma transação.
+        Se alguma reserva expirou e passou a outro trabalhador, nada é gravado e devolve False.
+        """
+        if not ids:
+            return True
+        with self._transacao() as conn:
+            marcadores = ", ".join("?" * len(ids))
+            minhas = conn.execute(f"SELECT COUNT(*) FROM tarefas WHERE id IN ({marcadores}) AND dono = ? "
+                                  "AND estado = 'reservada'", (*ids, dono)).fetchone()[0]
+            if minhas != len(ids):
+                return False
+            conn.executemany("UPDATE tarefas SET estado = 'concluida', fim = ?, erro = NULL WHERE id = ?",
+                             [(time.time(), id_) for id_ in ids])
+            conn.executemany("INSERT OR IGNORE INTO tarefas (etapa, chave, dados) VALUES (?, ?, ?)",
+                             [(etapa, chave, json.dumps(dados, ensure_ascii=False)) for etapa, chave, dados in novas])
+        return True
+
+    def falhar(self, dono: str, id_: int, erro: str):
+        """Devolve a tarefa à fila, ou a marca como falhou na TENTATIVAS_TAREFA-ésima falha."""
+        with self._transacao() as conn:
+            conn.execute(
+                "UPDATE tarefas SET tentativas = tentativas + 1, erro = ?, dono = NULL, expira = NULL, fim = ?, "
+                "estado = CASE WHEN tentativas + 1 >= ? THEN 'falhou' ELSE 'pendente' END "
+                "WHERE id = ? AND dono = ? AND estado = 'reservada'",
+                (erro, time.time(), TENTATIVAS_TAREFA, id_, dono)
+            )
+
+    def renovar(self, dono: str):
+        """Estende as reservas do trabalhador (sinal de vida)."""
+        self.conn.execute("UPDATE tarefas SET expira = ? WHERE dono = ? AND estado = 'reservada'",
+                          (time.time() + PRAZO_RESERVA, dono))
+
+    def liberar(self, dono: str):
+        """Devolve à fila as tarefas ainda reservadas pelo trabalhador (saída antes de concluí-las)."""
+        self.conn.execute("UPDATE tarefas SET estado = 'pendente', dono = NULL, expira = NULL "
+                          "WHERE dono = ? AND estado = 'reservada'", (dono,))
+
+    def restantes(self, etapas=ETAPAS) -> int:
+        """
+        Tarefas pendentes ou reservadas das `etapas` e das anteriores a elas (que ainda podem gerar trabalho).
+        """
+        ate = max(ETAPAS.index(etapa) for etapa in etapas)
+        marcadores = ", ".join("?" * (ate + 1))
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM tarefas WHERE estado IN ('pendente', 'reservada') AND etapa IN ({marcadores})",
+            ETAPAS[:ate + 1]
+        ).fetchone()[0]
+
+    def reabrir_falhas(self, etapa: str = None) -> int:
+        """Devolve à fila as tarefas que falharam (de uma etapa ou de todas), com as tentativas zeradas."""
+        sql = "UPDATE tarefas SET estado = 'pendente', tentativas = 0 WHERE estado = 'falhou'"
+        cursor = self.conn.execute(sql + (" AND etapa = ?" if etapa else ""), (etapa,) if etapa else ())
+        return cursor.rowcount
+
+    def falhas(self):
+        """[(etapa, chave, tentativas, erro)] das tarefas que falharam."""
+        return self.conn.execute("SELECT etapa, chave, tentativas, erro FROM tarefas WHERE estado = 'falhou' "
+                                 "ORDER BY id").fetchall()
+
+    def progresso(self) -> dict:
+        """
+        Por etapa: tarefas em cada estado, vazão desde a primeira reserva e nos últimos JANELA_VAZAO segundos
+        (tarefas concluídas por segundo) e trabalhadores com reservas.
+        """
+        agora = time.time()
+        resultado = {}
+        for etapa in ETAPAS:
+            estados = dict(self.conn.execute("SELECT estado, COUNT(*) FROM tarefas WHERE etapa = ? GROUP BY estado",
+                                             (etapa,)).fetchall())
+            inicio, fim, recentes = self.conn.execute(
+                "SELECT MIN(inicio), MAX(fim), SUM(fim >= ?) FROM tarefas WHERE etapa = ? AND estado = 'concluida'",
+                (agora - JANELA_VAZAO, etapa)
+            ).fetchone()
+            concluidas = estados.get("concluida", 0)
+            resultado[etapa] = {
+                "total": sum(estados.values()),
+                **{estado: estados.get(estado, 0) for estado in ("pendente", "reservada", "concluida", "falhou")},
+                "por_segundo": concluidas / (fim - inicio) if concluidas and fim > inicio else 0.0,
+                "por_segundo_recente": (recentes or 0) / JANELA_VAZAO,
+                "trabalhadores": self.conn.execute(
+                    "SELECT COUNT(DISTINCT dono) FROM tarefas WHERE etapa = ? AND estado = 'reservada' AND expira >= ?",
+                    (etapa, agora)
+                ).fetchone()[0],
+            }
+        return resultado
+
+    def relatorio(self) -> dict:
+        p = self.progresso()
+        print(f"\n📋 Trabalho {self.pasta}:")
+        print(f" {'etapa':<9} {'total':>7} {'pend.':>7} {'reserv.':>7} {'concl.':>7} {'falhou':>6} "
+              f"{'/s':>7} {'/s (1 min)':>10} {'trab.':>5}")
+        for etapa, e in p.items():
+            print(f" {etapa:<9} {e['total']:>7} {e['pendente']:>7} {e['reservada']:>7} {e['concluida']:>7} "
+                  f"{e['falhou']:>6} {e['por_segundo']:>7.1f} {e['por_segundo_recente']:>10.1f} "
+                  f"{e['trabalhadores']:>5}")
+        return p
+
+    def fechar(self):
+        self.conn.close()
+
+
+class Trabalhador:
+    """
+    Processa tarefas da fila até não sobrar nenhuma das suas `etapas` nem das anteriores.
+    Uma thread renova as reservas a cada PRAZO_RESERVA / 3 segundos. As etapas usam as mesmas funções
+    do fluxo em memória (main.gerar_pipeline), com os mesmos caches; a análise registra na execução do
+    trabalho (FilaTrabalho.execucao) com o nome "<compilado>/<documento>".
+    """
+
+    def __init__(self, pasta: str, etapas=ETAPAS, backend=None,
+                 extracao_hibrida: bool = extrair_texto.EXTRACAO_HIBRIDA,
+                 concorrencia: int = extrair_texto.CONCORRENCIA, nlp=None, analise_hibrida: bool = False,
+                 usar_cache: bool = True, nome: str = None):
+        self.pasta = pasta
+        self.etapas = tuple(etapas)
+        self.backend = backend
+        self.extracao_hibrida = extracao_hibrida
+        self.concorrencia = concorrencia
+        self.nlp = nlp
+        self.analise_hibrida = analise_hibrida
+        self.usar_cache = usar_cache
+        self.nome = nome or f"{socket.gethostname()}:{os.getpid()}"
+        self.fila = FilaTrabalho(pasta)
+        self.base = None
+        self.cache_extracao = None
+        self.concluidas = {etapa: 0 for etapa in ETAPAS}
+        self.estatisticas = {"paginas_locais": 0, "paginas_remotas": 0, "chamadas_remotas": 0,
+                             "tempo_local": 0.0, "tempo_remoto": 0.0}
+        self.trava = threading.Lock()
+        self.limitador = extrair_texto.LimitadorTaxa(extrair_texto.REQUISICOES_POR_SEGUNDO, extrair_texto.RAJADA)
+
+    def _obter_backend(self):
+        with self.trava:
+            if self.backend is None:
+                self.backend = extrair_texto.BackendGemini()
+        return self.backend
+
+    def _renovar(self, parar: threading.Event):
+        fila = FilaTrabalho(self.pasta)   # conexão própria desta thread
+        try:
+            while not parar.wait(PRAZO_RESERVA / 3):
+                fila.renovar(self.nome)
+        finally:
+            fila.fechar()
+
+    def executar(self) -> dict:
+        """Roda até a fila esvaziar (para estas etapas). Devolve as tarefas concluídas por etapa."""
+        parar = threading.Event()
+        pulso = threading.Thread(target=self._renovar, args=(parar,), daemon=True)
+        pulso.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix="fila_") as self.pasta_temp:
+                while True:
+                    etapa, tarefas = self.fila.reservar(self.nome, self.etapas)
+                    if not tarefas:
+                        if not self.fila.restantes(self.etapas):
+                            break
+                        time.sleep(INTERVALO_ESPERA)   # o resto está reservado por outros (ou ainda vai ser criado)
+                        continue
+                    getattr(self, f"_{etapa}")(tarefas)
+        finally:
+            parar.set()
+            pulso.join()
+            self.fila.liberar(self.nome)
+            self.fila.fechar()
+            if self.base:
+                self.base.fechar()
+            if self.cache_extracao:
+                self.cache_extracao.fechar()
+        print(f"\n👷 {self.nome}: " + ", ".join(f"{etapa} {n}" for etapa, n in self.concluidas.items()))
+        extrair_texto.relatorio_extracao(self.estatisticas)
+        return self.concluidas
+
+    def _concluir(self, etapa: str, ids, novas=()):
+        if self.fila.concluir(self.nome, ids, novas):
+            self.concluidas[etapa] += len(ids)
+        else:
+            print(f"⚠️ {self.nome}: reserva expirada em {etapa}; as tarefas ficam com outro trabalhador")
+
+    # --- etapas ---
+    def _deteccao(self, tarefas):
+        import fitz  # PyMuPDF
+        from cache_extracao import sha256_arquivo
+        from extraindo_compilado import detectar_inicios, intervalos_documentos, nome_documento
+
+        for id_, _, dados in tarefas:
+            try:
+                inicios = detectar_inicios(dados["pdf"])
+                with fitz.open(dados["pdf"]) as doc:
+                    documentos = intervalos_documentos(inicios, len(doc))
+                sha = sha256_arquivo(dados["pdf"])
+            except Exception as e:
+                self.fila.falhar(self.nome, id_, f"{type(e).__name__}: {e}")
+                continue
+            novas = []
+            for i, inicio, fim, tipo in documentos:
+                nome = nome_documento(i, tipo)
+                novas.append(("texto", f"{dados['rotulo']}/{nome}",
+                              {**dados, "nome": nome, "inicio": inicio, "fim": fim, "sha": sha}))
+            print(f"🔎 {dados['rotulo']}: {len(novas)} documento(s)")
+            self._concluir("deteccao", [id_], novas)
+
+    def _texto(self, tarefas):
+        import fitz  # PyMuPDF
+        from cache_extracao import CacheExtracao
+        from extraindo_compilado import montar_documento
+
+        if self.usar_cache and self.cache_extracao is None:
+            self.cache_extracao = CacheExtracao()
+
+        def concluir(id_, chave, dados, texto):
+            caminho = os.path.join(PASTA_TEXTOS, dados["rotulo"], dados["nome"] + ".txt")
+            os.makedirs(self.fila.caminho(PASTA_TEXTOS, dados["rotulo"]), exist_ok=True)
+            extrair_texto.gravar_texto(self.fila.caminho(caminho), texto)
+            self._concluir("texto", [id_], [("analise", chave, {"texto": caminho})])
+
+        # o PyMuPDF fica nesta thread (não é thread-safe); só as chamadas ao backend vão para o pool
+        with ThreadPoolExecutor(max_workers=self.concorrencia) as executor:
+            futuros = {}
+            abertos = {}
+            try:
+                for id_, chave, dados in tarefas:
+                    chave_cache = extrair_texto.chave_cache(None, self.backend, self.extracao_hibrida,
+                                                            pdf_sha=f"{dados['sha']}:{dados['inicio']}-{dados['fim']}")
+                    texto = self.cache_extracao.obter(chave_cache) if self.cache_extracao else None
+                    if texto is not None:
+                        concluir(id_, chave, dados, texto)
+                        continue
+                    try:
+                        if dados["pdf"] not in abertos:
+                            abertos[dados["pdf"]] = fitz.open(dados["pdf"])
+                        novo_pdf, _ = montar_documento(abertos[dados["pdf"]], dados["inicio"], dados["fim"])
+                        with novo_pdf:
+                            inicio = time.perf_counter()
+                            segmentos = extrair_texto.segmentar_pdf(novo_pdf, f"{id_}_{dados['nome']}",
+                                                                    self.pasta_temp, hibrido=self.extracao_hibrida)
+                            with self.trava:
+                                self.estatisticas["tempo_local"] += time.perf_counter() - inicio
+                                self.estatisticas["paginas_locais"] += sum(n for origem, _, n in segmentos
+                                                                           if origem == "local")
+                    except Exception as e:
+                        self.fila.falhar(self.nome, id_, f"{type(e).__name__}: {e}")
+                        continue
+                    futuro = executor.submit(extrair_texto.texto_dos_segmentos, segmentos, self._obter_backend,
+                                             self.limitador, estatisticas=self.estatisticas, trava=self.trava)
+                    futuros[futuro] = (id_, chave, dados, chave_cache, segmentos)
+            finally:
+                for doc in abertos.values():
+                    doc.close()
+
+            for futuro in as_completed(futuros):
+                id_, chave, dados, chave_cache, segmentos = futuros[futuro]
+                try:
+                    texto = futuro.result()
+                except Exception as e:
+                    self.fila.falhar(self.nome, id_, f"{type(e).__name__}: {e}")
+                    continue
+                finally:
+                    for origem, caminho, _ in segmentos:
+                        if origem == "remoto" and os.path.exists(caminho):
+                            os.remove(caminho)
+                if self.cache_extracao:
+                    self.cache_extracao.guardar(chave_cache, texto)
+                concluir(id_, chave, dados, texto)
+
+    def _analise(self, tarefas):
+        import analisar_spacy
+
+        if self.nlp is None:
+            self.nlp = analisar_spacy.obter_pipeline()
+        if self.base is None:
+            self.base = BaseResultados(self.fila.caminho(RESULTADOS), execucao=self.fila.execucao(), wal=False)
+
+        textos, ids = {}, {}
+        for id_, chave, dados in tarefas:
+            try:
+                with open(self.fila.caminho(dados["texto"]), "r", encoding="utf-8") as f:
+                    textos[chave] = analisar_spacy.limpar_texto(f.read())
+            except Exception as e:
+                self.fila.falhar(self.nome, id_, f"{type(e).__name__}: {e}")
+                continue
+            ids[chave] = id_
+
+        # o cache de análise segura uma transação aberta entre gravações: com vários processos, fica desligado
+        analisar = lambda entradas: analisar_spacy.analisar_entradas(entradas, lote=True, nlp=self.nlp,
+                                                                     hibrido=self.analise_hibrida, spans=True)
+        try:
+            analises = dict(analisar(textos.items()))
+        except Exception:
+            # um documento com defeito não derruba o lote: refeitos um a um, só os que falharem de novo
+            # vão para falhar() (contam uma tentativa), como nas outras etapas
+            analises = {}
+            for chave, texto in textos.items():
+                try:
+                    analises.update(analisar([(chave, texto)]))
+                except Exception as e:
+                    self.fila.falhar(self.nome, ids[chave], f"{type(e).__name__}: {e}")
+
+        concluidas = []
+        for chave, spans in analises.items():
+            try:
+                entidades = Entidades.de_spans(spans)
+                _, resultado = analisar_spacy.validar_documento(chave + ".txt", entidades,
+                                                                analisar_spacy.criterios_obrigatorios, imprimir=False)
+                self.base.registrar(chave, entidades, resultado, textos[chave])
+            except Exception as e:
+                self.fila.falhar(self.nome, ids[chave], f"{type(e).__name__}: {e}")
+                continue
+            concluidas.append(ids[chave])
+        # os resultados são gravados antes de concluir as tarefas: numa queda entre os dois passos,
+        # o lote é refeito e os documentos aparecem duas vezes na execução (no máximo um lote)
+        self.base.gravar()
+        self._concluir("analise", concluidas)
+
+
+def _trabalhar(pasta: str, opcoes: dict):
+    return Trabalhador(pasta, **opcoes).executar()
+
+
+def trabalhar(pasta: str, processos: int = 1, **opcoes):
+    """
+    Roda `processos` trabalhadores nesta máquina até a fila esvaziar (opcoes: as de Trabalhador)
+    e imprime o progresso por etapa. Outras máquinas podem rodar trabalhadores na mesma pasta.
+    """
+    inicio = time.perf_counter()
+    if processos <= 1:
+        _trabalhar(pasta, opcoes)
+    else:
+        filhos = [multiprocessing.Process(target=_trabalhar, args=(pasta, opcoes), name=f"trabalhador-{n}")
+                  for n in range(processos)]
+        for filho in filhos:
+            filho.start()
+        for filho in filhos:
+            filho.join()
+    fila = FilaTrabalho(pasta)
+    try:
+        progresso = fila.relatorio()
+        falhas = fila.falhas()
+    finally:
+        fila.fechar()
+    print(f"⏱️ {time.perf_counter() - inicio:.1f}s; resultados em {os.path.join(pasta, RESULTADOS)}")
+    if falhas:
+        print(f"⚠️ {len(falhas)} tarefa(s) falharam (python fila_trabalho.py reabrir {pasta}):")
+        for etapa, chave, tentativas, erro in falhas[:20]:
+            print(f" - {etapa} {chave} ({tentativas}x): {erro}")
+    return progresso
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trabalhos em lote retomáveis sobre vários PDFs compilados.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    adicionar = comandos.add_parser("adicionar", help="inclui compilados (PDFs ou pastas de PDFs) no trabalho")
+    adicionar.add_argument("pasta", help="pasta do trabalho (fila, textos e resultados)")
+    adicionar.add_argument("pdfs", nargs="+")
+    trabalhar_ = comandos.add_parser("trabalhar", help="processa a fila até esvaziar (retoma de onde parou)")
+    trabalhar_.add_argument("pasta")
+    trabalhar_.add_argument("--processos", type=int, default=1)
+    trabalhar_.add_argument("--etapas", default=",".join(ETAPAS), help="ex.: texto (só a extração nesta máquina)")
+    trabalhar_.add_argument("--sem-cache", action="store_true", help="não usa o cache de extração")
+    progresso = comandos.add_parser("progresso", help="tarefas por etapa e estado, e vazão")
+    progresso.add_argument("pasta")
+    reabrir = comandos.add_parser("reabrir", help="devolve à fila as tarefas que falharam")
+    reabrir.add_argument("pasta")
+    reabrir.add_argument("--etapa", choices=ETAPAS)
+    args = parser.parse_args(argv)
+
+    if args.comando == "trabalhar":
+        trabalhar(args.pasta, args.processos, etapas=args.etapas.split(","), usar_cache=not args.sem_cache)
+        return
+    fila = FilaTrabalho(args.pasta)
+    if args.comando == "adicionar":
+        pdfs = []
+        for caminho in args.pdfs:
+            if os.path.isdir(caminho):
+                pdfs += sorted(os.path.join(caminho, f) for f in os.listdir(caminho) if f.lower().endswith(".pdf"))
+            else:
+                pdfs.append(caminho)
+        print(f"➕ {fila.adicionar(pdfs)} compilado(s) incluído(s) em {args.pasta}")
+    elif args.comando == "progresso":
+        fila.relatorio()
+    else:
+        print(f"🔁 {fila.reabrir_falhas(args.etapa)} tarefa(s) devolvida(s) à fila")
+    fila.fechar()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,178 @@
+import time
+import queue
+import threading
+
+# Encadeamento de etapas em threads, ligadas por filas limitadas:
+#   entrada → [etapa 1] → fila → [etapa 2] → fila → ... → consumidor
+# Cada etapa é uma função que recebe um iterador de itens e gera os itens de saída.
+# Quando a fila seguinte enche, a etapa fica bloqueada (contrapressão) até o consumidor
+# liberar espaço, então a memória em uso é limitada pelo tamanho das filas.
+
+CAPACIDADE_FILA = 8      # itens em espera entre duas etapas
+INTERVALO_ESPERA = 0.1   # segundos entre verificações de cancelamento numa fila cheia/vazia
+_FIM = object()
+
+
+class Cancelado(Exception):
+    pass
+
+
+class Etapa:
+    """
+    Etapa do fluxo: `funcao(iterador) -> iterador`, rodando em `trabalhadores` threads
+    que leem da mesma fila (com mais de uma, a ordem de saída pode mudar).
+    Métricas: itens gerados, tempo esperando entrada, tempo bloqueado na fila de saída
+    e profundidade dessa fila (máxima e média, amostrada a cada item).
+    """
+
+    def __init__(self, nome: str, funcao, trabalhadores: int = 1, capacidade: int = CAPACIDADE_FILA):
+        self.nome = nome
+        self.funcao = funcao
+        self.trabalhadores = trabalhadores
+        self.saida = queue.Queue(maxsize=capacidade)
+        self.trava = threading.Lock()
+        self.itens = 0
+        self.espera_entrada = 0.0
+        self.espera_saida = 0.0
+        self.profundidade_maxima = 0
+        self._soma_profundidade = 0
+        self.inicio = self.fim = None
+        self._ativos = 0
+
+    def _ler(self, fila, cancelado):
+        while True:
+            inicio = time.perf_counter()
+            while True:
+                if cancelado.is_set():
+                    return
+                try:
+                    item = fila.get(timeout=INTERVALO_ESPERA)
+                    break
+                except queue.Empty:
+                    pass
+            with self.trava:
+                self.espera_entrada += time.perf_counter() - inicio
+            if item is _FIM:
+                fila.put(_FIM)   # os outros trabalhadores da etapa também precisam ver o fim
+                return
+            yield item
+
+    def _colocar(self, item, cancelado):
+        inicio = time.perf_counter()
+        while True:
+            if cancelado.is_set():
+                raise Cancelado()
+            try:
+                self.saida.put(item, timeout=INTERVALO_ESPERA)
+                break
+            except queue.Full:
+                pass
+        if item is _FIM:
+            return
+        profundidade = self.saida.qsize()
+        with self.trava:
+            self.espera_saida += time.perf_counter() - inicio
+            self.itens += 1
+            self.profundidade_maxima = max(self.profundidade_maxima, profundidade)
+            self._soma_profundidade += profundidade
+
+    def _trabalhar(self, entrada, cancelado, erros):
+        try:
+            for item in self.funcao(entrada):
+                self._colocar(item, cancelado)
+        except Cancelado:
+            pass
+        except BaseException as e:
+            erros.append((self.nome, e))
+            cancelado.set()
+        finally:
+            with self.trava:
+                self._ativos -= 1
+                ultimo = self._ativos == 0
+            if ultimo:
+                self.fim = time.perf_counter()
+                try:
+                    self._colocar(_FIM, cancelado)
+                except Cancelado:
+                    pass
+
+    @property
+    def profundidade_media(self) -> float:
+        return self._soma_profundidade / self.itens if self.itens else 0.0
+
+    @property
+    def duracao(self) -> float:
+        return ((self.fim or time.perf_counter()) - self.inicio) if self.inicio else 0.0
+
+    def metricas(self) -> dict:
+        ocupado = self.duracao * self.trabalhadores - self.espera_entrada - self.espera_saida
+        return {
+            "etapa": self.nome,
+            "itens": self.itens,
+            "duracao": self.duracao,
+            "itens_por_segundo": self.itens / self.duracao if self.duracao else 0.0,
+            "ocupacao": max(0.0, ocupado) / (self.duracao * self.trabalhadores) if self.duracao else 0.0,
+            "espera_entrada": self.espera_entrada,
+            "espera_saida": self.espera_saida,
+            "fila_maxima": self.profundidade_maxima,
+            "fila_media": self.profundidade_media,
+            "capacidade": self.saida.maxsize,
+        }
+
+
+def executar(entrada, etapas, intervalo_relatorio: float = None):
+    """
+    Roda as etapas encadeadas sobre o iterável `entrada` (lido pela primeira etapa) e gera
+    os itens da última, conforme ficam prontos. Um erro numa etapa cancela as demais e é
+    relançado aqui; parar de consumir o gerador também cancela o fluxo.
+    Com `intervalo_relatorio`, a profundidade das filas é impressa periodicamente.
+    """
+    cancelado = threading.Event()
+    erros = []
+    threads = []
+    anterior = None
+    if etapas[0].trabalhadores != 1:
+        raise ValueError("a primeira etapa lê a entrada diretamente e deve ter um único trabalhador")
+    for etapa in etapas:
+        etapa.inicio = time.perf_counter()
+        etapa._ativos = etapa.trabalhadores
+        for n in range(etapa.trabalhadores):
+            fonte = iter(entrada) if anterior is None else etapa._ler(anterior.saida, cancelado)
+            thread = threading.Thread(target=etapa._trabalhar, args=(fonte, cancelado, erros),
+                                      name=f"{etapa.nome}-{n}", daemon=True)
+            threads.append(thread)
+        anterior = etapa
+
+    if intervalo_relatorio:
+        threads.append(threading.Thread(target=_monitorar, args=(etapas, cancelado, intervalo_relatorio),
+                                        daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield from etapas[-1]._ler(etapas[-1].saida, cancelado)
+    finally:
+        cancelado.set()
+        for thread in threads:
+            thread.join()
+    if erros:
+        nome, erro = erros[0]
+        raise RuntimeError(f"falha na etapa {nome!r}: {erro}") from erro
+
+
+def _monitorar(etapas, cancelado, intervalo: float):
+    while not cancelado.wait(intervalo):
+        filas = "  ".join(f"{e.nome}: {e.itens} itens, fila {e.saida.qsize()}/{e.saida.maxsize}" for e in etapas)
+        print(f"⏳ {filas}")
+
+
+def relatorio(etapas):
+    """Tabela de vazão e filas por etapa (esperas somadas entre os trabalhadores da etapa)."""
+    print("\n📈 Fluxo por etapa:")
+    print(f" {'etapa':<10} {'itens':>6} {'itens/s':>8} {'ocupação':>9} {'espera ent.':>12} "
+          f"{'bloq. saída':>12} {'fila máx/méd/cap':>17}")
+    for etapa in etapas:
+        m = etapa.metricas()
+        print(f" {m['etapa']:<10} {m['itens']:>6} {m['itens_por_segundo']:>8.1f} {m['ocupacao']:>8.0%} "
+              f"{m['espera_entrada']:>11.2f}s {m['espera_saida']:>11.2f}s "
+              f"{m['fila_maxima']:>6}/{m['fila_media']:>4.1f}/{m['capacidade']:<4}")
@@ -1,16 +1,215 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+import fitz  # PyMuPDF
+import fluxo
+import extrair_texto
+import analisar_spacy
+from cache_extracao import CacheExtracao, sha256_arquivo
+from resultados import BaseResultados
+from entidades import Entidades
+from extraindo_compilado import detectar_inicios, intervalos_documentos, montar_documento, nome_documento
 from extrair_texto import processar_pdfs
-from analisar_spacy import analisar_textos
+from analisar_spacy import gerar_analises
+
+
+def gerar_pipeline(pdf_compilado: str, pasta_intermediarios: str = None, backend=None,
+                   extracao_hibrida: bool = extrair_texto.EXTRACAO_HIBRIDA,
+                   concorrencia: int = extrair_texto.CONCORRENCIA, lote: bool = True,
+                   batch_size: int = analisar_spacy.BATCH_SIZE, nlp=None, analise_hibrida: bool = False,
+                   usar_cache: bool = True, capacidade: int = fluxo.CAPACIDADE_FILA,
+                   intervalo_relatorio: float = None, prefiltro: bool = False):
+    """
+    Compilado → documentos → texto → entidades → validação num único fluxo em memória:
+    cada documento passa pelas etapas assim que fica pronto, com filas de `capacidade` itens
+    entre elas (uma etapa lenta segura as anteriores). Só as páginas enviadas ao backend remoto
+    viram PDFs temporários. Com `pasta_intermediarios`, os PDFs separados e os .txt também são
+    gravados lá (documentos_separados/ e textos/).
+    Os resultados vão para resultados.BaseResultados, que gera o relatorio.txt no fim.
+    Gera (documento, entidades) conforme cada documento é validado, sem acumular os resultados.
+    Com `prefiltro`, os padrões só rodam em volta das suas âncoras (prefiltro_ancoras.py).
+    """
+    inicios = detectar_inicios(pdf_compilado)
+    with fitz.open(pdf_compilado) as doc:
+        documentos = intervalos_documentos(inicios, len(doc))
+    if pasta_intermediarios:
+        os.makedirs(os.path.join(pasta_intermediarios, "documentos_separados"), exist_ok=True)
+        os.makedirs(os.path.join(pasta_intermediarios, "textos"), exist_ok=True)
+
+    cache_extracao = CacheExtracao() if usar_cache else None
+    sha_compilado = sha256_arquivo(pdf_compilado) if usar_cache else None
+    caches_analise = []
+    limitador = extrair_texto.LimitadorTaxa(extrair_texto.REQUISICOES_POR_SEGUNDO, extrair_texto.RAJADA)
+    trava = threading.Lock()
+    estatisticas = {"paginas_locais": 0, "paginas_remotas": 0, "chamadas_remotas": 0,
+                    "tempo_local": 0.0, "tempo_remoto": 0.0}
+    falhas = {}
+    backends = [backend]
+
+    def obter_backend():
+        with trava:
+            if backends[0] is None:
+                backends[0] = extrair_texto.BackendGemini()
+        return backends[0]
+
+    def separar(intervalos):
+        # única etapa que usa o PyMuPDF (não é thread-safe)
+        with fitz.open(pdf_compilado) as origem:
+            for i, inicio, fim, tipo in intervalos:
+                item = {"nome": nome_documento(i, tipo), "tipo": tipo, "texto": None, "segmentos": None, "chave": None}
+                if cache_extracao:
+                    # os bytes de um PDF montado em memória mudam a cada montagem: a chave é o intervalo no compilado
+                    item["chave"] = extrair_texto.chave_cache(None, backend, extracao_hibrida,
+                                                              pdf_sha=f"{sha_compilado}:{inicio}-{fim}")
+                    item["texto"] = cache_extracao.obter(item["chave"])
+                if item["texto"] is None or pasta_intermediarios:
+                    novo_pdf, _ = montar_documento(origem, inicio, fim)
+                    with novo_pdf:
+                        if pasta_intermediarios:
+                            novo_pdf.save(os.path.join(pasta_intermediarios, "documentos_separados",
+                                                       item["nome"] + ".pdf"), garbage=0, deflate=True)
+                        if item["texto"] is None:
+                            t0 = time.perf_counter()
+                            item["segmentos"] = extrair_texto.segmentar_pdf(novo_pdf, item["nome"], pasta_temp,
+                                                                            hibrido=extracao_hibrida)
+                            with trava:
+                                estatisticas["tempo_local"] += time.perf_counter() - t0
+                                estatisticas["paginas_locais"] += sum(n for origem_seg, _, n in item["segmentos"]
+                                                                      if origem_seg == "local")
+                yield item
+
+    def extrair(itens):
+        for item in itens:
+            if item["texto"] is None:
+                try:
+                    item["texto"] = extrair_texto.texto_dos_segmentos(item["segmentos"], obter_backend, limitador,
+                                                                      estatisticas=estatisticas, trava=trava)
+                except (extrair_texto.ErroExtracao, OSError) as e:
+                    with trava:
+                        falhas[item["nome"]] = str(e)
+                    continue
+                finally:
+                    for origem_seg, caminho, _ in item["segmentos"]:
+                        if origem_seg == "remoto" and os.path.exists(caminho):
+                            os.remove(caminho)
+                    item["segmentos"] = None
+                if cache_extracao:
+                    cache_extracao.guardar(item["chave"], item["texto"])
+            if pasta_intermediarios:
+                extrair_texto.gravar_texto(os.path.join(pasta_intermediarios, "textos", item["nome"] + ".txt"),
+                                           item["texto"])
+            yield item
+
+    def analisar(itens):
+        cache = None
+        if usar_cache:
+            perfil = nlp.meta.get("perfil", analisar_spacy.PERFIL_PIPELINE) if nlp is not None \
+                else analisar_spacy.PERFIL_PIPELINE
+            cache = analisar_spacy.abrir_cache(perfil, analise_hibrida)   # a conexão SQLite fica nesta thread
+            caches_analise.append(cache)
+        def entradas():
+            for item in itens:
+                item["texto"] = analisar_spacy.limpar_texto(item["texto"])
+                yield item, item["texto"]
+
+        try:
+            yield from analisar_spacy.analisar_entradas(entradas(), lote, batch_size, 1, nlp, analise_hibrida, cache,
+                                                        prefiltro=prefiltro, spans=True)
+        finally:
+            if cache:
+                cache.fechar()
+
+    def validar(analises):
+        for item, spans in analises:
+            print(f"\n📄 Validando documento: {item['nome']}")
+            # as posições gravadas na base são as da análise
+            entidades = Entidades.de_spans(spans)
+            analisar_spacy.validar_documento(item["nome"] + ".txt", entidades, analisar_spacy.criterios_obrigatorios,
+                                             base, item["texto"])
+            yield item["nome"], entidades.resolver(item["texto"])
+
+    etapas = [
+        fluxo.Etapa("separar", separar, capacidade=capacidade),
+        fluxo.Etapa("texto", extrair, trabalhadores=concorrencia, capacidade=capacidade),
+        fluxo.Etapa("análise", analisar, capacidade=capacidade),
+        fluxo.Etapa("validação", validar, capacidade=capacidade),
+    ]
+    base = BaseResultados(origem=os.path.basename(pdf_compilado))
+    validados = 0
+    try:
+        with tempfile.TemporaryDirectory(prefix="fluxo_") as pasta_temp:
+            for documento, entidades in fluxo.executar(documentos, etapas, intervalo_relatorio):
+                validados += 1
+                yield documento, entidades
+    finally:
+        if cache_extracao:
+            cache_extracao.fechar()
+        relatorio = base.gerar_relatorio()
+        base.fechar()
+
+    print(f"\n✅ {validados}/{len(documentos)} documentos analisados e validados "
+          f"({base.caminho}; relatório: {relatorio})")
+    if falhas:
+        print(f"⚠️ {len(falhas)} documento(s) sem texto:")
+        for documento, erro in falhas.items():
+            print(f" - {documento}: {erro}")
+    fluxo.relatorio(etapas)
+    extrair_texto.relatorio_extracao(estatisticas)
+    if cache_extracao:
+        cache_extracao.relatorio()
+    for cache in caches_analise:
+        cache.relatorio()
+
+
+def executar_pipeline(pdf_compilado: str, **opcoes):
+    """gerar_pipeline, devolvendo {documento: entidades} de todos os documentos, como analisar_textos."""
+    # com vários trabalhadores de texto a ordem de chegada varia; o nome começa pelo número do documento
+    return dict(sorted(gerar_pipeline(pdf_compilado, **opcoes)))
+
+
+def imprimir_entidades(documento: str, entidades):
+    print(f"\n📄 Documento: {documento}")
+    for label, textos in entidades.items():
+        if textos:
+            print(f" - {label}: {textos}")
+
 
 if __name__ == "__main__":
-    print("=== ETAPA 1: Extração de texto ===")
-    # processar_pdfs()  # descomente quando quiser rodar a extração
-
-    print("\n=== ETAPA 2: Análise com spaCy ===")
-    resultados = analisar_textos()  # já faz a validação internamente
-
-    print("\n=== ENTIDADES EXTRAÍDAS ===")
-    for documento, entidades in resultados.items():
-        print(f"\n📄 Documento: {documento}")
-        for label, textos in entidades.items():
-            if textos:
-                print(f" - {label}: {textos}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extração, análise e validação dos documentos.")
+    parser.add_argument("compilado", nargs="?",
+                        help="PDF compilado: roda o fluxo completo em memória (sem ele, usa as pastas de texto)")
+    parser.add_argument("--intermediarios", help="pasta onde gravar também os PDFs separados e os .txt")
+    parser.add_argument("--sem-cache", action="store_true", help="não usa os caches de extração e de análise")
+    parser.add_argument("--monitor", type=float, help="imprime a profundidade das filas a cada N segundos")
+    parser.add_argument("--perfilar", action="store_true",
+                        help="sem compilado: mede o tempo por componente e por padrão da análise")
+    parser.add_argument("--quase-duplicados", action="store_true",
+                        help="sem compilado: reaproveita a análise de documentos quase iguais (modelos)")
+    parser.add_argument("--por-tipo", action="store_true",
+                        help="sem compilado: valida cada documento pelo perfil do seu tipo (PERFIS_VALIDACAO)")
+    parser.add_argument("--direcionada", action="store_true",
+                        help="sem compilado: como --por-tipo, analisando cabeçalho e rodapé antes do texto inteiro")
+    parser.add_argument("--prefiltro", action="store_true",
+                        help="roda os padrões só em volta das palavras-âncora (mesmas entidades, menos custo)")
+    args = parser.parse_args(sys.argv[1:])
+
+    # os resultados são impressos conforme chegam, sem guardar o corpus inteiro na memória
+    if args.compilado:
+        for documento, entidades in gerar_pipeline(args.compilado, pasta_intermediarios=args.intermediarios,
+                                                   usar_cache=not args.sem_cache, intervalo_relatorio=args.monitor,
+                                                   prefiltro=args.prefiltro):
+            imprimir_entidades(documento, entidades)
+    else:
+        print("=== ETAPA 1: Extração de texto ===")
+        # processar_pdfs()  # descomente quando quiser rodar a extração
+
+        print("\n=== ETAPA 2: Análise com spaCy ===")
+        # gerar_analises já faz a validação internamente
+        for documento, entidades, _ in gerar_analises(perfilar=args.perfilar, quase_duplicados=args.quase_duplicados,
+                                                      por_tipo=args.por_tipo, direcionada=args.direcionada,
+                                                      prefiltro=args.prefiltro):
+            imprimir_entidades(documento, entidades)
@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+import analisar_spacy
+
+# -------------------------------------------------------------------
+# perfilamento da análise: tempo por componente e por padrão, ocorrências por rótulo
+# -------------------------------------------------------------------
+PERFILAMENTO_PATH = "perfilamento_analise.json"
+
+
+class Perfilador:
+    """
+    Mede a análise documento a documento: tempo do tokenizer, de cada componente do pipeline
+    e da extração das entidades (Matcher ou varredura regex), ocorrências por rótulo no corpus
+    e, para cada padrão do EntityRuler e do Matcher, tempo, casamentos e documentos com casamento.
+
+    Cada padrão roda num Matcher próprio sobre o Doc já processado: o tempo é o custo isolado do
+    padrão (o entity_ruler casa todos de uma vez) e os casamentos são anteriores à resolução de
+    sobreposições. Para os padrões que nunca casam, os tokens obrigatórios sem nenhuma ocorrência
+    no corpus são apontados (ex.: um REGEX com espaço aplicado a um único token).
+    """
+
+    def __init__(self, nlp):
+        from spacy.matcher import Matcher
+
+        self.nlp = nlp
+        self.documentos = 0
+        self.tokens = 0
+        self.tempo_componentes = defaultdict(float)
+        self.ocorrencias = Counter()            # entidades extraídas por rótulo
+        self.documentos_rotulo = Counter()      # documentos com ao menos uma entidade do rótulo
+        self.tempo_padroes = defaultdict(float)
+        self.casamentos = Counter()
+        self.documentos_padrao = Counter()
+        self.tokens_padrao = Counter()          # ocorrências de cada token obrigatório dos padrões
+
+        ruler_patterns = nlp.get_pipe("entity_ruler").patterns if "entity_ruler" in nlp.pipe_names \
+            else analisar_spacy.patterns
+        fontes = [("entity_ruler", p["label"], p["pattern"]) for p in ruler_patterns]
+        fontes += [("matcher", label, padrao)
+                   for label, padroes in nlp.meta.get("matcher_patterns", analisar_spacy.matcher_patterns).items()
+                   for padrao in padroes]
+        por_rotulo = Counter((fonte, label) for fonte, label, _ in fontes)
+        vistos = Counter()
+
+        self.padroes = []                       # (nome, fonte, label, Matcher ou PhraseMatcher)
+        self.obrigatorios = {}                  # nome -> [(chave, token)]
+        self._matcher_tokens = Matcher(nlp.vocab)
+        for fonte, label, padrao in fontes:
+            vistos[fonte, label] += 1
+            nome = f"{fonte}:{label}" + (f"#{vistos[fonte, label]}" if por_rotulo[fonte, label] > 1 else "")
+            if isinstance(padrao, str):
+                from spacy.matcher import PhraseMatcher
+
+                matcher = PhraseMatcher(nlp.vocab)
+                matcher.add(nome, [nlp.make_doc(padrao)])
+                self.obrigatorios[nome] = []
+            else:
+                matcher = Matcher(nlp.vocab)
+                matcher.add(nome, [padrao])
+                self.obrigatorios[nome] = []
+                for n, token in enumerate(padrao):
+                    if token.get("OP") in ("?", "*"):
+                        continue
+                    chave = f"{nome}@{n}"
+                    self._matcher_tokens.add(chave, [[{k: v for k, v in token.items() if k != "OP"}]])
+                    self.obrigatorios[nome].append((chave, token))
+            self.padroes.append((nome, fonte, label, matcher))
+
+    def processar(self, texto: str, desativar=()):
+        """Equivale a nlp(texto, disable=desativar), medindo o tokenizer e cada componente."""
+        inicio = time.perf_counter()
+        doc = self.nlp.make_doc(texto)
+        self.tempo_componentes["tokenizer"] += time.perf_counter() - inicio
+        for nome, componente in self.nlp.pipeline:
+            if nome in desativar:
+                continue
+            inicio = time.perf_counter()
+            doc = componente(doc)
+            self.tempo_componentes[nome] += time.perf_counter() - inicio
+        self.documentos += 1
+        self.tokens += len(doc)
+        self._medir_padroes(doc)
+        return doc
+
+    def extrair(self, extrair, doc):
+        """Roda a extração dos spans (criar_extrator) medindo o tempo e contando os rótulos."""
+        inicio = time.perf_counter()
+        spans = extrair(doc)
+        self.tempo_componentes["extração"] += time.perf_counter() - inicio
+        self._contar(spans)
+        return spans
+
+    def processar_longo(self, analisar, texto: str):
+        """Texto acima de TAMANHO_TRECHO, analisado em trechos: medido como um componente só ("trechos")."""
+        inicio = time.perf_counter()
+        spans = analisar(texto)
+        self.tempo_componentes["trechos"] += time.perf_counter() - inicio
+        self.documentos += 1
+        self._contar(spans)
+        return spans
+
+    def _contar(self, spans):
+        rotulos = Counter(label for _, label, _, _ in spans)
+        self.ocorrencias.update(rotulos)
+        self.documentos_rotulo.update(rotulos.keys())
+
+    def _medir_padroes(self, doc):
+        for nome, _, _, matcher in self.padroes:
+            inicio = time.perf_counter()
+            n = len(matcher(doc))
+            self.tempo_padroes[nome] += time.perf_counter() - inicio
+            self.casamentos[nome] += n
+            self.documentos_padrao[nome] += n > 0
+        for chave, _, _ in self._matcher_tokens(doc, as_spans=False):
+            self.tokens_padrao[self.nlp.vocab.strings[chave]] += 1
+
+    def resultado(self) -> dict:
+        total = sum(self.tempo_componentes.values())
+        componentes = [
+            {"componente": nome, "segundos": segundos, "ms_por_documento": 1000 * segundos / max(self.documentos, 1),
+             "fracao": segundos / total if total else 0.0}
+            for nome, segundos in self.tempo_componentes.items()
+        ]
+        padroes = []
+        for nome, fonte, label, _ in sorted(self.padroes, key=lambda p: -self.tempo_padroes[p[0]]):
+            nunca = self.casamentos[nome] == 0
+            padroes.append({
+                "padrao": nome, "fonte": fonte, "label": label, "segundos": self.tempo_padroes[nome],
+                "us_por_documento": 1e6 * self.tempo_padroes[nome] / max(self.documentos, 1),
+                "casamentos": self.casamentos[nome], "documentos": self.documentos_padrao[nome],
+                "nunca_casou": nunca,
+                "tokens_sem_ocorrencia": [json.dumps(token, ensure_ascii=False) for chave, token in
+                                          self.obrigatorios[nome] if self.tokens_padrao[chave] == 0] if nunca else [],
+            })
+        rotulos = {label: {"ocorrencias": self.ocorrencias[label], "documentos": self.documentos_rotulo[label]}
+                   for label in analisar_spacy.pattern_labels}
+        return {"documentos": self.documentos, "tokens": self.tokens, "segundos": total,
+                "componentes": componentes, "padroes": padroes, "rotulos": rotulos}
+
+    def relatorio(self, caminho: str = PERFILAMENTO_PATH) -> dict:
+        """Imprime as tabelas e grava o resultado em JSON (`caminho`), para comparar versões dos padrões."""
+        r = self.resultado()
+        print(f"\n⏱️ Perfilamento da análise: {r['documentos']} documento(s), {r['tokens']} tokens, "
+              f"{r['segundos']:.2f}s")
+        print(f" {'componente':<18} {'ms/doc':>8} {'fração':>7}")
+        for c in r["componentes"]:
+            print(f" {c['componente']:<18} {c['ms_por_documento']:>8.2f} {c['fracao']:>7.1%}")
+
+        print(f"\n {'padrão (custo isolado)':<36} {'µs/doc':>8} {'casam.':>7} {'docs':>6}")
+        for p in r["padroes"]:
+            print(f" {p['padrao']:<36} {p['us_por_documento']:>8.1f} {p['casamentos']:>7} {p['documentos']:>6}"
+                  f"{'  ⚠️ nunca casou' if p['nunca_casou'] else ''}")
+            for token in p["tokens_sem_ocorrencia"]:
+                print(f"   ↳ nenhum token do corpus satisfaz {token}")
+
+        sem_entidades = [label for label, c in r["rotulos"].items() if not c["ocorrencias"]]
+        print("\n Ocorrências por rótulo: " + ", ".join(
+            f"{label} {c['ocorrencias']} ({c['documentos']} docs)" for label, c in r["rotulos"].items()
+            if c["ocorrencias"]))
+        if sem_entidades:
+            print(f" ⚠️ Rótulos sem nenhuma entidade: {', '.join(sem_entidades)}")
+        casamentos_rotulo = Counter()
+        for p in r["padroes"]:
+            casamentos_rotulo[p["label"]] += p["casamentos"]
+        perdidos = [f"{label} ({casamentos_rotulo[label]} casamentos)" for label in sem_entidades
+                    if casamentos_rotulo[label]]
+        if perdidos:
+            # sobreposição resolvida a favor de outro rótulo, ou o Matcher grava sob outro rótulo
+            print(f" ⚠️ Padrões que casam mas não viram entidade: {', '.join(perdidos)}")
+
+        if caminho:
+            with open(caminho, "w", encoding="utf-8") as f:
+                json.dump(r, f, ensure_ascii=False, indent=1)
+            print(f"💾 Perfilamento gravado em {caminho}")
+        return r
+
+
+def perfilar_pasta(pasta: str = analisar_spacy.OUTPUT_DIR, nlp=None, hibrido: bool = False,
+                   caminho: str = PERFILAMENTO_PATH) -> dict:
+    """Perfila a análise dos .txt da pasta (sem cache e sem validação) e devolve o resultado."""
+    nlp = nlp or analisar_spacy.obter_pipeline()
+    perfilador = Perfilador(nlp)
+    entradas = ((documento, texto) for documento, _, texto in analisar_spacy.ler_textos(pasta))
+    for _ in analisar_spacy.analisar_entradas(entradas, nlp=nlp, hibrido=hibrido, perfilador=perfilador):
+        pass
+    return perfilador.relatorio(caminho)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo por componente e por padrão da análise com spaCy.")
+    parser.add_argument("pasta", nargs="?", default=analisar_spacy.OUTPUT_DIR)
+    parser.add_argument("--hibrido", action="store_true", help="perfila o modo híbrido (varredura regex)")
+    parser.add_argument("--saida", default=PERFILAMENTO_PATH)
+    args = parser.parse_args(sys.argv[1:])
+    perfilar_pasta(args.pasta, hibrido=args.hibrido, caminho=args.saida)
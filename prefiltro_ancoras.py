@@ -0,0 +1,301 @@
+import re
+import json
+
+# -------------------------------------------------------------------
+# prefiltro por âncoras: os padrões só rodam perto das palavras que eles exigem
+# -------------------------------------------------------------------
+# Todo padrão do EntityRuler e do Matcher tem tokens obrigatórios (sem "OP") com um número limitado de
+# tokens antes deles, e toda ocorrência do padrão contém um token que satisfaz cada um deles: são as
+# âncoras ("interessado", "processo", "código", a data de HORA_ASSINATURA...). O índice de âncoras de um
+# documento sai de uma passada (doc.to_array de ORTH e LOWER + np.unique): predicados literais
+# ("LOWER": "processo", "IN": [...]) viram consultas por hash e os de REGEX só são avaliados nas palavras
+# distintas do documento, com cache entre documentos. Em cada documento, cada padrão usa a sua âncora
+# com menos ocorrências, e o Matcher roda só nas janelas em volta delas: o custo das regras passa a
+# acompanhar o número de âncoras, e não o tamanho do documento.
+
+EXTENSAO_JANELA = 4   # tokens além da parte limitada dos padrões com "+"/"*" (a janela cresce se não bastar)
+
+# casos em que a janela é justa (conferir_casos_limite): âncora no início ou no fim do Doc, "+" maior que a
+# janela, janelas de rótulos diferentes sobrepostas e "*" no meio do padrão mais longo que EXTENSAO_JANELA.
+# Listas são as palavras de um Doc montado sem o tokenizer, que junta os espaços seguidos num token só
+CASOS_LIMITE = [
+    "Processo nº 53500.053021/2018-91",
+    "Processo",
+    "Despacho de instauração do processo",
+    "Conforme o artigo",
+    "Conforme o artigo 5",
+    "SEI nº 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20",
+    "Assinado eletronicamente por Ana Beatriz Carla Dias Elaine Fernanda Gomes Helena Ingrid Joana Karla Lima",
+    "Interessado: Ana Beatriz Carla Dias Elaine Fernanda Gomes Helena Ingrid Joana Karla Lima Mota Nunes",
+    "Processo de fiscalização nº 53504.003563/2016-11 e processo administrativo nº 53500.000001/2020-01",
+    "Processo nº 53500.053021/2018-91 Processo nº 53500.053022/2018-92 Pasta nº RADAR01 Código CRC ABC123",
+    "Código verificador 1234567 Código CRC 0A1B2C3D CNPJ 40.432.544/0001-47 CPF 123.456.789-09",
+    "Relatório de Fiscalização nº 12/2020 Interessado: Fulano de Tal Informe nº 3/2021",
+    ["Interessado", ":"] + ["\n"] * 10 + ["Fulano", "de", "Tal"],
+    ["Relatório", "de", "Fiscalização"] + ["\n"] * 8 + ["nº"] + ["\n"] * 6 + ["53504.003563/", "2016-11"],
+]
+
+# (mínimo, máximo) de tokens casados por cada "OP"; None = sem limite (ops desconhecidos também)
+_QUANTIDADES = {None: (1, 1), "!": (0, 1), "?": (0, 1), "*": (0, None), "+": (1, None)}
+_ATRIBUTOS = {"TEXT": "ORTH", "ORTH": "ORTH", "LOWER": "LOWER"}
+
+
+def _predicado(token: dict):
+    """(coluna, "literal", valores) ou (coluna, "regex", expressão) do token, ou None se ele não servir de âncora."""
+    if token.get("OP") is not None:
+        return None
+    for atributo, coluna in _ATRIBUTOS.items():
+        valor = token.get(atributo)
+        if isinstance(valor, str):
+            return coluna, "literal", [valor]
+        if isinstance(valor, dict) and "IN" in valor:
+            return coluna, "literal", list(valor["IN"])
+        if isinstance(valor, dict) and "REGEX" in valor:
+            return coluna, "regex", re.compile(valor["REGEX"])
+    return None
+
+
+def ancoras_do_padrao(padrao, extensao: int = EXTENSAO_JANELA):
+    """
+    Âncoras possíveis de um padrão de tokens: [(coluna, tipo, valor, antes, depois, corridas)], com no máximo
+    `antes` tokens do padrão antes da âncora e `depois` depois dela, mais, em cada documento, a maior sequência
+    de tokens que casam com cada token de `corridas` (os "+"/"*" antes do último token obrigatório).
+    Os outros "+"/"*" contam `extensao` tokens: a janela cresce se uma ocorrência encostar no fim.
+    Lista vazia se nenhum token obrigatório tiver um número limitado de tokens antes.
+    """
+    quantidades = [_QUANTIDADES.get(token.get("OP"), (0, None)) for token in padrao]
+    ultimo_obrigatorio = max((k for k, (minimo, _) in enumerate(quantidades) if minimo), default=-1)
+    ancoras, antes = [], 0
+    for k, token in enumerate(padrao):
+        predicado = _predicado(token)
+        if predicado:
+            sem_limite = [j for j in range(k + 1, len(padrao)) if quantidades[j][1] is None]
+            corridas = [j for j in sem_limite if j < ultimo_obrigatorio]
+            depois = sum(quantidades[j][1] or 1 for j in range(k + 1, len(padrao)) if j not in corridas) \
+                + (extensao if len(corridas) < len(sem_limite) else 0)
+            ancoras.append((*predicado, antes, depois, [padrao[j] for j in corridas]))
+        if quantidades[k][1] is None:
+            break   # os tokens seguintes podem estar a qualquer distância do início
+        antes += quantidades[k][1]
+    # literais primeiro: são só consultas por hash
+    return sorted(ancoras, key=lambda a: a[1] != "literal")
+
+
+class PrefiltroAncoras:
+    """
+    Substitui o entity_ruler do pipeline e o Matcher de CNPJ/CPF (analisar_spacy.criar_matcher):
+    spans(doc) devolve o mesmo que analisar_spacy.spans_entidades para um Doc processado sem o entity_ruler.
+
+    As janelas ao redor das âncoras cobrem toda ocorrência possível dos padrões: os "+"/"*" no meio de um
+    padrão (IS_SPACE, que limpar_texto elimina) contam a maior sequência de tokens do documento que casa com
+    eles, e quando uma ocorrência encosta no fim de uma janela (padrão terminado em "+"), a janela é ampliada
+    e o Matcher roda de novo (varredura_regex.casar_janelas). conferir_casos_limite confere a equivalência
+    com o EntityRuler nos casos de CASOS_LIMITE.
+    """
+
+    def __init__(self, nlp, extensao: int = EXTENSAO_JANELA):
+        import numpy as np
+        from spacy.matcher import Matcher
+        from analisar_spacy import patterns, matcher_patterns, criar_matcher
+
+        self._np = np
+        self.vocab = nlp.vocab
+        self.extensao = extensao
+        self._corridas = {}   # token "+"/"*" no meio de um padrão -> (atributo, valor) ou Matcher de um token só
+        padroes = nlp.get_pipe("entity_ruler").patterns if "entity_ruler" in nlp.pipe_names else patterns
+        padroes_matcher = nlp.meta.get("matcher_patterns", matcher_patterns)
+        # um Matcher por rótulo do EntityRuler, para cada janela só rodar os padrões ancorados nela;
+        # CNPJ/CPF ficam juntos, como em criar_matcher (a ordem das ocorrências é a de spans_entidades)
+        por_label = {}
+        for p in padroes:
+            por_label.setdefault(p["label"], []).append(p["pattern"])
+        self.ruler = []
+        for label, padroes_label in por_label.items():
+            matcher = Matcher(nlp.vocab)
+            matcher.add(label, padroes_label)
+            self.ruler.append((matcher, self._ancoras(padroes_label)))
+        self.matcher = (criar_matcher(nlp), self._ancoras([padrao for padroes_label in padroes_matcher.values()
+                                                           for padrao in padroes_label]))
+        self._cache_regex = {}   # (coluna, expressão) -> {hash: casa?}
+        self.estatisticas = {"documentos": 0, "tokens": 0, "tokens_janelas": 0, "janelas": 0}
+
+    def _ancoras(self, padroes):
+        """Âncoras candidatas de cada padrão, ou None se algum não tiver âncora (o Matcher roda no Doc inteiro)."""
+        ancoras = []
+        for padrao in padroes:
+            if isinstance(padrao, str) or not (candidatas := ancoras_do_padrao(padrao, self.extensao)):
+                return None
+            ancoras.append([(coluna, tipo, self._hashes(valor) if tipo == "literal" else valor, antes, depois,
+                             [self._corrida(token) for token in corridas])
+                            for coluna, tipo, valor, antes, depois, corridas in candidatas])
+        return ancoras
+
+    def _corrida(self, token: dict):
+        """
+        Chave do token em _corridas: o atributo booleano (ex.: IS_SPACE), lido com doc.to_array, ou
+        um Matcher que casa o token uma vez (sem o "OP").
+        """
+        from spacy.attrs import IDS
+        from spacy.matcher import Matcher
+
+        predicado = {k: v for k, v in token.items() if k != "OP"}
+        chave = json.dumps(predicado, sort_keys=True, ensure_ascii=False)
+        if chave not in self._corridas:
+            atributo, valor = next(iter(predicado.items())) if len(predicado) == 1 else (None, None)
+            if isinstance(valor, bool) and atributo.upper() in IDS:
+                self._corridas[chave] = (atributo.upper(), valor)
+            else:
+                matcher = Matcher(self.vocab)
+                matcher.add("corrida", [[predicado]])
+                self._corridas[chave] = matcher
+        return chave
+
+    def _maior_corrida(self, doc, chave: str) -> int:
+        """Maior sequência de tokens seguidos do Doc que casam com o token da `chave`."""
+        np = self._np
+        marcas = np.zeros(len(doc) + 2, dtype=np.int8)
+        corrida = self._corridas[chave]
+        if isinstance(corrida, tuple):
+            atributo, valor = corrida
+            marcas[1:-1] = doc.to_array(atributo) == valor
+        else:
+            for _, inicio, _ in corrida(doc):
+                marcas[inicio + 1] = 1
+        bordas = np.diff(marcas)
+        return int((np.flatnonzero(bordas == -1) - np.flatnonzero(bordas == 1)).max(initial=0))
+
+    def _hashes(self, valores):
+        return self._np.array([self.vocab.strings.add(valor) for valor in valores], dtype=self._np.uint64)
+
+    def _regex(self, coluna: str, expressao, distintos):
+        """Hashes, entre os `distintos` do documento, cujo texto casa com a expressão (re.search, como o Matcher)."""
+        cache = self._cache_regex.setdefault((coluna, expressao.pattern), {})
+        strings = self.vocab.strings
+        for h in distintos.tolist():
+            if h not in cache:
+                cache[h] = expressao.search(strings[h]) is not None
+        return self._np.array([h for h in distintos.tolist() if cache[h]], dtype=self._np.uint64)
+
+    def _janelas(self, indice, ancoras, n: int, corrida):
+        """
+        Intervalos de tokens [início, fim], ordenados e sem sobreposição, em volta das âncoras escolhidas;
+        `corrida(chave)` é a maior sequência de tokens do documento que casa com o token da chave.
+        """
+        np = self._np
+        if ancoras is None:
+            return [[0, n]] if n else []
+        inicios, fins = [], []
+        for candidatas in ancoras:
+            melhor = None
+            for coluna, tipo, valor, antes, depois, corridas in candidatas:
+                _, distintos, contagens = indice[coluna]
+                hashes = valor if tipo == "literal" else self._regex(coluna, valor, distintos)
+                ocorrencias = int(contagens[np.isin(distintos, hashes)].sum())
+                if melhor is None or ocorrencias < melhor[0]:
+                    melhor = (ocorrencias, coluna, hashes, antes, depois, corridas)
+                if not ocorrencias:
+                    break
+            ocorrencias, coluna, hashes, antes, depois, corridas = melhor
+            if ocorrencias:
+                depois += sum(corrida(chave) for chave in corridas)
+                posicoes = np.flatnonzero(np.isin(indice[coluna][0], hashes))
+                inicios.append(np.maximum(posicoes - antes, 0))
+                # +1: uma ocorrência de tamanho máximo não encosta no fim da janela
+                fins.append(np.minimum(posicoes + depois + 2, n))
+        if not inicios:
+            return []
+        inicios, fins = np.concatenate(inicios), np.concatenate(fins)
+        ordem = np.argsort(inicios, kind="stable")
+        janelas = []
+        for a, b in zip(inicios[ordem].tolist(), fins[ordem].tolist()):
+            if janelas and a <= janelas[-1][1]:
+                janelas[-1][1] = max(janelas[-1][1], b)
+            else:
+                janelas.append([a, b])
+        return janelas
+
+    def _casar(self, doc, matcher, janelas):
+        """Ocorrências do `matcher` nas janelas (varredura_regex.casar_janelas), em posições do Doc."""
+        from varredura_regex import casar_janelas
+
+        achados = []
+        for a, b, encontrados in casar_janelas(doc, matcher, janelas, self.extensao):
+            achados.extend(encontrados)
+            self.estatisticas["janelas"] += 1
+            self.estatisticas["tokens_janelas"] += b - a
+        return achados
+
+    def spans(self, doc):
+        """[(grupo, label, início, fim)] em caracteres, como analisar_spacy.spans_entidades."""
+        from spacy.attrs import ORTH, LOWER
+        from analisar_spacy import pattern_labels
+        from varredura_regex import _resolver
+
+        np = self._np
+        n = len(doc)
+        if not n:
+            return []
+        colunas = doc.to_array([ORTH, LOWER]).astype(np.uint64).reshape(n, 2)
+        indice = {}
+        for j, coluna in enumerate(("ORTH", "LOWER")):
+            distintos, contagens = np.unique(colunas[:, j], return_counts=True)
+            indice[coluna] = (colunas[:, j], distintos, contagens)
+        self.estatisticas["documentos"] += 1
+        self.estatisticas["tokens"] += n
+
+        def caracteres(inicio, fim):
+            return doc[inicio].idx, doc[fim - 1].idx + len(doc[fim - 1])
+
+        corridas = {}
+
+        def corrida(chave):
+            if chave not in corridas:
+                corridas[chave] = self._maior_corrida(doc, chave)
+            return corridas[chave]
+
+        strings = self.vocab.strings
+        ocorrencias = set()
+        for matcher, ancoras in self.ruler:
+            ocorrencias.update((strings[m_id], inicio, fim) for m_id, inicio, fim in
+                               self._casar(doc, matcher, self._janelas(indice, ancoras, n, corrida)) if fim > inicio)
+        # resolução do EntityRuler (set_annotations): o mais longo primeiro, depois o mais à esquerda
+        spans = [("ents", label, *caracteres(inicio, fim))
+                 for label, inicio, fim in _resolver(ocorrencias, lambda c: c[2] - c[1]) if label in pattern_labels]
+        matcher, ancoras = self.matcher
+        spans += [("matcher", "CNPJ", *caracteres(inicio, fim))
+                  for _, inicio, fim in self._casar(doc, matcher, self._janelas(indice, ancoras, n, corrida))]
+        return spans
+
+    def resumo(self) -> dict:
+        """Contagens acumuladas; tokens_janelas soma as janelas de cada Matcher (um por rótulo, mais o de CNPJ/CPF)."""
+        e = self.estatisticas
+        return {**e, "fracao_analisada": e["tokens_janelas"] / e["tokens"] if e["tokens"] else 0.0}
+
+
+def conferir_casos_limite(nlp=None, casos=CASOS_LIMITE, extensoes=(EXTENSAO_JANELA, 1)):
+    """
+    Confere que o prefiltro dá os spans do pipeline completo (EntityRuler + Matcher) em cada caso, com cada
+    extensão de janela (a menor força as janelas a crescer); AssertionError se não.
+    """
+    from spacy.tokens import Doc
+    import analisar_spacy
+
+    nlp = nlp or analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    entrada = lambda caso: caso if isinstance(caso, str) else Doc(nlp.vocab, words=caso)
+    divergentes = []
+    for extensao in extensoes:
+        prefiltro = PrefiltroAncoras(nlp, extensao)
+        for caso in casos:
+            esperado = analisar_spacy.spans_entidades(nlp(entrada(caso)), matcher)
+            obtido = prefiltro.spans(nlp(entrada(caso), disable=["entity_ruler"]))
+            if obtido != esperado:
+                divergentes.append(f"extensao={extensao} {caso!r}: ruler={esperado} prefiltro={obtido}")
+    if divergentes:
+        raise AssertionError("prefiltro por âncoras diverge do EntityRuler:\n" + "\n".join(divergentes))
+    print(f"✅ Prefiltro por âncoras idêntico ao EntityRuler nos {len(casos)} casos-limite "
+          f"(extensões {', '.join(map(str, extensoes))})")
+
+
+if __name__ == "__main__":
+    conferir_casos_limite()
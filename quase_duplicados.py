@@ -0,0 +1,230 @@
+import re
+import time
+import zlib
+import bisect
+import difflib
+from collections import OrderedDict
+
+# -------------------------------------------------------------------
+# quase-duplicados: documentos padronizados analisados a partir de um modelo
+# -------------------------------------------------------------------
+# Certidões, recibos e despachos padrão diferem só em números e nomes. Um índice MinHash/LSH
+# (sobre o texto com os dígitos trocados por 0) encontra o modelo já analisado mais parecido;
+# o documento herda as entidades do modelo nos trechos iguais e só as regiões diferentes,
+# com uma margem de contexto, passam de novo pelo spaCy.
+
+SHINGLE = 4                      # palavras por shingle
+PERMUTACOES = 64                 # funções de hash da assinatura MinHash
+FAIXAS = 16                      # faixas do LSH (PERMUTACOES / FAIXAS linhas por faixa)
+LIMIAR_SIMILARIDADE = 0.6        # similaridade estimada mínima para usar um modelo
+MARGEM_DIFERENCA = 160           # caracteres de contexto em volta de cada região diferente
+FRACAO_MAXIMA_DIFERENCA = 0.6    # acima disso (fração do texto a reanalisar) o documento é analisado inteiro
+MAX_MODELOS = 5000               # modelos mantidos no índice (os usados há mais tempo saem primeiro)
+
+_PRIMO = (1 << 31) - 1
+_DIGITO = re.compile(r"\d")
+_PALAVRA = re.compile(r"\S+")
+
+
+def _palavras(texto: str):
+    """(palavras, início de cada uma, fim de cada uma) em caracteres."""
+    palavras, inicios, fins = [], [], []
+    for m in _PALAVRA.finditer(texto):
+        palavras.append(m.group())
+        inicios.append(m.start())
+        fins.append(m.end())
+    return palavras, inicios, fins
+
+
+class IndiceModelos:
+    """
+    Índice dos documentos já analisados por inteiro (modelos), com as entidades de cada um como spans
+    (analisar_spacy.spans_entidades). analisar() usa o modelo mais parecido, se houver, ou analisa o
+    documento inteiro e o guarda como novo modelo.
+
+    Num documento derivado de um modelo, cada região diferente (difflib, por palavras) é ampliada em
+    `margem` caracteres e reanalisada; as entidades que começam a até margem/2 de uma diferença vêm
+    dessa reanálise e as demais são as do modelo, deslocadas. Isso supõe que nenhum padrão dependa de
+    mais de margem/2 caracteres de contexto (benchmark_quase_duplicados confere a equivalência).
+    """
+
+    def __init__(self, limiar: float = LIMIAR_SIMILARIDADE, margem: int = MARGEM_DIFERENCA,
+                 fracao_maxima: float = FRACAO_MAXIMA_DIFERENCA, max_modelos: int = MAX_MODELOS, semente: int = 0):
+        import numpy as np
+
+        sorteio = np.random.default_rng(semente)
+        self._np = np
+        self._a = sorteio.integers(1, _PRIMO, PERMUTACOES, dtype=np.uint64)
+        self._b = sorteio.integers(0, _PRIMO, PERMUTACOES, dtype=np.uint64)
+        self.limiar = limiar
+        self.margem = margem
+        self.fracao_maxima = fracao_maxima
+        self.max_modelos = max_modelos
+        self.faixas = [{} for _ in range(FAIXAS)]
+        self.modelos = OrderedDict()   # id -> (texto, assinatura, spans)
+        self._proximo = 0
+        self.estatisticas = {"documentos": 0, "modelos": 0, "derivados": 0, "diferentes_demais": 0,
+                             "caracteres": 0, "caracteres_reanalisados": 0,
+                             "tempo_completo": 0.0, "caracteres_completos": 0, "tempo_derivados": 0.0,
+                             "caracteres_derivados": 0}
+
+    # --- MinHash / LSH ---
+    def assinatura(self, texto: str):
+        np = self._np
+        palavras = _DIGITO.sub("0", texto).lower().split()
+        shingles = {" ".join(palavras[i:i + SHINGLE]) for i in range(max(1, len(palavras) - SHINGLE + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _PRIMO for s in shingles), dtype=np.uint64,
+                             count=len(shingles))
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIMO).min(axis=1)
+
+    def _chaves(self, assinatura):
+        linhas = PERMUTACOES // FAIXAS
+        return [assinatura[i * linhas:(i + 1) * linhas].tobytes() for i in range(FAIXAS)]
+
+    def buscar(self, assinatura):
+        """(id, similaridade estimada) do modelo mais parecido acima do limiar, ou (None, 0.0)."""
+        candidatos = set()
+        for faixa, chave in zip(self.faixas, self._chaves(assinatura)):
+            candidatos.update(faixa.get(chave, ()))
+        melhor, similaridade = None, 0.0
+        for id_modelo in candidatos:
+            estimada = float((self.modelos[id_modelo][1] == assinatura).mean())
+            if estimada > similaridade:
+                melhor, similaridade = id_modelo, estimada
+        if similaridade < self.limiar:
+            return None, similaridade
+        self.modelos.move_to_end(melhor)
+        return melhor, similaridade
+
+    def _inserir(self, texto: str, assinatura, spans):
+        id_modelo = self._proximo
+        self._proximo += 1
+        self.modelos[id_modelo] = (texto, assinatura, spans)
+        for faixa, chave in zip(self.faixas, self._chaves(assinatura)):
+            faixa.setdefault(chave, []).append(id_modelo)
+        if len(self.modelos) > self.max_modelos:
+            antigo, (_, assinatura_antiga, _) = self.modelos.popitem(last=False)
+            for faixa, chave in zip(self.faixas, self._chaves(assinatura_antiga)):
+                faixa[chave].remove(antigo)
+                if not faixa[chave]:
+                    del faixa[chave]
+
+    # --- análise ---
+    def analisar(self, texto: str, analisar_completo, analisar_trecho):
+        """
+        Spans das entidades do texto. `analisar_completo(texto)` e `analisar_trecho(texto)` devolvem spans;
+        o segundo só é usado nas regiões diferentes e pode rodar um pipeline mais leve.
+        """
+        e = self.estatisticas
+        e["documentos"] += 1
+        e["caracteres"] += len(texto)
+        assinatura = self.assinatura(texto)
+        id_modelo, _ = self.buscar(assinatura)
+        if id_modelo is not None:
+            inicio = time.perf_counter()
+            spans = self._derivar(texto, self.modelos[id_modelo], analisar_trecho)
+            if spans is not None:
+                e["derivados"] += 1
+                e["tempo_derivados"] += time.perf_counter() - inicio
+                e["caracteres_derivados"] += len(texto)
+                return spans
+            e["diferentes_demais"] += 1
+
+        inicio = time.perf_counter()
+        spans = analisar_completo(texto)
+        e["tempo_completo"] += time.perf_counter() - inicio
+        e["caracteres_completos"] += len(texto)
+        e["caracteres_reanalisados"] += len(texto)
+        if id_modelo is None:
+            e["modelos"] += 1
+            self._inserir(texto, assinatura, spans)
+        return spans
+
+    def _derivar(self, texto: str, modelo, analisar_trecho):
+        texto_modelo, _, spans_modelo = modelo
+        palavras_m, inicios_m, fins_m = _palavras(texto_modelo)
+        palavras, inicios, fins = _palavras(texto)
+        blocos = [b for b in difflib.SequenceMatcher(None, palavras_m, palavras, autojunk=False).get_matching_blocks()
+                  if b.size]
+
+        # regiões diferentes no documento (vazias onde o modelo tem palavras a mais)
+        diferencas, i_ant, j_ant = [], 0, 0
+        for i, j, n in blocos + [(len(palavras_m), len(palavras), 0)]:
+            if i > i_ant or j > j_ant:
+                a = inicios[j_ant] if j_ant < len(palavras) else len(texto)
+                b = fins[j - 1] if j > j_ant else a
+                diferencas.append((a, b))
+            i_ant, j_ant = i + n, j + n
+
+        janelas = []
+        for a, b in diferencas:
+            a = texto.rfind(" ", 0, max(0, a - self.margem)) + 1
+            fim = texto.find(" ", min(len(texto), b + self.margem))
+            b = len(texto) if fim < 0 else fim
+            if janelas and a <= janelas[-1][1]:
+                janelas[-1][1] = max(janelas[-1][1], b)
+            else:
+                janelas.append([a, b])
+        reanalisados = sum(b - a for a, b in janelas)
+        if reanalisados > self.fracao_maxima * len(texto):
+            return None
+        self.estatisticas["caracteres_reanalisados"] += reanalisados
+
+        meia = self.margem // 2
+        nucleos = [(a + meia if a > 0 else 0, b - meia if b < len(texto) else len(texto)) for a, b in janelas]
+        inicios_nucleos = [a for a, _ in nucleos]
+
+        def no_nucleo(posicao):
+            k = bisect.bisect_right(inicios_nucleos, posicao) - 1
+            return k >= 0 and posicao < nucleos[k][1]
+
+        grupos = {}
+        for (a, b) in janelas:
+            for grupo, label, inicio, fim in analisar_trecho(texto[a:b]):
+                if no_nucleo(inicio + a):
+                    grupos.setdefault(grupo, []).append((inicio + a, fim + a, label))
+
+        # entidades do modelo inteiramente dentro de um trecho igual, deslocadas para o documento
+        inicios_blocos = [inicios_m[i] for i, _, _ in blocos]
+        for grupo, label, inicio, fim in spans_modelo:
+            k = bisect.bisect_right(inicios_blocos, inicio) - 1
+            if k < 0:
+                continue
+            i, j, n = blocos[k]
+            if fim > fins_m[i + n - 1]:
+                continue
+            deslocamento = inicios[j] - inicios_m[i]
+            if not no_nucleo(inicio + deslocamento):
+                grupos.setdefault(grupo, []).append((inicio + deslocamento, fim + deslocamento, label))
+
+        from analisar_spacy import ORDEM_GRUPOS
+
+        spans = []
+        for grupo in sorted(grupos, key=ORDEM_GRUPOS.index):
+            fim_anterior = -1
+            for inicio, fim, label in sorted(grupos[grupo]):
+                if grupo == "ents":
+                    if inicio < fim_anterior:
+                        continue
+                    fim_anterior = fim
+                spans.append((grupo, label, inicio, fim))
+        return spans
+
+    # --- relatório ---
+    def resumo(self) -> dict:
+        e = dict(self.estatisticas)
+        e["fracao_derivados"] = e["derivados"] / e["documentos"] if e["documentos"] else 0.0
+        e["fracao_reanalisada"] = e["caracteres_reanalisados"] / e["caracteres"] if e["caracteres"] else 0.0
+        # tempo que os derivados levariam analisados inteiros, pela média por caractere dos completos
+        por_caractere = e["tempo_completo"] / e["caracteres_completos"] if e["caracteres_completos"] else 0.0
+        e["tempo_economizado"] = por_caractere * e["caracteres_derivados"] - e["tempo_derivados"]
+        return e
+
+    def relatorio(self):
+        e = self.resumo()
+        print(f"\n🧬 Quase-duplicados: {e['documentos']} documento(s), {e['modelos']} modelo(s), "
+              f"{e['derivados']} derivado(s) de um modelo ({e['fracao_derivados']:.0%}), "
+              f"{e['diferentes_demais']} parecido(s) mas analisado(s) inteiro(s)")
+        print(f"   texto reanalisado: {e['fracao_reanalisada']:.0%}; "
+              f"tempo economizado (estimado): {e['tempo_economizado']:.1f}s")
+        return e
@@ -0,0 +1,258 @@
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from entidades import Entidades
+
+RESULTADOS_PATH = "resultados.sqlite"
+RELATORIO_PATH = "relatorio.txt"
+COMMIT_A_CADA = 200   # documentos acumulados antes de cada gravação (uma transação por lote)
+ESPERA_TRAVA = 30.0   # segundos esperando outro processo liberar o arquivo antes de falhar
+
+
+class BaseResultados:
+    """
+    Resultados da validação em SQLite: uma linha por documento (status, número do processo,
+    critérios validados), por critério faltante e por entidade (com posição no texto analisado), agrupados por execução.
+    Os registros são gravados em lotes de `commit_a_cada` documentos, cada lote numa transação.
+    Pode ser usada por várias threads e por vários processos: com `execucao`, os registros entram numa
+    execução já criada (iniciar_execucao), como fazem os trabalhadores de fila_trabalho.py. Com wal=False
+    o arquivo fica no diário padrão do SQLite, que funciona também num disco compartilhado entre máquinas.
+    """
+
+    def __init__(self, caminho: str = RESULTADOS_PATH, origem: str = "", commit_a_cada: int = COMMIT_A_CADA,
+                 execucao: int = None, wal: bool = True):
+        self.caminho = caminho
+        self.commit_a_cada = commit_a_cada
+        self.trava = threading.Lock()
+        self.conn = sqlite3.connect(caminho, check_same_thread=False, timeout=ESPERA_TRAVA)
+        self.conn.executescript(f"""
+            PRAGMA foreign_keys = ON;
+            PRAGMA journal_mode = {'WAL' if wal else 'DELETE'};
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS execucoes (
+                id      INTEGER PRIMARY KEY,
+                inicio  REAL NOT NULL,
+                origem  TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documentos (
+                id           INTEGER PRIMARY KEY,
+                execucao     INTEGER NOT NULL REFERENCES execucoes (id) ON DELETE CASCADE,
+                processo     TEXT NOT NULL,
+                num_processo TEXT,
+                completo     INTEGER NOT NULL,
+                criterios    TEXT NOT NULL,   -- labels validados, na ordem, separados por vírgula
+                data         REAL NOT NULL,
+                analise      TEXT             -- NULL: texto inteiro; senão as janelas analisadas (entidades só delas)
+            );
+            CREATE TABLE IF NOT EXISTS faltantes (
+                documento INTEGER NOT NULL REFERENCES documentos (id) ON DELETE CASCADE,
+                label     TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entidades (
+                documento INTEGER NOT NULL REFERENCES documentos (id) ON DELETE CASCADE,
+                label     TEXT NOT NULL,
+                texto     TEXT NOT NULL,
+                inicio    INTEGER,
+                fim       INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_documentos_processo ON documentos (processo);
+            CREATE INDEX IF NOT EXISTS idx_documentos_num_processo ON documentos (num_processo);
+            CREATE INDEX IF NOT EXISTS idx_documentos_status ON documentos (completo, data);
+            CREATE INDEX IF NOT EXISTS idx_documentos_execucao ON documentos (execucao);
+            CREATE INDEX IF NOT EXISTS idx_faltantes_label ON faltantes (label, documento);
+            CREATE INDEX IF NOT EXISTS idx_faltantes_documento ON faltantes (documento);
+            CREATE INDEX IF NOT EXISTS idx_entidades_label ON entidades (label);
+            CREATE INDEX IF NOT EXISTS idx_entidades_documento ON entidades (documento);
+        """)
+        if "analise" not in {coluna for _, coluna, *_ in self.conn.execute("PRAGMA table_info(documentos)")}:
+            try:   # base criada antes da coluna
+                self.conn.execute("ALTER TABLE documentos ADD COLUMN analise TEXT")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):   # outro processo acabou de incluí-la
+                    raise
+        self.origem = origem
+        self.execucao = execucao   # sem ela, criada no primeiro registro
+        self._pendentes = []
+        self.registrados = 0
+
+    def registrar(self, processo: str, entidades: dict, resultado: dict, texto: str = None, analise: str = None):
+        """
+        Acumula o resultado de um documento: entidades, resultado {label: presente} e, se dado, o texto
+        analisado. As posições gravadas são as de Entidades (as da análise; o texto só serve para recortar
+        os trechos, e sem ele a fonte é lida); um dicionário {label: [textos]} é gravado sem posições.
+        `analise` marca um documento de que só partes foram analisadas (ex.: "cabecalho+rodape").
+        """
+        if isinstance(entidades, Entidades):
+            posicoes_ = entidades.com_posicoes(texto)
+        else:
+            posicoes_ = {label: [(trecho, None, None) for trecho in textos]
+                         for label, textos in entidades.items() if textos}
+        num_processo = posicoes_["NUM_PROCESSO"][0][0] if posicoes_.get("NUM_PROCESSO") else None
+        registro = (processo, num_processo, all(resultado.values()), time.time(), resultado, posicoes_, analise)
+        with self.trava:
+            self._pendentes.append(registro)
+            if len(self._pendentes) >= self.commit_a_cada:
+                self._gravar()
+
+    def iniciar_execucao(self) -> int:
+        """Cria a execução em que os próximos registros entram e devolve o id."""
+        with self.trava, self.conn:
+            self.execucao = self._nova_execucao()
+        return self.execucao
+
+    def _nova_execucao(self) -> int:
+        return self.conn.execute("INSERT INTO execucoes (inicio, origem) VALUES (?, ?)",
+                                 (time.time(), self.origem)).lastrowid
+
+    def _gravar(self):
+        if not self._pendentes:
+            return
+        with self.conn:   # uma transação por lote
+            # trava de escrita desde o início: outro processo não lê o mesmo MAX(id) antes do INSERT
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.execucao is None:
+                self.execucao = self._nova_execucao()
+            # ids atribuídos aqui para gravar cada tabela do lote num único executemany
+            proximo = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM documentos").fetchone()[0]
+            documentos, faltantes, entidades = [], [], []
+            for documento, (processo, num_processo, completo, data, resultado, posicoes_, analise) in \
+                    enumerate(self._pendentes, start=proximo):
+                documentos.append((documento, self.execucao, processo, num_processo, completo,
+                                   ",".join(resultado), data, analise))
+                faltantes.extend((documento, label) for label, presente in resultado.items() if not presente)
+                entidades.extend((documento, label, *entidade) for label, lista in posicoes_.items()
+                                 for entidade in lista)
+            self.conn.executemany("INSERT INTO documentos (id, execucao, processo, num_processo, completo, criterios, "
+                                  "data, analise) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", documentos)
+            self.conn.executemany("INSERT INTO faltantes VALUES (?, ?)", faltantes)
+            self.conn.executemany("INSERT INTO entidades VALUES (?, ?, ?, ?, ?)", entidades)
+        self.registrados += len(self._pendentes)
+        self._pendentes = []
+
+    def gravar(self):
+        with self.trava:
+            self._gravar()
+
+    def faltando(self, label: str, desde: float = None, ate: float = None):
+        """[(processo, num_processo, data)] dos documentos em que `label` era obrigatório e não apareceu."""
+        self.gravar()
+        sql = ("SELECT d.processo, d.num_processo, d.data FROM faltantes f JOIN documentos d ON d.id = f.documento "
+               "WHERE f.label = ?")
+        valores = [label]
+        if desde is not None:
+            sql += " AND d.data >= ?"
+            valores.append(desde)
+        if ate is not None:
+            sql += " AND d.data < ?"
+            valores.append(ate)
+        return self.conn.execute(sql + " ORDER BY d.data", valores).fetchall()
+
+    def documentos(self, completo: bool = None, num_processo: str = None, execucao: int = None):
+        """[(id, processo, num_processo, completo, data)] filtrados por status, número do processo e execução."""
+        self.gravar()
+        condicoes, valores = [], []
+        for coluna, valor in (("completo", completo), ("num_processo", num_processo), ("execucao", execucao)):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                valores.append(valor)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return self.conn.execute(
+            f"SELECT id, processo, num_processo, completo, data FROM documentos {where} ORDER BY id", valores
+        ).fetchall()
+
+    def entidades(self, label: str):
+        """[(processo, texto, inicio, fim)] de todas as ocorrências de `label`."""
+        self.gravar()
+        return self.conn.execute(
+            "SELECT d.processo, e.texto, e.inicio, e.fim FROM entidades e JOIN documentos d ON d.id = e.documento "
+            "WHERE e.label = ? ORDER BY e.documento", (label,)
+        ).fetchall()
+
+    def gerar_relatorio(self, caminho: str = RELATORIO_PATH, execucao: int = None):
+        """
+        Grava o relatório legível (mesmo formato do antigo relatorio.txt) de uma execução
+        (a atual ou, sem registros nesta, a última), sobrescrevendo o arquivo.
+        """
+        self.gravar()
+        execucao = execucao or self.execucao or self.conn.execute("SELECT MAX(id) FROM execucoes").fetchone()[0]
+        faltantes = {}
+        for documento, label in self.conn.execute(
+            "SELECT f.documento, f.label FROM faltantes f JOIN documentos d ON d.id = f.documento "
+            "WHERE d.execucao = ?", (execucao,)
+        ):
+            faltantes.setdefault(documento, set()).add(label)
+
+        with open(caminho, "w", encoding="utf-8") as f:
+            for documento, processo, criterios, completo in self.conn.execute(
+                "SELECT id, processo, criterios, completo FROM documentos WHERE execucao = ? ORDER BY id", (execucao,)
+            ):
+                faltando = faltantes.get(documento, ())
+                f.write(f"\n===========================\n")
+                f.write(f"processo: {processo}\n")
+                for label in criterios.split(",") if criterios else []:
+                    f.write(f" - {label} : {'❌' if label in faltando else '✅'}\n")
+                f.write(f"Status final: {'COMPLETO ✅' if completo else 'INCOMPLETO ⚠️'}\n")
+                f.write(f"===============================\n")
+        return caminho
+
+    def resumo(self):
+        """[(execucao, inicio, origem, documentos, completos)]"""
+        self.gravar()
+        return self.conn.execute(
+            "SELECT x.id, x.inicio, x.origem, COUNT(d.id), COALESCE(SUM(d.completo), 0) FROM execucoes x "
+            "LEFT JOIN documentos d ON d.execucao = x.id GROUP BY x.id ORDER BY x.id"
+        ).fetchall()
+
+    def limpar(self, manter: int) -> int:
+        """Remove as execuções mais antigas, mantendo as `manter` últimas. Devolve quantas foram removidas."""
+        self.gravar()
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM execucoes WHERE id NOT IN (SELECT id FROM execucoes ORDER BY id DESC LIMIT ?)", (manter,)
+            )
+        return cursor.rowcount
+
+    def fechar(self):
+        self.gravar()
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta os resultados da validação gravados em SQLite.")
+    parser.add_argument("--base", default=RESULTADOS_PATH)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("resumo", help="documentos e completos por execução")
+    faltando = comandos.add_parser("faltando", help="documentos sem um critério obrigatório")
+    faltando.add_argument("label", help="ex.: ASSINATURA_ELETRONICA")
+    faltando.add_argument("--dias", type=float, help="só os validados nos últimos N dias")
+    relatorio = comandos.add_parser("relatorio", help="gera o relatório legível de uma execução")
+    relatorio.add_argument("--execucao", type=int, help="padrão: a última")
+    relatorio.add_argument("--saida", default=RELATORIO_PATH)
+    limpar = comandos.add_parser("limpar", help="remove execuções antigas")
+    limpar.add_argument("--manter", type=int, required=True, help="quantas execuções recentes manter")
+    args = parser.parse_args(argv)
+
+    base = BaseResultados(args.base)
+    if args.comando == "resumo":
+        for execucao, inicio, origem, documentos, completos in base.resumo():
+            print(f" - {execucao} {datetime.fromtimestamp(inicio):%Y-%m-%d %H:%M} {origem}: "
+                  f"{completos}/{documentos} completos")
+    elif args.comando == "faltando":
+        desde = time.time() - args.dias * 86400 if args.dias else None
+        linhas = base.faltando(args.label, desde=desde)
+        for processo, num_processo, data in linhas:
+            print(f" - {datetime.fromtimestamp(data):%Y-%m-%d %H:%M} {processo} {num_processo or ''}")
+        print(f"{len(linhas)} documento(s) sem {args.label}")
+    elif args.comando == "relatorio":
+        print(f"📝 Relatório gravado em {base.gerar_relatorio(args.saida, args.execucao)}")
+    else:
+        print(f"🗑️ {base.limpar(args.manter)} execução(ões) removida(s) de {args.base}")
+    base.fechar()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
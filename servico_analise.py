@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+import socketserver
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import analisar_spacy
+from resultados import BaseResultados
+from entidades import Entidades
+
+# -------------------------------------------------------------------
+# serviço de análise: pipeline carregado uma vez, documentos avulsos via HTTP
+# -------------------------------------------------------------------
+#   POST /analisar  {"documento": "...", "texto": "..."} → entidades + veredito de validar_documento
+#   GET  /metricas  latência p50/p99, vazão e tamanho dos lotes
+#   GET  /saude
+# Requisições simultâneas são agrupadas em micro-lotes para o nlp.pipe: o primeiro documento
+# espera no máximo ESPERA_MAXIMA segundos por outros antes de o lote seguir (no máximo MAX_LOTE).
+# Textos acima de analisar_spacy.TAMANHO_TRECHO saem do micro-lote e são analisados em trechos (analisar_longo).
+
+HOST = "127.0.0.1"
+PORTA = 8765
+MAX_LOTE = analisar_spacy.BATCH_SIZE   # documentos por micro-lote
+# segundos que um lote incompleto espera por mais documentos; com 0 o lote leva o que já está na fila
+# (o que chega durante um lote forma o seguinte), o que teve a melhor vazão e latência em benchmark_servico
+ESPERA_MAXIMA = 0.0
+FILA_MAXIMA = 1000                    # documentos aguardando; acima disso responde 503
+JANELA_METRICAS = 10000               # últimas latências usadas nos percentis
+INTERVALO_ESPERA = 0.1                # segundos entre verificações de encerramento
+
+
+class Pedido:
+    __slots__ = ("documento", "texto", "chegada", "pronto", "resposta", "erro")
+
+    def __init__(self, documento: str, texto: str):
+        self.documento = documento
+        self.texto = texto
+        self.chegada = time.perf_counter()
+        self.pronto = threading.Event()
+        self.resposta = None
+        self.erro = None
+
+
+class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = False
+    block_on_close = True   # server_close() espera as respostas em andamento
+
+
+class _ServidorTCP(ThreadingHTTPServer):
+    daemon_threads = False
+    block_on_close = True
+
+
+class ServicoAnalise:
+    """
+    Mantém o pipeline do spaCy carregado e analisa documentos recebidos por HTTP (TCP ou socket Unix).
+    Uma única thread roda o nlp.pipe sobre micro-lotes de até `max_lote` documentos; cada resposta
+    traz as entidades e o veredito de validar_documento, que também é registrado em `base` (se houver).
+    parar() deixa de aceitar documentos, termina os que já chegaram e só então fecha o servidor.
+    """
+
+    def __init__(self, nlp=None, hibrido: bool = False, max_lote: int = MAX_LOTE,
+                 espera_maxima: float = ESPERA_MAXIMA, host: str = HOST, porta: int = PORTA,
+                 socket_unix: str = None, base: BaseResultados = None, fila_maxima: int = FILA_MAXIMA):
+        self.nlp = nlp or analisar_spacy.obter_pipeline()
+        self.desativar, self.extrair = analisar_spacy.criar_extrator(self.nlp, hibrido, spans=True)
+        self.limite = min(analisar_spacy.TAMANHO_TRECHO, self.nlp.max_length)
+        self.max_lote = max_lote
+        self.espera_maxima = espera_maxima
+        self.base = base
+        self.fila = queue.Queue(maxsize=fila_maxima)
+        self.encerrando = threading.Event()
+        self.aceite = threading.Lock()   # aceitar um documento e iniciar o encerramento não se intercalam
+        self.trava = threading.Lock()
+        self.latencias = deque(maxlen=JANELA_METRICAS)
+        self.lotes = deque(maxlen=JANELA_METRICAS)
+        self.documentos = 0
+        self.erros = 0
+        self.recusados = 0
+        self.inicio = None
+
+        # aquece o pipeline: o primeiro documento real não paga a inicialização preguiçosa
+        list(self.nlp.pipe(["Processo nº 53500.000001/2020-01"], disable=self.desativar))
+
+        servico = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metricas":
+                    self._responder(200, servico.metricas())
+                elif self.path == "/saude":
+                    self._responder(503 if servico.encerrando.is_set() else 200,
+                                    {"ok": not servico.encerrando.is_set()})
+                else:
+                    self._responder(404, {"erro": "caminho desconhecido"})
+
+            def do_POST(self):
+                if self.path != "/analisar":
+                    return self._responder(404, {"erro": "caminho desconhecido"})
+                try:
+                    corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    texto, documento = corpo["texto"], corpo.get("documento")
+                    if not isinstance(texto, str) or not isinstance(documento, (str, type(None))):
+                        raise TypeError("documento e texto devem ser strings")
+                except (ValueError, KeyError, TypeError):
+                    return self._responder(400, {"erro": 'esperado JSON {"documento": ..., "texto": ...}'})
+                status, resposta = servico.analisar(documento or "documento", texto)
+                self._responder(status, resposta)
+
+            def _responder(self, status: int, resposta: dict):
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def address_string(self):
+                return self.client_address[0] if self.client_address else "unix"
+
+            def log_message(self, *args):
+                pass
+
+        if socket_unix:
+            if os.path.exists(socket_unix):
+                os.remove(socket_unix)
+            self.http = _ServidorUnix(socket_unix, Manipulador)
+            self.endereco = f"unix:{socket_unix}"
+            self.url = None
+        else:
+            self.http = _ServidorTCP((host, porta), Manipulador)
+            self.url = f"http://{host}:{self.http.server_address[1]}"
+            self.endereco = self.url
+        self.socket_unix = socket_unix
+        self.thread_http = None
+        self.thread_lotes = None
+
+    # --- requisições ---
+    def analisar(self, documento: str, texto: str):
+        """Enfileira um documento e espera o micro-lote dele. Devolve (status HTTP, resposta)."""
+        pedido = Pedido(documento, analisar_spacy.limpar_texto(texto))
+        with self.aceite:
+            if self.encerrando.is_set():
+                return 503, {"erro": "serviço encerrando"}
+            try:
+                self.fila.put_nowait(pedido)
+            except queue.Full:
+                with self.trava:
+                    self.recusados += 1
+                return 503, {"erro": "fila cheia"}
+        pedido.pronto.wait()
+        if pedido.erro:
+            return 500, {"erro": pedido.erro}
+        return 200, pedido.resposta
+
+    # --- micro-lotes ---
+    def _proximo_lote(self):
+        """Espera o primeiro documento e junta os que chegarem até `espera_maxima` depois dele."""
+        while True:
+            try:
+                lote = [self.fila.get(timeout=INTERVALO_ESPERA)]
+                break
+            except queue.Empty:
+                if self.encerrando.is_set():
+                    return []
+        prazo = time.perf_counter() + self.espera_maxima
+        while len(lote) < self.max_lote:
+            restante = prazo - time.perf_counter()
+            try:
+                lote.append(self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _validar(self, pedido: Pedido, spans):
+        entidades = Entidades.de_spans(spans)
+        completo, resultado = analisar_spacy.validar_documento(
+            pedido.documento, entidades, analisar_spacy.criterios_obrigatorios, self.base, pedido.texto,
+            imprimir=False)
+        pedido.resposta = {"documento": pedido.documento, "entidades": entidades.resolver(pedido.texto),
+                           "completo": completo, "criterios": resultado}
+
+    def _analisar_lote(self, lote):
+        """
+        Responde os pedidos do lote com um único nlp.pipe. Se ele falha, os pedidos ainda sem resposta
+        são refeitos um a um: só o documento que falhar de novo recebe o erro, e não o lote inteiro.
+        """
+        try:
+            docs = self.nlp.pipe((p.texto for p in lote), batch_size=len(lote), disable=self.desativar)
+            for pedido, doc in zip(lote, docs):
+                self._validar(pedido, self.extrair(doc))
+        except Exception as e:
+            if len(lote) == 1:
+                lote[0].erro = f"{type(e).__name__}: {e}"
+                return
+            for pedido in lote:
+                if pedido.resposta is None:
+                    self._analisar_lote([pedido])
+
+    def _analisar_longo(self, pedido: Pedido):
+        """Texto acima do limite, analisado em trechos como em analisar_spacy._processar."""
+        try:
+            spans = analisar_spacy.analisar_longo(pedido.texto, self.nlp, self.extrair, self.desativar, self.limite,
+                                                  analisar_spacy.SOBREPOSICAO_TRECHO)
+            self._validar(pedido, spans)
+        except Exception as e:
+            pedido.erro = f"{type(e).__name__}: {e}"
+
+    def _liberar(self, pedidos):
+        """Registra as métricas dos pedidos já analisados e libera quem espera por eles."""
+        fim = time.perf_counter()
+        with self.trava:
+            for pedido in pedidos:
+                if pedido.erro:
+                    self.erros += 1
+                else:
+                    self.documentos += 1
+                    self.latencias.append(fim - pedido.chegada)
+        for pedido in pedidos:
+            if pedido.resposta is not None:
+                pedido.resposta["latencia_ms"] = 1000 * (fim - pedido.chegada)
+            pedido.pronto.set()
+
+    def _processar_lotes(self):
+        # sai só com o encerramento pedido e a fila vazia: nada que já foi aceito fica sem resposta
+        while True:
+            lote = self._proximo_lote()
+            if not lote:
+                return
+            with self.trava:
+                self.lotes.append(len(lote))
+            curtos = [pedido for pedido in lote if len(pedido.texto) <= self.limite]
+            if curtos:
+                # os curtos respondem já, sem esperar os textos longos do mesmo lote
+                self._analisar_lote(curtos)
+                self._liberar(curtos)
+            for pedido in lote:
+                if len(pedido.texto) > self.limite:
+                    self._analisar_longo(pedido)
+                    self._liberar([pedido])
+
+    # --- métricas ---
+    def metricas(self) -> dict:
+        with self.trava:
+            latencias = sorted(self.latencias)
+            lotes = list(self.lotes)
+            documentos, erros, recusados = self.documentos, self.erros, self.recusados
+        percentil = lambda p: 1000 * latencias[min(len(latencias) - 1, int(p * len(latencias)))] if latencias else None
+        ativo = time.perf_counter() - self.inicio if self.inicio else 0.0
+        return {
+            "documentos": documentos, "erros": erros, "recusados": recusados, "na_fila": self.fila.qsize(),
+            "segundos_ativo": ativo, "docs_por_segundo": documentos / ativo if ativo else 0.0,
+            "latencia_p50_ms": percentil(0.50), "latencia_p99_ms": percentil(0.99),
+            "lote_medio": sum(lotes) / len(lotes) if lotes else 0.0, "lote_maximo": max(lotes, default=0),
+            "max_lote": self.max_lote, "espera_maxima_ms": 1000 * self.espera_maxima,
+        }
+
+    # --- ciclo de vida ---
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self.thread_lotes = threading.Thread(target=self._processar_lotes, name="lotes", daemon=True)
+        self.thread_lotes.start()
+        self.thread_http = threading.Thread(target=self.http.serve_forever, name="http", daemon=True)
+        self.thread_http.start()
+        return self
+
+    def parar(self):
+        """Encerramento gracioso: recusa novos documentos, responde os aceitos e fecha o servidor."""
+        with self.aceite:
+            self.encerrando.set()
+        # o servidor continua aceitando conexões (e respondendo 503) até a fila esvaziar
+        if self.thread_lotes:
+            self.thread_lotes.join()
+        if self.thread_http:
+            self.http.shutdown()
+        self.http.server_close()   # espera as threads que ainda estão enviando respostas
+        if self.socket_unix and os.path.exists(self.socket_unix):
+            os.remove(self.socket_unix)
+        if self.base is not None:
+            self.base.fechar()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def enviar(url: str, texto: str, documento: str = "documento", timeout: float = 60.0) -> dict:
+    """Cliente mínimo: analisa um documento num ServicoAnalise em `url` (TCP)."""
+    requisicao = urllib.request.Request(
+        url.rstrip("/") + "/analisar", method="POST", headers={"Content-Type": "application/json"},
+        data=json.dumps({"documento": documento, "texto": texto}, ensure_ascii=False).encode("utf-8"))
+    with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+        return json.loads(resposta.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de análise e validação com o modelo carregado.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--socket", help="socket Unix em vez de TCP")
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE)
+    parser.add_argument("--espera", type=float, default=ESPERA_MAXIMA, help="espera máxima de um lote (s)")
+    parser.add_argument("--hibrido", action="store_true", help="usa a varredura regex (modo híbrido)")
+    parser.add_argument("--sem-base", action="store_true", help="não registra os resultados em resultados.sqlite")
+    args = parser.parse_args(sys.argv[1:])
+
+    servico = ServicoAnalise(hibrido=args.hibrido, max_lote=args.max_lote, espera_maxima=args.espera,
+                             host=args.host, porta=args.porta, socket_unix=args.socket,
+                             base=None if args.sem_base else BaseResultados(origem="servico_analise"))
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    servico.iniciar()
+    print(f"🛰️ Serviço de análise em {servico.endereco} (lotes de até {args.max_lote}, espera {args.espera}s)")
+    parar.wait()
+    print("⏹️ Encerrando: terminando os documentos em andamento...")
+    servico.parar()
+    m = servico.metricas()
+    print(f"✅ {m['documentos']} documento(s), p50 {m['latencia_p50_ms'] or 0:.1f} ms, "
+          f"p99 {m['latencia_p99_ms'] or 0:.1f} ms, lote médio {m['lote_medio']:.1f}")
@@ -0,0 +1,113 @@
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local que imita a extração do Gemini, para medir throughput e
+# testar o tratamento de falhas de extrair_texto.processar_pdfs sem rede:
+#   processar_pdfs(pasta, backend=BackendHTTP(servidor.url))
+
+HOST = "127.0.0.1"
+PORTA = 0   # 0 = porta livre escolhida pelo sistema
+
+
+class ServidorGeminiFalso:
+    """
+    Responde a POSTs com {"texto": ...} derivado do conteúdo do PDF.
+
+    latencia: segundos por requisição (simula o tempo do modelo)
+    taxa_falhas: fração de respostas 429/503
+    taxa_vazias: fração de respostas 200 sem texto
+    limite_concorrencia: acima disso responde 429 (como a cota da API)
+    """
+
+    def __init__(self, latencia: float = 0.2, taxa_falhas: float = 0.0, taxa_vazias: float = 0.0,
+                 limite_concorrencia: int = None, semente: int = 0, host: str = HOST, porta: int = PORTA):
+        self.latencia = latencia
+        self.taxa_falhas = taxa_falhas
+        self.taxa_vazias = taxa_vazias
+        self.limite_concorrencia = limite_concorrencia
+        self.sorteio = random.Random(semente)
+        self.trava = threading.Lock()
+        self.em_andamento = 0
+        self.estatisticas = {"requisicoes": 0, "ok": 0, "falhas": 0, "vazias": 0, "limitadas": 0}
+
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                arquivo = bytes.fromhex(self.headers.get("X-Arquivo", "")).decode("utf-8")
+                status, resposta = servidor._responder(arquivo, corpo)
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer((host, porta), Manipulador)
+        self.http.daemon_threads = True
+        self.url = f"http://{host}:{self.http.server_address[1]}/extrair"
+        self.thread = None
+
+    def _responder(self, arquivo: str, corpo: bytes):
+        with self.trava:
+            self.estatisticas["requisicoes"] += 1
+            self.em_andamento += 1
+            excedeu = self.limite_concorrencia is not None and self.em_andamento > self.limite_concorrencia
+            sorteio = self.sorteio.random()
+        try:
+            if excedeu:
+                self._contar("limitadas")
+                return 429, {"erro": "RESOURCE_EXHAUSTED"}
+            time.sleep(self.latencia)
+            if sorteio < self.taxa_falhas:
+                self._contar("falhas")
+                return (429 if sorteio < self.taxa_falhas / 2 else 503), {"erro": "UNAVAILABLE"}
+            if sorteio < self.taxa_falhas + self.taxa_vazias:
+                self._contar("vazias")
+                return 200, {"texto": ""}
+            self._contar("ok")
+            return 200, {"texto": texto_esperado(arquivo, corpo)}
+        finally:
+            with self.trava:
+                self.em_andamento -= 1
+
+    def _contar(self, chave: str):
+        with self.trava:
+            self.estatisticas[chave] += 1
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.http.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def parar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def texto_esperado(arquivo: str, corpo: bytes) -> str:
+    """Texto que o servidor devolve para um PDF (permite conferir a saída gravada)."""
+    return f"Texto extraído de {arquivo} sha256 {hashlib.sha256(corpo).hexdigest()}"
+
+
+if __name__ == "__main__":
+    with ServidorGeminiFalso() as servidor:
+        print(f"🧪 Servidor Gemini falso em {servidor.url} (Ctrl+C para sair)")
+        try:
+            servidor.thread.join()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,110 @@
+import time
+
+# -------------------------------------------------------------------
+# validação direcionada: cabeçalho e rodapé primeiro, texto inteiro só se faltar algo
+# -------------------------------------------------------------------
+# Processo, interessado e CNPJ ficam no cabeçalho; assinatura, código verificador, CRC e número SEI,
+# no rodapé. Para validar um documento basta saber se cada rótulo obrigatório do seu tipo
+# (analisar_spacy.criterios_do_tipo) aparece: as janelas são analisadas uma a uma e a análise para
+# assim que todos foram encontrados. Se algum continuar faltando, o documento é analisado inteiro.
+
+JANELA_CABECALHO = 2500   # caracteres iniciais analisados na janela do cabeçalho
+JANELA_RODAPE = 2000      # caracteres finais analisados na janela do rodapé
+MARGEM_JANELA = 100       # entidades a menos disso de um corte são descartadas (a maior conhecida tem 69)
+
+# rótulos que costumam estar em cada janela; a que tiver mais obrigatórios ainda faltando vai primeiro
+REGIOES_ROTULOS = {
+    "cabecalho": {"NUM_PROCESSO", "INTERESSADO", "CNPJ", "DESPACHO", "NUM_PROC_FISC", "RELATORIO_FISC",
+                  "NUM_PROC_ADM", "INFORME", "NUM_PASTA"},
+    "rodape": {"ASSINATURA_ELETRONICA", "HORA_ASSINATURA", "CODIGO_VERIFICADOR", "CRC", "NUM_SEI"},
+}
+
+
+def _percentil(valores, p: float) -> float:
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else 0.0
+
+
+class VarreduraDirecionada:
+    """
+    Analisa as janelas do cabeçalho e do rodapé antes do texto inteiro, parando quando todos os rótulos
+    obrigatórios já apareceram. Os spans devolvidos são só os das janelas analisadas (com posições no texto
+    inteiro), ou os do texto inteiro quando foi preciso recorrer a ele.
+
+    As entidades a menos de `margem` caracteres de um corte são descartadas: a presença de um rótulo numa
+    janela implica a presença no texto inteiro, e o resultado da validação é o mesmo da análise completa
+    (benchmark_validacao_direcionada confere). Registra o modo (janelas analisadas ou "completa") e a
+    latência de cada documento.
+    """
+
+    def __init__(self, cabecalho: int = JANELA_CABECALHO, rodape: int = JANELA_RODAPE, margem: int = MARGEM_JANELA):
+        self.cabecalho = cabecalho
+        self.rodape = rodape
+        self.margem = margem
+        self.latencias = {}             # modo -> [segundos por documento]
+        self.caracteres = 0
+        self.caracteres_analisados = 0
+        self.modo = None                # da última análise: as janelas ("cabecalho+rodape"...) ou "completa"
+
+    def janelas(self, texto: str) -> dict:
+        """{região: (início, fim)}, com os cortes no início de uma palavra."""
+        fim_cabecalho = texto.rfind(" ", 0, self.cabecalho) + 1 or self.cabecalho
+        inicio_rodape = texto.find(" ", len(texto) - self.rodape) + 1 or len(texto) - self.rodape
+        return {"cabecalho": (0, fim_cabecalho), "rodape": (inicio_rodape, len(texto))}
+
+    def analisar(self, texto: str, obrigatorios, analisar_janela, analisar_completo):
+        """
+        Spans (analisar_spacy.spans_entidades) suficientes para validar `obrigatorios` no texto.
+        `analisar_janela(texto)` e `analisar_completo(texto)` devolvem spans; o primeiro só recebe as janelas
+        e pode rodar um pipeline mais leve.
+        """
+        from analisar_spacy import ORDEM_GRUPOS
+
+        inicio = time.perf_counter()
+        faltando = set(obrigatorios)
+        analisadas, spans, analisados = [], [], 0
+        if len(texto) > self.cabecalho + self.rodape:
+            janelas = self.janelas(texto)
+            while faltando:
+                candidatas = [(len(faltando & rotulos), regiao) for regiao, rotulos in REGIOES_ROTULOS.items()
+                              if regiao not in analisadas and faltando & rotulos]
+                if not candidatas:
+                    break
+                _, regiao = max(candidatas)
+                a, b = janelas[regiao]
+                for grupo, label, i, f in analisar_janela(texto[a:b]):
+                    if (a > 0 and i < self.margem) or (b < len(texto) and f > b - a - self.margem):
+                        continue   # perto do corte: pode depender do que ficou fora da janela
+                    spans.append((grupo, label, i + a, f + a))
+                    faltando.discard(label)
+                analisadas.append(regiao)
+                analisados += b - a
+        if faltando or not analisadas:
+            modo = "completa"
+            spans = analisar_completo(texto)
+            analisados += len(texto)
+        else:
+            modo = "+".join(analisadas)
+            spans.sort(key=lambda s: (ORDEM_GRUPOS.index(s[0]), s[2]))
+        self.modo = modo
+        self.latencias.setdefault(modo, []).append(time.perf_counter() - inicio)
+        self.caracteres += len(texto)
+        self.caracteres_analisados += analisados
+        return spans
+
+    def resumo(self) -> dict:
+        todas = [t for latencias in self.latencias.values() for t in latencias]
+        modos = {modo: {"documentos": len(latencias), "p50_ms": 1000 * _percentil(latencias, 0.5),
+                        "p95_ms": 1000 * _percentil(latencias, 0.95)}
+                 for modo, latencias in sorted(self.latencias.items(), key=lambda item: -len(item[1]))}
+        return {"documentos": len(todas), "modos": modos,
+                "p50_ms": 1000 * _percentil(todas, 0.5), "p95_ms": 1000 * _percentil(todas, 0.95),
+                "fracao_analisada": self.caracteres_analisados / self.caracteres if self.caracteres else 0.0}
+
+    def relatorio(self) -> dict:
+        r = self.resumo()
+        print(f"\n🎯 Validação direcionada: {r['documentos']} documento(s), {r['fracao_analisada']:.0%} do texto "
+              f"analisado, latência p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms")
+        for modo, m in r["modos"].items():
+            print(f" - {modo:<18} {m['documentos']:>6} doc(s)  p50 {m['p50_ms']:7.1f} ms  p95 {m['p95_ms']:7.1f} ms")
+        return r
@@ -0,0 +1,391 @@
+import re
+import time
+
+# -------------------------------------------------------------------
+# varredura regex: rótulos "palavra-âncora + número" sem passar pelo spaCy
+# -------------------------------------------------------------------
+# As expressões reproduzem, sobre o texto limpo (espaços simples), o que os padrões
+# do EntityRuler/Matcher em analisar_spacy casam token a token com o tokenizer pt:
+#   - um token começa após espaço ou pontuação de abertura;
+#   - pontuação final (",", ".", ")"...) seguida de espaço vira token próprio;
+#   - "/" ou ":" antes de letra é separado (infixo);
+#   - "\w+-\w+" dentro de um trecho vira token próprio (ex: "40.432.544/" + "0001-47").
+
+_INICIO = r"(?<![\w-])"
+_PONTUACAO_FINAL = r"[.,;:!?)\]}\"'»”’…]"
+# fim de token
+_FIM = rf"(?=$|\s|{_PONTUACAO_FINAL}(?![^\W_])|[/:<>=](?=[^\W\d_]))"
+# fim de uma sequência [0-9./-]+ ("." já faz parte da classe)
+_FIM_CLASSE = r"(?=$|\s|[,;:!?)\]}\"'»”’…](?![^\W_])|(?<=/)[^\W\d_])"
+# token IS_PUNCT (categoria P* do unicode, sem os símbolos $+<=>^`|~)
+_PONTUACAO = r"[!\"#%&'()*,\-./:;?@\[\\\]_{}¡§«¶·»¿–—‘’‚“”„…]"
+_FIM_PONTUACAO = rf"(?=$|\s|{_PONTUACAO})"
+_ABERTURA = r"[(\[{\"'«“‘]"
+
+# "n°" (com símbolo de grau) nunca é um token só: o tokenizer separa "n" e "°"
+_NO = r"(?:(?i:nº|no) )?"
+_DIGITO = rf"\d+{_FIM}"                                   # {"IS_DIGIT": True}
+_DIGITOS = rf"{_DIGITO}(?: {_DIGITO})*"                   # {"IS_DIGIT": True, "OP": "+"}
+_NUMERO = rf"[0-9./-]+{_FIM_CLASSE}(?: [0-9./-]+{_FIM_CLASSE})*"   # {"TEXT": {"REGEX": "^[0-9./-]+$"}, "OP": "+"}
+
+PADROES_VARREDURA = {
+    "NUM_SEI": rf"{_INICIO}(?i:sei) {_NO}{_DIGITOS}",
+    "NUM_PROC_FISC": rf"{_INICIO}(?i:processo de fiscalização) {_NO}{_NUMERO}",
+    "NUM_PROC_ADM": rf"{_INICIO}(?i:processo administrativo) {_NO}{_NUMERO}",
+    "NUM_PROCESSO": rf"{_INICIO}(?i:processo) {_NO}{_NUMERO}",
+    "RESOLUCAO": (
+        rf"{_INICIO}(?i:resolução) {_NO}{_DIGITOS}"
+        rf"(?: ?(?:{_ABERTURA}{_DIGITO}|{_PONTUACAO}{_FIM_PONTUACAO}(?: {_DIGITO})?))?"
+    ),
+    "INFORME": rf"{_INICIO}(?i:informes?) {_NO}\d{{1,4}}/\d{{4}}{_FIM}(?: /[A-Z]{{2,}}{_FIM})?",
+    "CODIGO_VERIFICADOR": rf"{_INICIO}(?i:código verificador) {_DIGITOS}",
+    "NUM_PASTA": rf"{_INICIO}(?i:pastas?) (?:(?i:nº|no|n\.º) )?[A-Z0-9]+{_FIM}(?: [A-Z0-9]+{_FIM})*",
+    "HORA_ASSINATURA": (
+        rf"{_INICIO}\d{{2}}/\d{{2}}/\d{{4}} ?, (?i:[aà]s) \d{{2}}:\d{{2}} ?, conforme "
+        rf"(?i:hor[aá]rio oficial de bras[ií]lia)[\w-]*{_FIM}"
+    ),
+    # o padrão do EntityRuler aplica este regex a um único token e por isso nunca casa
+    # (um token não contém espaços); aqui ele é aplicado ao texto, como pretendido
+    "PRAZO": r"no\s+prazo\s+de\s+\d+\s*(?:\([a-zA-Z]+\))?\s+dias?",
+}
+
+# Matcher de CNPJ/CPF: dois tokens, o segundo sendo o infixo "\w+-\w+"
+PADROES_VARREDURA_MATCHER = {
+    "CNPJ": rf"(?<![^\s{_ABERTURA[1:-1]}])[\d.]*\d{{2}}\.\d{{3}}\.\d{{3}}/ ?\w*\d{{4}}-\d{{2}}\w*(?:-\w+)*",
+    "CPF": rf"(?<![^\s{_ABERTURA[1:-1]}])[\d.]*\d{{3}}\.\d{{3}}\.\w*\d{{3}}-\d{{2}}\w*(?:-\w+)*",
+}
+
+# rótulos esperados a divergir do EntityRuler atual (ver comentário de PRAZO)
+DIVERGENCIAS_CONHECIDAS = {"PRAZO"}
+
+ROTULOS = set(PADROES_VARREDURA) | set(PADROES_VARREDURA_MATCHER)
+
+PADROES_COMPILADOS = {label: re.compile(p) for label, p in PADROES_VARREDURA.items()}
+# uma única alternância com grupos nomeados por varredura
+_REGEX_RULER = re.compile("|".join(f"(?P<{label}>{p})" for label, p in PADROES_VARREDURA.items()))
+_REGEX_MATCHER = re.compile("|".join(f"(?P<{label}>{p})" for label, p in PADROES_VARREDURA_MATCHER.items()))
+
+
+_PREFIXOS = re.compile(r"^[(\[{\"'«“‘]+")
+_SUFIXOS = re.compile(r"[.,;:!?)\]}\"'»”’…]+$")
+_INFIXOS = re.compile(r"(?<=[^\W_])[/:](?=[^\W\d_])|\w+-\w+(?:-\w+)*")
+
+def _contar_tokens(trecho: str) -> int:
+    """Número aproximado de tokens do tokenizer pt num trecho (prefixos, sufixos e infixos acima)."""
+    total = 0
+    for parte in trecho.split(" "):
+        prefixo = _PREFIXOS.match(parte)
+        sufixo = _SUFIXOS.search(parte)
+        inicio = prefixo.end() if prefixo else 0
+        fim = max(sufixo.start() if sufixo else len(parte), inicio)
+        total += inicio + (len(parte) - fim)
+        # cada infixo vira token e separa o que vem antes e depois dele
+        pos = inicio
+        for m in _INFIXOS.finditer(parte, inicio, fim):
+            total += 1 + (m.start() > pos)
+            pos = m.end()
+        total += fim > pos
+    return total
+
+def _ocorrencias(texto: str):
+    """
+    Todas as ocorrências dos padrões do EntityRuler, inclusive as que começam dentro
+    de uma ocorrência anterior (ex: um "+" de NUM_PASTA que engole "PROCESSO DE ...").
+    """
+    pos = 0
+    while (m := _REGEX_RULER.search(texto, pos)):
+        yield m.lastgroup, m.start(), m.end()
+        pos = m.start() + 1
+
+def _resolver(candidatos, comprimento):
+    """
+    Escolhe ocorrências sem sobreposição como EntityRuler.set_annotations:
+    a mais longa primeiro, depois a mais à esquerda. Devolve em ordem de início.
+    """
+    aceitos, vistos = [], set()
+    for label, inicio, fim in sorted(candidatos, key=lambda c: (comprimento(c), -c[1]), reverse=True):
+        if inicio not in vistos and fim - 1 not in vistos:
+            aceitos.append((label, inicio, fim))
+            vistos.update(range(inicio, fim))
+    return sorted(aceitos, key=lambda c: c[1])
+
+def varrer(texto: str):
+    """
+    Encontra os rótulos da varredura no texto limpo, sem spaCy.
+    Devolve duas listas de (label, início, fim) em caracteres: padrões do EntityRuler e do Matcher.
+    Sobreposições entre rótulos são resolvidas pelo número aproximado de tokens (_contar_tokens).
+    """
+    candidatos, extras = set(), []
+    for label, inicio, fim in _ocorrencias(texto):
+        if label in DIVERGENCIAS_CONHECIDAS:
+            # não existe no EntityRuler, então não disputa sobreposição com os outros rótulos
+            extras.append((label, inicio, fim))
+            continue
+        padrao = PADROES_COMPILADOS[label]
+        cortes = [inicio + i for i, c in enumerate(texto[inicio:fim]) if c == " "] + [fim]
+        candidatos.update((label, inicio, corte) for corte in cortes if padrao.fullmatch(texto, inicio, corte))
+    ruler = _resolver(candidatos, lambda c: _contar_tokens(texto[c[1]:c[2]]))
+    ruler = sorted(ruler + extras, key=lambda c: c[1])
+    matcher = [(m.lastgroup, m.start(), m.end()) for m in _REGEX_MATCHER.finditer(texto)]
+    return ruler, matcher
+
+def varrer_entidades(texto: str):
+    """Mesma forma de analisar_spacy.extrair_entidades, restrita aos rótulos da varredura."""
+    entidades = {label: [] for label in PADROES_VARREDURA}
+    entidades["CNPJ"] = []
+    ruler, matcher = varrer(texto)
+    for label, inicio, fim in ruler:
+        entidades[label].append(texto[inicio:fim])
+    # como em extrair_entidades, tudo que vem do Matcher vai para "CNPJ"
+    for _, inicio, fim in matcher:
+        entidades["CNPJ"].append(texto[inicio:fim])
+    return entidades
+
+# -------------------------------------------------------------------
+# modo híbrido: a regex localiza, os padrões do EntityRuler confirmam numa janela de tokens
+# -------------------------------------------------------------------
+# As expressões acima só aproximam o tokenizer (sufixos como "%" e "'s", letras depois do infixo "-"...),
+# então no modo híbrido elas não decidem as bordas das entidades: uma regex por padrão acha todo lugar onde
+# o primeiro token do padrão pode casar, e o próprio padrão roda (Matcher) numa janela de tokens a partir
+# dali. Os spans são os do EntityRuler por construção, e o Matcher só vê as janelas.
+
+# tokens além do tamanho limitado de um padrão terminado em "+"/"*" (a janela cresce se não bastar)
+EXTENSAO_JANELA = 4
+# rótulos do EntityRuler cobertos pela varredura no modo híbrido; os demais (PRAZO inclusive, cujo padrão
+# nunca casa no EntityRuler) ficam com o EntityRuler avulso de analisar_spacy.criar_ruler_hibrido
+ROTULOS_HIBRIDO = set(PADROES_VARREDURA) - DIVERGENCIAS_CONHECIDAS
+# entra na chave do cache (analisar_spacy.versao_cache): muda quando a saída do modo híbrido muda
+VERSAO_HIBRIDO = 2
+
+def _gatilho(token: dict):
+    """
+    Regex que acha, no texto, todo lugar onde o token pode casar (um superconjunto, para re.search),
+    ou None se o token não tiver texto literal nem REGEX de texto.
+    """
+    for atributo, flags in (("LOWER", re.IGNORECASE), ("TEXT", 0), ("ORTH", 0)):
+        valor = token.get(atributo)
+        if isinstance(valor, str):
+            valor = {"IN": [valor]}
+        if isinstance(valor, dict) and "IN" in valor:
+            return re.compile("|".join(re.escape(v) for v in sorted(valor["IN"], key=len, reverse=True)), flags)
+        if isinstance(valor, dict) and "REGEX" in valor and atributo != "LOWER":
+            # "^" e "$" valem para o token, não para o texto: sem eles a busca só acha mais lugares
+            return re.compile(re.sub(r"^\^|(?<!\\)\$$", "", valor["REGEX"]))
+    return None
+
+def _comprimento(padrao, extensao: int = EXTENSAO_JANELA) -> int:
+    """Máximo de tokens de uma ocorrência do padrão (com `extensao` tokens para a parte sem limite)."""
+    maximos = [{None: 1, "!": 1, "?": 1}.get(token.get("OP")) for token in padrao]
+    return sum(m or 1 for m in maximos) + (extensao if None in maximos else 0)
+
+def _gatilhos(padroes):
+    """[(gatilho do primeiro token, comprimento)] de cada padrão, ou None se algum não tiver gatilho."""
+    gatilhos = [(_gatilho(padrao[0]), _comprimento(padrao)) for padrao in padroes]
+    return None if any(g is None for g, _ in gatilhos) else gatilhos
+
+def criar_varredura_hibrida(nlp):
+    """
+    Matchers dos rótulos da varredura: {"ents": [(Matcher de um rótulo, gatilhos)], "matcher": (Matcher de
+    CNPJ/CPF, gatilhos)}, com os padrões do EntityRuler (analisar_spacy.patterns) e de analisar_spacy.criar_matcher.
+    """
+    from spacy.matcher import Matcher
+    import analisar_spacy
+
+    ents = []
+    for label in sorted(ROTULOS_HIBRIDO):
+        padroes = [p["pattern"] for p in analisar_spacy.patterns if p["label"] == label]
+        matcher = Matcher(nlp.vocab)
+        matcher.add(label, padroes)
+        ents.append((matcher, _gatilhos(padroes)))
+    padroes_matcher = nlp.meta.get("matcher_patterns", analisar_spacy.matcher_patterns)
+    gatilhos = _gatilhos([padrao for padroes in padroes_matcher.values() for padrao in padroes])
+    return {"ents": ents, "matcher": (analisar_spacy.criar_matcher(nlp), gatilhos)}
+
+def janelas_gatilhos(doc, gatilhos, texto: str = None):
+    """Intervalos de tokens [início, fim], ordenados e sem sobreposição, a partir de cada lugar onde um gatilho casa."""
+    import numpy as np
+
+    if gatilhos is None:
+        return [[0, len(doc)]] if len(doc) else []
+    texto = texto if texto is not None else doc.text
+    inicios = doc.to_array("IDX")
+    intervalos = []
+    for gatilho, comprimento in gatilhos:
+        pos = 0
+        # inclusive as ocorrências que começam dentro de uma anterior
+        while (m := gatilho.search(texto, pos)):
+            k = int(np.searchsorted(inicios, m.start(), side="right")) - 1
+            intervalos.append((max(k, 0), min(len(doc), k + comprimento + 1)))
+            pos = m.start() + 1
+    janelas = []
+    for a, b in sorted(intervalos):
+        if janelas and a <= janelas[-1][1]:
+            janelas[-1][1] = max(janelas[-1][1], b)
+        else:
+            janelas.append([a, b])
+    return janelas
+
+def casar_janelas(doc, matcher, janelas, extensao: int = EXTENSAO_JANELA):
+    """
+    Gera (início, fim, ocorrências) de cada janela de tokens, com as ocorrências do `matcher` em posições do Doc.
+    Uma janela com uma ocorrência encostada no fim (padrão terminado em "+") cresce e o Matcher roda de novo,
+    juntando-se às janelas seguintes que alcançar.
+    """
+    n = len(doc)
+    k = 0
+    while k < len(janelas):
+        a, b = janelas[k]
+        passo = max(extensao, 1)
+        while True:
+            while k + 1 < len(janelas) and janelas[k + 1][0] <= b:
+                k += 1
+                b = max(b, janelas[k][1])
+            encontrados = matcher(doc[a:b])
+            if b == n or all(fim < b - a for _, _, fim in encontrados):
+                break
+            b = min(n, b + passo)
+            passo *= 2
+        yield a, b, [(m_id, a + inicio, a + fim) for m_id, inicio, fim in encontrados]
+        k += 1
+
+def spans_hibrido(doc, ruler_restante, varredura):
+    """
+    Equivalente a analisar_spacy.spans_entidades para um Doc processado sem o entity_ruler: junta as
+    ocorrências do `ruler_restante` às dos Matchers da `varredura` (criar_varredura_hibrida), rodados só nas
+    janelas dos gatilhos, e resolve sobreposições como o EntityRuler (mais longo primeiro, depois o mais à esquerda).
+    """
+    texto = doc.text  # doc.text é remontado a cada acesso
+    strings = doc.vocab.strings
+    candidatos = {(strings[m_id], inicio, fim) for m_id, inicio, fim in ruler_restante.match(doc)}
+    for matcher, gatilhos in varredura["ents"]:
+        for _, _, encontrados in casar_janelas(doc, matcher, janelas_gatilhos(doc, gatilhos, texto)):
+            candidatos.update((strings[m_id], inicio, fim) for m_id, inicio, fim in encontrados if fim > inicio)
+
+    spans = [("ents", label, doc[inicio:fim].start_char, doc[inicio:fim].end_char)
+             for label, inicio, fim in _resolver(candidatos, lambda c: c[2] - c[1])]
+    matcher, gatilhos = varredura["matcher"]
+    spans += [("matcher", "CNPJ", doc[inicio:fim].start_char, doc[inicio:fim].end_char)
+              for _, _, encontrados in casar_janelas(doc, matcher, janelas_gatilhos(doc, gatilhos, texto))
+              for _, inicio, fim in encontrados]
+    return spans
+
+def extrair_entidades_hibrido(doc, ruler_restante, varredura):
+    """Equivalente a analisar_spacy.extrair_entidades para um Doc processado sem o entity_ruler."""
+    from analisar_spacy import entidades_de_spans
+
+    return entidades_de_spans(doc.text, spans_hibrido(doc, ruler_restante, varredura))
+
+# -------------------------------------------------------------------
+# equivalência e throughput
+# -------------------------------------------------------------------
+def comparar_com_ruler(pasta: str = None, nlp=None, max_exemplos: int = 3):
+    """
+    Compara, documento a documento, a varredura com a saída atual do EntityRuler + Matcher:
+      - sozinha, contra um EntityRuler só com os padrões dos mesmos rótulos
+        (isola a equivalência das expressões das sobreposições com outros rótulos);
+      - no modo híbrido, contra o pipeline completo.
+    Devolve as divergências por rótulo.
+    """
+    import analisar_spacy
+    from spacy.pipeline import EntityRuler
+
+    pasta = pasta or analisar_spacy.OUTPUT_DIR
+    nlp = nlp or analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    ruler_restante = analisar_spacy.criar_ruler_hibrido(nlp)
+    varredura = criar_varredura_hibrida(nlp)
+    ruler_varredura = EntityRuler(nlp, name="entity_ruler_varredura")
+    ruler_varredura.add_patterns([p for p in analisar_spacy.patterns if p["label"] in ROTULOS])
+
+    divergencias = {}
+    total = hibrido_ok = 0
+    for documento, _, texto in analisar_spacy.ler_textos(pasta):
+        total += 1
+        referencia = analisar_spacy.extrair_entidades(ruler_varredura(nlp.make_doc(texto)), matcher)
+        for label, encontrados in varrer_entidades(texto).items():
+            if encontrados != referencia[label]:
+                divergencias.setdefault(label, []).append((documento, referencia[label], encontrados))
+
+        completo = analisar_spacy.extrair_entidades(nlp(texto), matcher)
+        hibrido = extrair_entidades_hibrido(nlp(texto, disable=["entity_ruler"]), ruler_restante, varredura)
+        hibrido_ok += hibrido == completo
+
+    print(f"\n🔎 Varredura regex x EntityRuler ({total} documentos)")
+    for label in sorted(set(PADROES_VARREDURA) | {"CNPJ"}):
+        casos = divergencias.get(label, [])
+        if not casos:
+            print(f" - {label}: ✅ equivalente")
+            continue
+        nota = " (esperado)" if label in DIVERGENCIAS_CONHECIDAS else ""
+        print(f" - {label}: ❌ {len(casos)} documento(s) divergente(s){nota}")
+        for documento, esperado, obtido in casos[:max_exemplos]:
+            print(f"     {documento}: ruler={esperado} varredura={obtido}")
+    print(f" - modo híbrido: {hibrido_ok}/{total} documentos idênticos ao pipeline completo")
+    return divergencias
+
+# textos em que as expressões da varredura erram as bordas dos tokens (ou nem casam): o modo híbrido
+# tem de dar exatamente os spans do pipeline completo
+CASOS_LIMITE = [
+    "Processo nº 5%",                                        # sufixo "%"
+    "Processo nº 53500.053021/2018-91's",                    # sufixo "'s"
+    "Processo nº 53500.053021/2018-91abc fim",               # letras depois do infixo "-"
+    "no prazo de 15 (quinze) dias",                          # PRAZO: o padrão do EntityRuler nunca casa
+    "Ver ExProcesso nº 53500.053021/2018-91 citado. Processo nº 53500.053021/2018-91 aberto.",
+    "SEI nº 1234 5678%",
+    "Pasta nº RADARRCTS32016000006.",
+    "CNPJ 40.432.544/0001-47abc e CPF 123.456.789-10%",
+    "Resolução nº 589, 2 e informe nº 12/2020/SCO",
+    "12/03/2021, às 14:35, conforme horário oficial de Brasília",
+    "processo",                                              # gatilho no fim do Doc
+    "",
+]
+
+def conferir_casos_limite(nlp=None, casos=CASOS_LIMITE):
+    """Confere que o modo híbrido dá os spans do pipeline completo em cada caso; AssertionError se não."""
+    import analisar_spacy
+
+    nlp = nlp or analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    _, spans = analisar_spacy.criar_extrator(nlp, hibrido=True, spans=True)
+    divergentes = []
+    for texto in casos:
+        esperado = analisar_spacy.spans_entidades(nlp(texto), matcher)
+        obtido = spans(nlp(texto, disable=["entity_ruler"]))
+        if obtido != esperado:
+            divergentes.append(f"{texto!r}: ruler={esperado} híbrido={obtido}")
+    if divergentes:
+        raise AssertionError("modo híbrido diverge do EntityRuler:\n" + "\n".join(divergentes))
+    print(f"✅ Modo híbrido idêntico ao EntityRuler nos {len(casos)} casos-limite")
+
+def benchmark_varredura(pasta: str = None, nlp=None):
+    """Throughput (documentos/s) da varredura regex, do modo híbrido e do pipeline completo."""
+    import analisar_spacy
+
+    pasta = pasta or analisar_spacy.OUTPUT_DIR
+    nlp = nlp or analisar_spacy.obter_pipeline()
+    matcher = analisar_spacy.criar_matcher(nlp)
+    ruler_restante = analisar_spacy.criar_ruler_hibrido(nlp)
+    varredura = criar_varredura_hibrida(nlp)
+    textos = [texto for _, _, texto in analisar_spacy.ler_textos(pasta)]
+
+    modos = {
+        "varredura regex": lambda t: varrer_entidades(t),
+        "híbrido": lambda t: extrair_entidades_hibrido(nlp(t, disable=["entity_ruler"]), ruler_restante, varredura),
+        "pipeline spaCy": lambda t: analisar_spacy.extrair_entidades(nlp(t), matcher),
+    }
+    print(f"\n📊 Throughput ({len(textos)} documentos)")
+    resultados = {}
+    for nome, analisar in modos.items():
+        inicio = time.perf_counter()
+        for texto in textos:
+            analisar(texto)
+        tempo = time.perf_counter() - inicio
+        resultados[nome] = len(textos) / tempo
+        print(f" - {nome:<16}: {resultados[nome]:10.1f} docs/s")
+    return resultados
+
+
+if __name__ == "__main__":
+    conferir_casos_limite()
+    comparar_com_ruler()
+    benchmark_varredura()